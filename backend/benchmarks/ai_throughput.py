@@ -0,0 +1,146 @@
+"""
+Offline throughput benchmark for the /api/ai routes.
+
+Runs the AI router in-process against the deterministic local LLM provider and
+fires concurrent requests through an ASGI client, reporting throughput and
+latency percentiles. A lightweight /ping probe runs alongside the load so any
+event loop blocking shows up as ping latency.
+
+Usage (from the backend directory):
+    python -m benchmarks.ai_throughput --requests 200 --concurrency 50 --latency 0.5
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import FastAPI
+
+from routers import ai
+from services import llm_client
+from services.llm_cache import cache
+from services.llm_providers import LocalProvider, set_provider
+
+# Representative request bodies, one per benchmarked route
+SCENARIOS = {
+    "analyze-client-input": {"text": "We need a new landing page and a spring email campaign by next month."},
+    "predict-task-timeline": {"task_description": "Redesign the client onboarding flow in Figma and WordPress."},
+    "analyze-meeting-transcript": {"transcript": "Alex: the homepage draft is ready. Sam: I will review it by Friday."},
+    "analyze-financial-data": {"financial_records": [
+        {"record_type": "income", "amount": 5000.0, "record_date": "2024-01-15"},
+        {"record_type": "expense", "amount": 1200.0, "record_date": "2024-01-20"}
+    ]},
+}
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(ai.router, prefix="/api/ai")
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(label: str, latencies: List[float], elapsed: float) -> Dict[str, float]:
+    return {
+        "label": label,
+        "count": len(latencies),
+        "throughput": len(latencies) / elapsed if elapsed > 0 else 0,
+        "mean": statistics.mean(latencies) if latencies else 0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "max": max(latencies) if latencies else 0,
+    }
+
+
+async def run(route: str, requests: int, concurrency: int, unique: bool) -> List[Dict[str, float]]:
+    app = build_app()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    ping_latencies: List[float] = []
+    errors = 0
+    done = asyncio.Event()
+
+    # Server errors count as failed requests instead of aborting the run
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def call(index: int):
+            nonlocal errors
+            body = dict(SCENARIOS[route])
+            if unique:
+                # Vary the prompt so the cache and single-flight cannot collapse requests
+                key = next(iter(body))
+                body[key] = f"{body[key]} (request {index})" if isinstance(body[key], str) else body[key]
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post(f"/api/ai/{route}", json=body)
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    errors += 1
+
+        async def probe():
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get("/ping")
+                ping_latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(0.05)
+
+        probe_task = asyncio.ensure_future(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(call(index) for index in range(requests)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+
+    await llm_client.aclose()
+    results = [summarize(route, latencies, elapsed), summarize("ping", ping_latencies, elapsed)]
+    results[0]["errors"] = errors
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /api/ai throughput with the local LLM provider")
+    parser.add_argument("--route", choices=sorted(SCENARIOS), default="analyze-client-input")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.5, help="Local provider latency before the first token (seconds)")
+    parser.add_argument("--tokens-per-second", type=float, default=200)
+    parser.add_argument("--cache", action="store_true", help="Keep the response cache enabled")
+    parser.add_argument("--repeat-prompts", action="store_true", help="Send the same prompt every time instead of unique ones")
+    args = parser.parse_args()
+
+    set_provider(LocalProvider(latency=args.latency, tokens_per_second=args.tokens_per_second))
+    cache.enabled = args.cache
+
+    results = asyncio.run(run(args.route, args.requests, args.concurrency, not args.repeat_prompts))
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, "
+          f"provider latency {args.latency}s at {args.tokens_per_second} tokens/s")
+    for row in results:
+        line = (f"{row['label']:>28}: {row['count']:5d} calls  {row['throughput']:8.1f} req/s  "
+                f"mean {row['mean'] * 1000:8.1f} ms  p50 {row['p50'] * 1000:8.1f} ms  "
+                f"p95 {row['p95'] * 1000:8.1f} ms  max {row['max'] * 1000:8.1f} ms")
+        if "errors" in row:
+            line += f"  errors {row['errors']}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
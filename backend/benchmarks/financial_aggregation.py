@@ -0,0 +1,99 @@
+"""
+Ledger aggregation benchmark.
+
+Aggregates synthetic financial records (as record dicts, the shape the AI route
+receives) with services.financial_aggregation. It compares that with the
+pandas DataFrame pipeline that analyze_financial_data used before, reporting
+wall time and peak traced memory for each.
+
+Usage (from the backend directory):
+    python -m benchmarks.financial_aggregation --records 1000000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.financial_aggregation import aggregate_records
+
+
+def make_records(count: int, months: int, seed: int = 7):
+    rng = random.Random(seed)
+    start = date(2020, 1, 1)
+    days = months * 30
+    return [
+        {
+            "record_id": index,
+            "record_type": "income" if rng.random() < 0.45 else "expense",
+            "amount": round(rng.uniform(10, 5000), 2),
+            "description": "Synthetic ledger entry",
+            "record_date": (start + timedelta(days=rng.randrange(days))).isoformat()
+        }
+        for index in range(count)
+    ]
+
+
+def with_aggregator(records):
+    return aggregate_records(records).summary()
+
+
+def with_pandas(records):
+    # The DataFrame pipeline previously used by AIService.analyze_financial_data
+    import pandas as pd
+    df = pd.DataFrame(records)
+    total_income = df[df['record_type'] == 'income']['amount'].sum()
+    total_expenses = df[df['record_type'] == 'expense']['amount'].sum()
+    df['record_date'] = pd.to_datetime(df['record_date'])
+    df['month'] = df['record_date'].dt.strftime('%Y-%m')
+    monthly_data = df.groupby(['month', 'record_type'])['amount'].sum().unstack().fillna(0)
+    monthly_data['profit'] = monthly_data['income'] - monthly_data['expense']
+    monthly_data['profit_growth'] = monthly_data['profit'].pct_change() * 100
+    return total_income, total_expenses, monthly_data
+
+
+def measure(fn, records, trace: bool):
+    if trace:
+        tracemalloc.start()
+    started = time.perf_counter()
+    fn(records)
+    elapsed = time.perf_counter() - started
+    peak = None
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ledger aggregation")
+    parser.add_argument("--records", type=int, default=1_000_000)
+    parser.add_argument("--months", type=int, default=36)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--memory", action="store_true", help="also trace peak memory (slower)")
+    args = parser.parse_args()
+
+    print(f"Generating {args.records} records over {args.months} months...")
+    records = make_records(args.records, args.months)
+
+    engines = {"single-pass aggregator": with_aggregator}
+    try:
+        import pandas  # noqa: F401
+        engines["pandas DataFrame"] = with_pandas
+    except ImportError:
+        print("pandas is not installed; skipping the DataFrame comparison")
+
+    for label, fn in engines.items():
+        timings = [measure(fn, records, False)[0] for _ in range(args.runs)]
+        line = f"{label:>24}: best {min(timings):.3f}s  ({args.records / min(timings):,.0f} records/s)"
+        if args.memory:
+            line += f"  peak {measure(fn, records, True)[1] / 1024 / 1024:.1f} MiB"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Worker startup benchmark.
+
+Each measurement runs in a fresh interpreter so nothing is already imported.
+It reports how long importing the app and serving the first /api/health takes,
+next to what loading the deferred AI dependencies (pandas and the sentiment
+lexicon) costs, which workers used to pay at import time.
+
+Usage (from the backend directory):
+    python -m benchmarks.startup_time --runs 5
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    "import services.ai_service": """
+import services.ai_service
+""",
+    "import routers.ai": """
+import routers.ai
+""",
+    "import main + first /api/health": """
+import asyncio
+import httpx
+import main
+
+async def first_request():
+    async with httpx.AsyncClient(app=main.app, base_url="http://bench") as client:
+        response = await client.get("/api/health")
+        response.raise_for_status()
+
+asyncio.run(first_request())
+""",
+    "deferred AI dependencies (prewarm)": """
+from services import ai_service
+ai_service.prewarm()
+""",
+}
+
+RUNNER = """
+import json, sys, time
+started = time.perf_counter()
+exec(compile(sys.argv[1], "<scenario>", "exec"), {{"__name__": "__bench__"}})
+print(json.dumps({{"seconds": time.perf_counter() - started}}))
+"""
+
+
+def measure(code: str) -> float:
+    env = {**os.environ, "AI_PREWARM": "false", "PYTHONDONTWRITEBYTECODE": "1"}
+    result = subprocess.run(
+        [sys.executable, "-c", RUNNER.format(), code],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed")
+    return json.loads(result.stdout.strip().splitlines()[-1])["seconds"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API worker startup time")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"Median of {args.runs} fresh interpreters")
+    for label, code in SCENARIOS.items():
+        try:
+            timings = [measure(code) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"{label:>36}: error ({e})")
+            continue
+        print(f"{label:>36}: {statistics.median(timings) * 1000:8.1f} ms  "
+              f"(min {min(timings) * 1000:.1f}, max {max(timings) * 1000:.1f})")
+
+
+if __name__ == "__main__":
+    main()
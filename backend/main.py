@@ -6,9 +6,14 @@ from datetime import datetime, timedelta
 import os
 import json
 import logging
+import threading
 
 # Import routers
 from routers import auth, employee, client, marketing, hr, finance, ai
+from services import llm_client, ai_service, resilience, resume_screening
+from services.llm_providers import get_provider
+from services.job_queue import job_queue, JOB_QUEUE_ENABLED
+from pagination import NEXT_CURSOR_HEADER
 
 # Setup logging
 logging.basicConfig(
@@ -31,6 +36,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],  # let browsers read the pagination cursor
 )
 
 # Include routers
@@ -42,16 +48,48 @@ app.include_router(hr.router, prefix="/api/hr", tags=["HR"])
 app.include_router(finance.router, prefix="/api/finance", tags=["Finance"])
 app.include_router(ai.router, prefix="/api/ai", tags=["AI"])
 
+@app.on_event("startup")
+async def prewarm_ai_dependencies():
+    # Load pandas and the sentiment lexicon in the background so the server starts accepting requests right away
+    if os.getenv("AI_PREWARM", "true").lower() == "true":
+        threading.Thread(target=ai_service.prewarm, name="ai-prewarm", daemon=True).start()
+
+@app.on_event("startup")
+async def start_job_workers():
+    # Background workers for queued AI jobs; also resumes jobs left over from a previous run
+    if JOB_QUEUE_ENABLED:
+        job_queue.start()
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    job_queue.stop()
+
+@app.on_event("shutdown")
+async def stop_resume_extractors():
+    # Worker processes used for bulk resume text extraction
+    resume_screening.shutdown()
+
+@app.on_event("shutdown")
+async def close_llm_client():
+    # Release pooled connections to the model provider
+    await llm_client.aclose()
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to HyperFlow AI API"}
 
 @app.get("/api/health")
 async def health_check():
+    circuit = resilience.breaker.state()
     return {
-        "status": "healthy",
+        # AI routes fall back to canned responses while the model provider circuit is open
+        "status": "degraded" if circuit["state"] == "open" else "healthy",
         "timestamp": datetime.now().isoformat(),
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "llm": {
+            "provider": get_provider().name,
+            "circuit": circuit
+        }
     }
 
 # Add a new endpoint for platform integrations
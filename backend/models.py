@@ -1,5 +1,5 @@
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text, Enum, JSON
+from sqlalchemy import Column, Integer, BigInteger, String, Float, Date, DateTime, Boolean, ForeignKey, Text, Enum, JSON, Index
 from sqlalchemy.orm import relationship
 from database import Base
 import enum
@@ -21,6 +21,12 @@ class FinancialRecordType(enum.Enum):
     expense = "expense"
     income = "income"
 
+class AIJobStatus(enum.Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
 # Model definitions
 class Role(Base):
     __tablename__ = "roles"
@@ -72,12 +78,31 @@ class Task(Base):
     actual_time = Column(Float)
     start_time = Column(DateTime)
     end_time = Column(DateTime)
+    progress_description = Column(Text)
+    drive_link = Column(String(500))
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
     
     client = relationship("Client", back_populates="tasks")
     assigned_user = relationship("User", back_populates="tasks")
     ai_insights = relationship("AIInsight", back_populates="task")
+    attachments = relationship("TaskAttachment", back_populates="task")
+
+class TaskAttachment(Base):
+    __tablename__ = "task_attachments"
+    
+    attachment_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    task_id = Column(Integer, ForeignKey("tasks.task_id"), nullable=False, index=True)
+    file_name = Column(String(255), nullable=False)
+    file_path = Column(String(500), nullable=False)
+    file_url = Column(String(500), nullable=False)
+    file_type = Column(String(100))
+    file_size = Column(BigInteger, nullable=False)
+    checksum = Column(String(64))  # sha256 of the stored file
+    uploaded_by = Column(Integer, ForeignKey("users.user_id"))
+    created_at = Column(DateTime, default=datetime.now)
+    
+    task = relationship("Task", back_populates="attachments")
 
 class EmployeeAttendance(Base):
     __tablename__ = "employee_attendance"
@@ -89,6 +114,12 @@ class EmployeeAttendance(Base):
     work_date = Column(DateTime, nullable=False)
     
     user = relationship("User", back_populates="attendance")
+    
+    # Covers the per-day attendance statistics and the per-employee day refresh
+    __table_args__ = (
+        Index("idx_attendance_work_date", "work_date", "login_time"),
+        Index("idx_attendance_user_date", "user_id", "work_date"),
+    )
 
 class CommunicationLog(Base):
     __tablename__ = "communication_logs"
@@ -115,6 +146,9 @@ class Invoice(Base):
     created_at = Column(DateTime, default=datetime.now)
     
     client = relationship("Client", back_populates="invoices")
+    
+    # Covers the date-range aggregates in the financial summary
+    __table_args__ = (Index("idx_invoices_created_at", "created_at", "status", "amount"),)
 
 class FinancialRecord(Base):
     __tablename__ = "financial_records"
@@ -125,6 +159,9 @@ class FinancialRecord(Base):
     description = Column(Text)
     record_date = Column(DateTime, nullable=False)
     created_at = Column(DateTime, default=datetime.now)
+    
+    # Covers the date-range aggregates in the financial summary
+    __table_args__ = (Index("idx_financial_records_date", "record_date", "record_type", "amount"),)
 
 class AIInsight(Base):
     __tablename__ = "ai_insights"
@@ -146,3 +183,65 @@ class AIModel(Base):
     parameters = Column(JSON)
     created_at = Column(DateTime, default=datetime.now)
     updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+class AIJob(Base):
+    __tablename__ = "ai_jobs"
+    
+    job_id = Column(String(36), primary_key=True)
+    job_type = Column(String(100), nullable=False)
+    params = Column(JSON)
+    status = Column(Enum(AIJobStatus), default=AIJobStatus.queued, nullable=False, index=True)
+    result = Column(JSON)
+    error = Column(Text)
+    attempts = Column(Integer, default=0, nullable=False)
+    created_by = Column(Integer, ForeignKey("users.user_id"))
+    created_at = Column(DateTime, default=datetime.now, index=True)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    claim_token = Column(String(32))  # identifies the worker currently running the job
+    heartbeat_at = Column(DateTime)  # refreshed by that worker while the job runs
+
+# Per-month totals of financial_records, maintained by services.ledger_rollup
+class MonthlyLedgerRollup(Base):
+    __tablename__ = "monthly_ledger_rollup"
+    
+    month = Column(Date, primary_key=True)  # first day of the month
+    record_type = Column(Enum(FinancialRecordType), primary_key=True)
+    total_amount = Column(Float, nullable=False, default=0)
+    record_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.now)
+
+# Per-employee, per-day attendance totals, maintained by services.attendance_rollup
+class AttendanceDailyRollup(Base):
+    __tablename__ = "attendance_daily_rollup"
+    
+    user_id = Column(Integer, ForeignKey("users.user_id"), primary_key=True)
+    work_date = Column(Date, primary_key=True)
+    first_login = Column(DateTime)
+    last_logout = Column(DateTime)
+    hours_worked = Column(Float)  # closed sessions only; NULL while none is closed
+    is_late = Column(Boolean, nullable=False, default=False)
+    updated_at = Column(DateTime, default=datetime.now)
+    
+    # Covers the per-day presence and lateness counts
+    __table_args__ = (Index("idx_attendance_rollup_work_date", "work_date", "is_late"),)
+
+# Stored resume assessments from bulk screening, one per distinct resume text and position
+class ResumeScreening(Base):
+    __tablename__ = "resume_screenings"
+    
+    screening_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    position = Column(String(100), nullable=False)
+    content_hash = Column(String(64), nullable=False)  # sha256 of the normalized resume text
+    file_name = Column(String(255))
+    skills_match_score = Column(Float)
+    recommendation = Column(String(50))
+    analysis = Column(JSON)
+    screened_by = Column(Integer, ForeignKey("users.user_id"))
+    created_at = Column(DateTime, default=datetime.now)
+    
+    # A resume is scored once per position; the second index serves listings sorted by score
+    __table_args__ = (
+        Index("idx_resume_screenings_hash", "position", "content_hash", unique=True),
+        Index("idx_resume_screenings_score", "position", "skills_match_score"),
+    )
@@ -0,0 +1,118 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+
+A page is read with WHERE conditions on the sort key, continuing after the last
+row of the previous page, rather than with OFFSET. So deep pages cost the same
+as the first one, and rows inserted meanwhile do not shift later pages. The
+sort key always ends with the primary key, so it is unique.
+
+Endpoints keep returning a plain list. When there are more rows, an opaque
+cursor for the next page is sent in the X-Next-Cursor header (documented in
+OpenAPI through NEXT_CURSOR_RESPONSES), and the client passes it back as
+?cursor=. The old skip parameter still works, and its pages
+also carry a cursor.
+"""
+import json
+import base64
+from datetime import date, datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import and_, or_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# OpenAPI description of the cursor header, for the responses= of paginated routes
+NEXT_CURSOR_RESPONSES = {
+    200: {
+        "headers": {
+            NEXT_CURSOR_HEADER: {
+                "description": "Cursor for the next page, sent only when more rows follow. Pass it back as ?cursor=.",
+                "schema": {"type": "string"}
+            }
+        }
+    }
+}
+
+# (column, descending) pairs; the last column must be the primary key
+SortKey = Sequence[Tuple[Any, bool]]
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return getattr(value, "value", value)
+
+
+def _decode_value(column, value: Any) -> Any:
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return python_type(value)
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, order_by: SortKey) -> List[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(order_by):
+            raise ValueError("wrong number of values")
+        return [_decode_value(column, value) for (column, _), value in zip(order_by, values)]
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+
+def _after(order_by: SortKey, values: List[Any]):
+    """Condition selecting rows that sort after the given key values (NULLs sort last when descending, as in MySQL)."""
+    clauses = []
+    for index, ((column, descending), value) in enumerate(zip(order_by, values)):
+        equal_before = [
+            prev_column.is_(None) if prev_value is None else prev_column == prev_value
+            for (prev_column, _), prev_value in zip(order_by[:index], values[:index])
+        ]
+        if value is None:
+            # Only other NULLs follow a NULL (descending) / everything non-NULL follows it (ascending)
+            beyond = column.isnot(None) if not descending else None
+        elif descending:
+            beyond = or_(column < value, column.is_(None))
+        else:
+            beyond = column > value
+        if beyond is not None:
+            clauses.append(and_(*equal_before, beyond))
+    return or_(*clauses)
+
+
+def paginate(query, order_by: SortKey, response: Response, cursor: Optional[str] = None,
+             limit: Optional[int] = None, skip: int = 0) -> list:
+    """
+    Apply the sort key and return one page of the query. Sets X-Next-Cursor
+    on the response when more rows follow. Without a limit all rows are returned.
+    """
+    query = query.order_by(*[column.desc() if descending else column.asc() for column, descending in order_by])
+    if cursor:
+        query = query.filter(_after(order_by, decode_cursor(cursor, order_by)))
+    elif skip:
+        query = query.offset(skip)
+    if limit is None:
+        return query.all()
+    if limit < 1:
+        return []
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([getattr(last, column.key) for column, _ in order_by])
+    return rows
@@ -0,0 +1,37 @@
+"""
+Rebuild the daily attendance rollup from employee_attendance.
+
+Run after a backfill, after editing attendance directly in the database, or
+after changing ATTENDANCE_LATE_AFTER. Without arguments every day is rebuilt.
+
+Usage:
+    python rebuild_attendance_rollup.py [--start 2024-01-01] [--end 2024-06-30]
+"""
+import argparse
+import logging
+from datetime import datetime
+
+from database import SessionLocal
+from services import attendance_rollup
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def parse_date(value: str):
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the daily attendance rollup")
+    parser.add_argument("--start", type=parse_date, help="first day to rebuild (YYYY-MM-DD)")
+    parser.add_argument("--end", type=parse_date, help="last day to rebuild (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        logger.info("Rebuilding daily attendance rollup...")
+        rows = attendance_rollup.rebuild(db, args.start, args.end)
+        logger.info(f"Daily attendance rollup rebuilt ({rows} rows)")
+    finally:
+        db.close()
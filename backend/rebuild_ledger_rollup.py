@@ -0,0 +1,37 @@
+"""
+Rebuild the monthly ledger rollup from financial_records.
+
+Run after a backfill or after editing financial records directly in the
+database. Without arguments every month is rebuilt.
+
+Usage:
+    python rebuild_ledger_rollup.py [--start 2024-01] [--end 2024-06]
+"""
+import argparse
+import logging
+from datetime import datetime
+
+from database import SessionLocal
+from services import ledger_rollup
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def parse_month(value: str):
+    return datetime.strptime(value, "%Y-%m").date()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the monthly ledger rollup")
+    parser.add_argument("--start", type=parse_month, help="first month to rebuild (YYYY-MM)")
+    parser.add_argument("--end", type=parse_month, help="last month to rebuild (YYYY-MM)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        logger.info("Rebuilding monthly ledger rollup...")
+        rows = ledger_rollup.rebuild(db, args.start, args.end)
+        logger.info(f"Monthly ledger rollup rebuilt ({rows} rows)")
+    finally:
+        db.close()
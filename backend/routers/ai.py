@@ -1,11 +1,21 @@
 
 from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi.responses import StreamingResponse
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 import json
+import asyncio
 import logging
 
+import schemas
 from services.ai_service import AIService
+from services.ai_batch import run_batch, BATCH_METHODS, AI_BATCH_MAX_JOBS
+from services.job_queue import job_queue
+from services.llm_cache import cache
+from services.llm_client import flights
+from services.sse import sse_event, SSE_HEADERS
+from services import sentiment
+from services.sentiment import SENTIMENT_BATCH_MAX_MESSAGES
 
 router = APIRouter()
 ai_service = AIService()
@@ -26,7 +36,7 @@ async def analyze_client_input(data: Dict[str, Any] = Body(...)):
                 detail="Either text or platform_data is required"
             )
         
-        result = ai_service.analyze_client_input(text, client_history, platform_data)
+        result = await ai_service.analyze_client_input_async(text, client_history, platform_data)
         return result
     except Exception as e:
         logging.error(f"Error in analyze-client-input: {str(e)}")
@@ -50,7 +60,7 @@ async def analyze_platform_messages(data: Dict[str, Any] = Body(...)):
                 detail="Messages are required"
             )
         
-        result = ai_service.analyze_platform_messages(messages, client_name)
+        result = await ai_service.analyze_platform_messages_async(messages, client_name)
         return result
     except Exception as e:
         logging.error(f"Error in analyze-platform-messages: {str(e)}")
@@ -74,7 +84,7 @@ async def predict_task_timeline(data: Dict[str, Any] = Body(...)):
                 detail="Task description is required"
             )
         
-        result = ai_service.predict_task_timeline(task_description, client_history)
+        result = await ai_service.predict_task_timeline_async(task_description, client_history)
         return result
     except Exception as e:
         logging.error(f"Error in predict-task-timeline: {str(e)}")
@@ -98,7 +108,7 @@ async def analyze_meeting_transcript(data: Dict[str, Any] = Body(...)):
                 detail="Transcript is required"
             )
         
-        result = ai_service.analyze_meeting_transcript(transcript, meeting_type)
+        result = await ai_service.analyze_meeting_transcript_async(transcript, meeting_type)
         return result
     except Exception as e:
         logging.error(f"Error in analyze-meeting-transcript: {str(e)}")
@@ -107,6 +117,40 @@ async def analyze_meeting_transcript(data: Dict[str, Any] = Body(...)):
             detail=f"Error analyzing meeting transcript: {str(e)}"
         )
 
+@router.post("/jobs/analyze-meeting-transcript", response_model=schemas.AIJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_meeting_transcript_job(data: Dict[str, Any] = Body(...)):
+    """
+    Queue a meeting transcript analysis in the background.
+    Poll GET /api/ai/jobs/{job_id} for its status and result.
+    """
+    transcript = data.get("transcript", "")
+    meeting_type = data.get("meeting_type", "client")
+    
+    if not transcript:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Transcript is required"
+        )
+    
+    return await asyncio.to_thread(
+        job_queue.submit,
+        "analyze_meeting_transcript",
+        {"transcript": transcript, "meeting_type": meeting_type}
+    )
+
+@router.get("/jobs/{job_id}", response_model=schemas.AIJobResponse)
+async def get_job(job_id: str):
+    """
+    Get the status of a background AI job, with its result once it has finished.
+    """
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    return job
+
 @router.post("/generate-marketing-insights")
 async def generate_marketing_insights(data: Dict[str, Any] = Body(...)):
     """
@@ -122,7 +166,7 @@ async def generate_marketing_insights(data: Dict[str, Any] = Body(...)):
                 detail="Campaign data is required"
             )
         
-        result = ai_service.generate_marketing_insights(campaign_data, market_segment)
+        result = await ai_service.generate_marketing_insights_async(campaign_data, market_segment)
         return result
     except Exception as e:
         logging.error(f"Error in generate-marketing-insights: {str(e)}")
@@ -145,7 +189,7 @@ async def analyze_financial_data(data: Dict[str, Any] = Body(...)):
                 detail="Financial records are required"
             )
         
-        result = ai_service.analyze_financial_data(financial_records)
+        result = await ai_service.analyze_financial_data_async(financial_records)
         return result
     except Exception as e:
         logging.error(f"Error in analyze-financial-data: {str(e)}")
@@ -169,7 +213,7 @@ async def analyze_employee_performance(data: Dict[str, Any] = Body(...)):
                 detail="Either attendance data or task data is required"
             )
         
-        result = ai_service.analyze_employee_performance(attendance_data, task_data)
+        result = await ai_service.analyze_employee_performance_async(attendance_data, task_data)
         return result
     except Exception as e:
         logging.error(f"Error in analyze-employee-performance: {str(e)}")
@@ -196,10 +240,10 @@ async def generate_suggested_tasks(data: Dict[str, Any] = Body(...)):
         
         if platform_data:
             # Use platform-specific analysis
-            result = ai_service.analyze_platform_messages(platform_data, str(client_id))
+            result = await ai_service.analyze_platform_messages_async(platform_data, str(client_id))
         else:
             # Use regular analysis
-            result = ai_service.analyze_client_input(client_requirements)
+            result = await ai_service.analyze_client_input_async(client_requirements)
         
         return result
     except Exception as e:
@@ -230,7 +274,7 @@ async def generate_performance_insights(data: Dict[str, Any] = Body(...)):
         attendance_data = []
         task_data = []
         
-        result = ai_service.analyze_employee_performance(attendance_data, task_data)
+        result = await ai_service.analyze_employee_performance_async(attendance_data, task_data)
         return result
     except Exception as e:
         logging.error(f"Error in generate-performance-insights: {str(e)}")
@@ -260,7 +304,7 @@ async def ai_assistant(data: Dict[str, Any] = Body(...)):
         knowledge_base = context.get("knowledgeBase", {})
         
         # Generate response based on query, user role, and knowledge
-        response = ai_service.generate_assistant_response(query, user_role, knowledge_base)
+        response = await ai_service.generate_assistant_response_async(query, user_role, knowledge_base)
         
         return {
             "message": response,
@@ -274,6 +318,42 @@ async def ai_assistant(data: Dict[str, Any] = Body(...)):
             detail=f"Error processing assistant request: {str(e)}"
         )
 
+@router.post("/assistant/stream")
+async def ai_assistant_stream(data: Dict[str, Any] = Body(...)):
+    """
+    Streaming variant of the AI assistant. Sends "token" server-sent events as the
+    answer is generated and a final "result" event with the complete message.
+    """
+    query = data.get("query", "")
+    context = data.get("context", {})
+    
+    if not query:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Query is required"
+        )
+    
+    user_role = context.get("user", {}).get("role", "employee")
+    knowledge_base = context.get("knowledgeBase", {})
+    
+    async def events():
+        parts = []
+        try:
+            async for delta in ai_service.stream_assistant_response_async(query, user_role, knowledge_base):
+                parts.append(delta)
+                yield sse_event({"text": delta}, event="token")
+            
+            yield sse_event({
+                "message": "".join(parts).strip(),
+                "confidence": 0.92,
+                "sources": []
+            }, event="result")
+        except Exception as e:
+            logging.error(f"Error in AI assistant stream: {str(e)}")
+            yield sse_event({"detail": f"Error processing assistant request: {str(e)}"}, event="error")
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
 @router.post("/extract-context")
 async def extract_context(data: Dict[str, Any] = Body(...)):
     """
@@ -296,3 +376,61 @@ async def extract_context(data: Dict[str, Any] = Body(...)):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error extracting context: {str(e)}"
         )
+
+@router.post("/batch")
+async def run_batch_analysis(request: schemas.AIBatchRequest):
+    """
+    Run a list of AIService analyses with bounded concurrency and per-item timeouts.
+    Results are streamed back as newline-delimited JSON in completion order.
+    """
+    if not request.jobs:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At least one job is required"
+        )
+    
+    if len(request.jobs) > AI_BATCH_MAX_JOBS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A batch may contain at most {AI_BATCH_MAX_JOBS} jobs"
+        )
+    
+    unknown_methods = sorted({job.method for job in request.jobs if job.method not in BATCH_METHODS})
+    if unknown_methods:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported methods: {', '.join(unknown_methods)}"
+        )
+    
+    async def stream_results():
+        jobs = [job.dict() for job in request.jobs]
+        async for outcome in run_batch(jobs, request.concurrency, request.timeout):
+            yield json.dumps(outcome, default=str) + "\n"
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+@router.post("/sentiment/batch")
+async def score_sentiment_batch(request: schemas.SentimentBatchRequest):
+    """
+    Score a list of messages with the local sentiment lexicon (no LLM call).
+    Returns per-message scores in input order plus an aggregate for the batch.
+    """
+    if len(request.messages) > SENTIMENT_BATCH_MAX_MESSAGES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A batch may contain at most {SENTIMENT_BATCH_MAX_MESSAGES} messages"
+        )
+    
+    # Scoring is CPU-bound, so keep it off the event loop
+    return await asyncio.to_thread(sentiment.score_batch, request.messages)
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """
+    Hit/miss counters for the LLM response cache, with the latency and tokens it saved,
+    and how many duplicate in-flight completions were coalesced.
+    """
+    return {
+        **cache.stats(),
+        "single_flight": flights.stats()
+    }
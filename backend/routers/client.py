@@ -1,27 +1,32 @@
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import func, or_
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Dict, Any
 from datetime import datetime, date, timedelta
 import logging
 
 from database import get_db
+from pagination import NEXT_CURSOR_RESPONSES, paginate
 import models
 import schemas
 from routers.auth import get_current_user
 from services.ai_service import AIService
+from services.prompt_budget import fetch_limit, keywords, ITEM_MAX_CHARS
 
 router = APIRouter()
 
-@router.get("/", response_model=List[schemas.ClientResponse])
+@router.get("/", response_model=List[schemas.ClientResponse], responses=NEXT_CURSOR_RESPONSES)
 async def get_clients(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    cursor: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1),
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get list of clients"""
-    clients = db.query(models.Client).offset(skip).limit(limit).all()
+    """Get list of clients (pass X-Next-Cursor back as cursor for the next page)"""
+    clients = paginate(db.query(models.Client), [(models.Client.client_id, False)], response, cursor, limit, skip)
     return clients
 
 @router.post("/", response_model=schemas.ClientResponse)
@@ -75,20 +80,23 @@ async def update_client(
     db.refresh(db_client)
     return db_client
 
-@router.get("/{client_id}/tasks", response_model=List[schemas.TaskResponse])
+@router.get("/{client_id}/tasks", response_model=List[schemas.TaskResponse], responses=NEXT_CURSOR_RESPONSES)
 async def get_client_tasks(
     client_id: int,
+    response: Response,
     status: Optional[schemas.TaskStatusEnum] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get tasks for a specific client"""
+    """Get tasks for a specific client (all of them unless a limit is given; then page with X-Next-Cursor)"""
     query = db.query(models.Task).filter(models.Task.client_id == client_id)
     
     if status:
         query = query.filter(models.Task.status == status)
     
-    tasks = query.order_by(models.Task.created_at.desc()).all()
+    tasks = paginate(query, [(models.Task.created_at, True), (models.Task.task_id, True)], response, cursor, limit)
     return tasks
 
 @router.post("/{client_id}/tasks", response_model=schemas.TaskResponse)
@@ -117,6 +125,73 @@ async def create_client_task(
     db.refresh(db_task)
     return db_task
 
+def _load_client_history(db: Session, client_id: int, text: str) -> Dict[str, Any]:
+    """
+    Load only as much client history as the prompt budget can use: the most
+    recent tasks and messages, older ones that mention the input's keywords,
+    and grouped counts standing in for everything else.
+    """
+    limit = fetch_limit()
+    terms = keywords(text, 5)
+    
+    task_columns = (
+        models.Task.task_id,
+        models.Task.title,
+        func.substr(models.Task.description, 1, ITEM_MAX_CHARS).label("description"),
+        models.Task.status,
+        models.Task.created_at
+    )
+    task_query = db.query(*task_columns).filter(models.Task.client_id == client_id)
+    tasks = {t.task_id: t for t in task_query.order_by(models.Task.created_at.desc()).limit(limit)}
+    if terms:
+        matches = task_query.filter(or_(*[models.Task.title.ilike(f"%{term}%") for term in terms]))
+        for t in matches.order_by(models.Task.created_at.desc()).limit(limit):
+            tasks.setdefault(t.task_id, t)
+    
+    comm_columns = (
+        models.CommunicationLog.log_id,
+        func.substr(models.CommunicationLog.message, 1, ITEM_MAX_CHARS).label("message"),
+        models.CommunicationLog.channel,
+        models.CommunicationLog.created_at
+    )
+    comm_query = db.query(*comm_columns).filter(models.CommunicationLog.client_id == client_id)
+    comms = {c.log_id: c for c in comm_query.order_by(models.CommunicationLog.created_at.desc()).limit(limit)}
+    if terms:
+        matches = comm_query.filter(or_(*[models.CommunicationLog.message.ilike(f"%{term}%") for term in terms]))
+        for c in matches.order_by(models.CommunicationLog.created_at.desc()).limit(limit):
+            comms.setdefault(c.log_id, c)
+    
+    # Totals cover rows that were not loaded
+    tasks_by_status = db.query(models.Task.status, func.count(models.Task.task_id)).filter(
+        models.Task.client_id == client_id
+    ).group_by(models.Task.status).all()
+    comms_by_channel = db.query(models.CommunicationLog.channel, func.count(models.CommunicationLog.log_id)).filter(
+        models.CommunicationLog.client_id == client_id
+    ).group_by(models.CommunicationLog.channel).all()
+    first_task = db.query(func.min(models.Task.created_at)).filter(models.Task.client_id == client_id).scalar()
+    first_comm = db.query(func.min(models.CommunicationLog.created_at)).filter(
+        models.CommunicationLog.client_id == client_id
+    ).scalar()
+    first_activity = min([d for d in (first_task, first_comm) if d], default=None)
+    
+    # Convert to dictionaries for AI service
+    return {
+        "tasks": [
+            {"title": t.title, "description": t.description, "status": t.status.value if t.status else None,
+             "created_at": t.created_at.isoformat() if t.created_at else None}
+            for t in tasks.values()
+        ],
+        "communications": [
+            {"message": c.message, "channel": c.channel, "created_at": c.created_at.isoformat() if c.created_at else None}
+            for c in comms.values()
+        ],
+        "totals": {
+            "tasks_by_status": {(s.value if s else "unknown"): count for s, count in tasks_by_status},
+            "communications_by_channel": {(channel or "unknown"): count for channel, count in comms_by_channel},
+            "first_activity": first_activity.isoformat() if first_activity else None
+        }
+    }
+
 @router.post("/analyze-input", response_model=schemas.ClientInputAnalysisResponse)
 async def analyze_client_input(
     request: schemas.ClientInputAnalysisRequest,
@@ -127,20 +202,9 @@ async def analyze_client_input(
     # Get client history if client_id provided
     client_history = None
     if request.client_id:
-        # Get previous tasks and communications for this client
-        tasks = db.query(models.Task).filter(models.Task.client_id == request.client_id).all()
-        comms = db.query(models.CommunicationLog).filter(models.CommunicationLog.client_id == request.client_id).all()
-        
-        # Convert to dictionaries for AI service
-        task_dicts = [{"title": t.title, "description": t.description, "status": t.status.value} for t in tasks]
-        comm_dicts = [{"message": c.message, "channel": c.channel, "created_at": c.created_at.isoformat()} for c in comms]
-        
-        client_history = {
-            "tasks": task_dicts,
-            "communications": comm_dicts
-        }
+        client_history = _load_client_history(db, request.client_id, request.text)
     
-    result = AIService.analyze_client_input(text=request.text, client_history=client_history)
+    result = await AIService.analyze_client_input_async(text=request.text, client_history=client_history)
     
     return result
 
@@ -1,17 +1,17 @@
 
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form
+from fastapi import APIRouter, Depends, HTTPException, status, Form, Request
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 import os
-import uuid
-from pydantic import HttpUrl
+import asyncio
 
 from database import get_db
 import models
 import schemas
 from routers.auth import get_current_user
 from services.ai_service import AIService
+from services import attendance_rollup, uploads
 
 router = APIRouter()
 
@@ -21,7 +21,32 @@ async def log_attendance_login(
     db: Session = Depends(get_db)
 ):
     """Log employee login time for attendance tracking"""
-    # ... keep existing code (log_attendance_login)
+    now = datetime.now()
+    today = now.date()
+    
+    # A session that is still open today is returned as is
+    open_attendance = db.query(models.EmployeeAttendance).filter(
+        models.EmployeeAttendance.user_id == current_user.user_id,
+        models.EmployeeAttendance.work_date >= today,
+        models.EmployeeAttendance.work_date < today + timedelta(days=1),
+        models.EmployeeAttendance.logout_time.is_(None)
+    ).first()
+    if open_attendance:
+        return open_attendance
+    
+    attendance = models.EmployeeAttendance(
+        user_id=current_user.user_id,
+        login_time=now,
+        work_date=today
+    )
+    db.add(attendance)
+    
+    # Update the daily rollup in the same transaction
+    attendance_rollup.refresh_day(db, current_user.user_id, today)
+    db.commit()
+    db.refresh(attendance)
+    
+    return attendance
 
 @router.post("/attendance/logout", response_model=schemas.AttendanceResponse)
 async def log_attendance_logout(
@@ -30,7 +55,37 @@ async def log_attendance_logout(
     db: Session = Depends(get_db)
 ):
     """Log employee logout time for attendance tracking"""
-    # ... keep existing code (log_attendance_logout)
+    attendance = db.query(models.EmployeeAttendance).filter(
+        models.EmployeeAttendance.attendance_id == attendance_data.attendance_id,
+        models.EmployeeAttendance.user_id == current_user.user_id
+    ).first()
+    
+    if not attendance:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Attendance record not found"
+        )
+    
+    if attendance.logout_time:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Already logged out"
+        )
+    
+    if attendance.login_time and attendance_data.logout_time < attendance.login_time:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Logout time is before login time"
+        )
+    
+    attendance.logout_time = attendance_data.logout_time
+    
+    # Update the daily rollup in the same transaction
+    attendance_rollup.refresh_day(db, attendance.user_id, attendance.work_date)
+    db.commit()
+    db.refresh(attendance)
+    
+    return attendance
 
 @router.get("/attendance/today", response_model=Optional[schemas.AttendanceResponse])
 async def get_today_attendance(
@@ -80,16 +135,8 @@ async def update_task_status(
 
 # New endpoints for task uploads and progress tracking
 
-@router.post("/tasks/{task_id}/attachments", response_model=schemas.TaskAttachmentResponse)
-async def upload_task_attachment(
-    task_id: int,
-    file: UploadFile = File(...),
-    description: Optional[str] = Form(None),
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Upload a file attachment for a task"""
-    # Verify task exists and belongs to the user
+def _assigned_task(db: Session, task_id: int, current_user: models.User) -> models.Task:
+    """The task if it exists and is assigned to the user, else 404"""
     task = db.query(models.Task).filter(
         models.Task.task_id == task_id,
         models.Task.assigned_to == current_user.user_id
@@ -100,45 +147,145 @@ async def upload_task_attachment(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Task not found"
         )
+    return task
+
+@router.post("/tasks/{task_id}/attachments", response_model=schemas.TaskAttachmentResponse,
+             openapi_extra=uploads.FORM_UPLOAD_OPENAPI)
+async def upload_task_attachment(
+    task_id: int,
+    request: Request,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Upload a file attachment (form fields file and description) for a task; larger files use the resumable upload endpoints"""
+    # Verify task exists and belongs to the user
+    task = _assigned_task(db, task_id, current_user)
     
-    # Create upload directory if it doesn't exist
-    upload_dir = os.path.join("uploads", "tasks", str(task_id))
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    # Generate a unique filename
-    file_extension = os.path.splitext(file.filename)[1]
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
-    file_path = os.path.join(upload_dir, unique_filename)
-    
-    # Save the file
-    with open(file_path, "wb") as buffer:
-        buffer.write(await file.read())
-    
-    # Get file size
-    file_size = os.path.getsize(file_path)
+    # Stream the file field to disk as the body arrives, counting bytes and hashing as it goes
+    upload = await uploads.save_form_upload(request, task_id)
+    file_path = upload["file_path"]
     
     # Create attachment record in the database
     new_attachment = models.TaskAttachment(
         task_id=task_id,
-        file_name=file.filename,
+        file_name=upload["file_name"],
         file_path=file_path,
-        file_url=f"/uploads/tasks/{task_id}/{unique_filename}",
-        file_type=file.content_type,
-        file_size=file_size,
+        file_url=upload["file_url"],
+        file_type=upload["file_type"],
+        file_size=upload["file_size"],
+        checksum=upload["checksum"],
         uploaded_by=current_user.user_id
     )
     
     db.add(new_attachment)
     
     # Update progress description if provided
+    description = upload["fields"].get("description")
     if description:
         task.progress_description = description
     
-    db.commit()
+    try:
+        db.commit()
+    except Exception:
+        # Do not leave a file behind that no attachment refers to
+        db.rollback()
+        os.remove(file_path)
+        raise
     db.refresh(new_attachment)
     
     return new_attachment
 
+@router.post("/tasks/{task_id}/attachments/uploads", response_model=schemas.AttachmentUploadResponse)
+async def start_attachment_upload(
+    task_id: int,
+    upload_data: schemas.AttachmentUploadCreate,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Start a resumable upload; send the file in chunks with PUT, then complete it"""
+    _assigned_task(db, task_id, current_user)
+    return uploads.create_session(
+        task_id, current_user.user_id, upload_data.file_name, upload_data.file_size,
+        upload_data.file_type, upload_data.checksum
+    )
+
+@router.get("/tasks/{task_id}/attachments/uploads/{upload_id}", response_model=schemas.AttachmentUploadResponse)
+async def get_attachment_upload(
+    task_id: int,
+    upload_id: str,
+    current_user: models.User = Depends(get_current_user)
+):
+    """Get a resumable upload, including the offset to resume from"""
+    return uploads.get_session(upload_id, task_id, current_user.user_id)
+
+@router.put("/tasks/{task_id}/attachments/uploads/{upload_id}", response_model=schemas.AttachmentUploadResponse)
+async def upload_attachment_chunk(
+    task_id: int,
+    upload_id: str,
+    offset: int,
+    request: Request,
+    current_user: models.User = Depends(get_current_user)
+):
+    """Append the raw request body to a resumable upload at the given offset"""
+    session = uploads.get_session(upload_id, task_id, current_user.user_id)
+    session["offset"] = await uploads.append_chunk(session, offset, request.stream())
+    return session
+
+@router.post("/tasks/{task_id}/attachments/uploads/{upload_id}/complete", response_model=schemas.TaskAttachmentResponse)
+async def complete_attachment_upload(
+    task_id: int,
+    upload_id: str,
+    description: Optional[str] = Form(None),
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Finish a resumable upload and attach the file to the task"""
+    task = _assigned_task(db, task_id, current_user)
+    session = uploads.get_session(upload_id, task_id, current_user.user_id)
+    
+    # Verify size and checksum off the event loop; a concurrent completion now gets 409
+    checksum = await asyncio.to_thread(uploads.begin_completion, session)
+    
+    file_path, file_url = uploads.destination(task_id, session["file_name"])
+    try:
+        await asyncio.to_thread(uploads.move_into_place, session, file_path)
+        
+        new_attachment = models.TaskAttachment(
+            task_id=task_id,
+            file_name=session["file_name"],
+            file_path=file_path,
+            file_url=file_url,
+            file_type=session["file_type"],
+            file_size=session["file_size"],
+            checksum=checksum,
+            uploaded_by=current_user.user_id
+        )
+        
+        db.add(new_attachment)
+        
+        if description:
+            task.progress_description = description
+        
+        db.commit()
+    except Exception:
+        # Put the file back so the completion can be retried
+        db.rollback()
+        await asyncio.to_thread(uploads.reopen_session, session, file_path)
+        raise
+    uploads.finish_session(session)
+    db.refresh(new_attachment)
+    
+    return new_attachment
+
+@router.delete("/tasks/{task_id}/attachments/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def cancel_attachment_upload(
+    task_id: int,
+    upload_id: str,
+    current_user: models.User = Depends(get_current_user)
+):
+    """Cancel a resumable upload and discard the bytes received"""
+    uploads.discard_session(uploads.get_session(upload_id, task_id, current_user.user_id))
+
 @router.get("/tasks/{task_id}/attachments", response_model=List[schemas.TaskAttachmentResponse])
 async def get_task_attachments(
     task_id: int,
@@ -147,16 +294,7 @@ async def get_task_attachments(
 ):
     """Get all attachments for a task"""
     # Verify task exists and belongs to the user
-    task = db.query(models.Task).filter(
-        models.Task.task_id == task_id,
-        models.Task.assigned_to == current_user.user_id
-    ).first()
-    
-    if not task:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Task not found"
-        )
+    _assigned_task(db, task_id, current_user)
     
     attachments = db.query(models.TaskAttachment).filter(
         models.TaskAttachment.task_id == task_id
@@ -230,6 +368,6 @@ async def analyze_task_progress(
     }
     
     # Use AI service to analyze progress
-    analysis = AIService.analyze_task_progress(context)
+    analysis = await AIService.analyze_task_progress_async(context)
     
     return analysis
@@ -1,28 +1,35 @@
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response, File, UploadFile
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
 from datetime import datetime, date, timedelta
+import asyncio
 import logging
 
 from database import get_db
+from pagination import NEXT_CURSOR_RESPONSES, paginate
 import models
 import schemas
 from routers.auth import get_current_user
 from services.ai_service import AIService
+from services import ledger_rollup, bulk_import, exporter
+from services import attendance as attendance_service
 
 router = APIRouter()
 
-@router.get("/invoices", response_model=List[schemas.InvoiceResponse])
+@router.get("/invoices", response_model=List[schemas.InvoiceResponse], responses=NEXT_CURSOR_RESPONSES)
 async def get_invoices(
+    response: Response,
     status: Optional[schemas.InvoiceStatusEnum] = None,
     client_id: Optional[int] = None,
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1),
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get list of invoices with optional filtering"""
+    """Get list of invoices with optional filtering (pass X-Next-Cursor back as cursor for the next page)"""
     query = db.query(models.Invoice)
     
     if status:
@@ -31,7 +38,8 @@ async def get_invoices(
     if client_id:
         query = query.filter(models.Invoice.client_id == client_id)
     
-    invoices = query.order_by(models.Invoice.created_at.desc()).offset(skip).limit(limit).all()
+    invoices = paginate(query, [(models.Invoice.created_at, True), (models.Invoice.invoice_id, True)],
+                        response, cursor, limit, skip)
     return invoices
 
 @router.post("/invoices", response_model=schemas.InvoiceResponse)
@@ -98,17 +106,19 @@ async def update_invoice_status(
     db.refresh(invoice)
     return invoice
 
-@router.get("/financial-records", response_model=List[schemas.FinancialRecordResponse])
+@router.get("/financial-records", response_model=List[schemas.FinancialRecordResponse], responses=NEXT_CURSOR_RESPONSES)
 async def get_financial_records(
+    response: Response,
     record_type: Optional[schemas.FinancialRecordTypeEnum] = None,
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1),
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get financial records with optional filtering"""
+    """Get financial records with optional filtering (pass X-Next-Cursor back as cursor for the next page)"""
     query = db.query(models.FinancialRecord)
     
     if record_type:
@@ -120,7 +130,8 @@ async def get_financial_records(
     if end_date:
         query = query.filter(models.FinancialRecord.record_date <= end_date)
     
-    records = query.order_by(models.FinancialRecord.record_date.desc()).offset(skip).limit(limit).all()
+    records = paginate(query, [(models.FinancialRecord.record_date, True), (models.FinancialRecord.record_id, True)],
+                       response, cursor, limit, skip)
     return records
 
 @router.post("/financial-records", response_model=schemas.FinancialRecordResponse)
@@ -132,10 +143,61 @@ async def create_financial_record(
     """Create a new financial record"""
     db_record = models.FinancialRecord(**record.dict())
     db.add(db_record)
+    # Keep the monthly rollup in step, in the same transaction
+    ledger_rollup.add_record(db, db_record)
     db.commit()
     db.refresh(db_record)
     return db_record
 
+@router.post("/import/{kind}", response_model=Dict[str, Any])
+async def import_records(
+    kind: str,
+    file: UploadFile = File(...),
+    file_format: Optional[str] = Query(None, alias="format"),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Bulk import financial records or invoices (kind) from a CSV or NDJSON file.
+    Rows are validated like the single-row endpoints; the report lists rejected rows by line.
+    """
+    if kind not in bulk_import.IMPORTERS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown import type: {kind}"
+        )
+    file_format = file_format or bulk_import.detect_format(file.filename, file.content_type)
+    if file_format not in bulk_import.FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported format: {file_format}"
+        )
+    
+    # Parsing and inserting block, so run them off the event loop on the worker's own session
+    report = await asyncio.to_thread(bulk_import.import_upload, kind, file.file, file_format)
+    return report
+
+@router.get("/export/{dataset}")
+async def export_records(
+    dataset: str,
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    file_format: str = Query("csv", alias="format"),
+    gzip: bool = False,
+    current_user: models.User = Depends(get_current_user)
+):
+    """Download financial records or invoices (dataset) as CSV or NDJSON, optionally gzipped"""
+    if dataset not in ("financial-records", "invoices"):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown export: {dataset}"
+        )
+    if file_format not in exporter.FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported format: {file_format}"
+        )
+    return exporter.export_response(dataset, file_format, start_date, end_date, gzip)
+
 @router.get("/financial-summary", response_model=Dict[str, Any])
 async def get_financial_summary(
     start_date: Optional[date] = Query(None),
@@ -150,66 +212,35 @@ async def get_financial_summary(
     if not end_date:
         end_date = datetime.now().date()
     
-    # Get financial records in date range
-    records = db.query(models.FinancialRecord).filter(
-        models.FinancialRecord.record_date >= start_date,
-        models.FinancialRecord.record_date <= end_date
-    ).all()
+    # Income and expense per month in date range: whole months from the rollup, edge months from raw records
+    ledger = ledger_rollup.load_ledger(db, start_date, end_date)
     
-    # Get invoices in date range
-    invoices = db.query(models.Invoice).filter(
+    # Invoice totals by status in date range
+    invoice_totals = dict(db.query(
+        models.Invoice.status,
+        func.sum(models.Invoice.amount)
+    ).filter(
         models.Invoice.created_at >= start_date,
         models.Invoice.created_at <= end_date
-    ).all()
-    
-    # Convert to dictionaries for AI service
-    record_dicts = []
-    for r in records:
-        record_dict = {
-            "record_id": r.record_id,
-            "record_type": r.record_type.value,
-            "amount": r.amount,
-            "description": r.description,
-            "record_date": r.record_date.isoformat()
-        }
-        record_dicts.append(record_dict)
+    ).group_by(models.Invoice.status).all())
     
     # Use AI service to analyze financial data
-    financial_analysis = AIService.analyze_financial_data(record_dicts)
+    financial_analysis = await AIService.analyze_financial_data_async(ledger=ledger)
     
-    # Calculate additional metrics
-    total_revenue = sum(r.amount for r in records if r.record_type == models.FinancialRecordType.income)
-    total_expenses = sum(r.amount for r in records if r.record_type == models.FinancialRecordType.expense)
+    total_revenue = ledger.total_income
+    total_expenses = ledger.total_expenses
     
     # Invoices statistics
-    total_invoiced = sum(i.amount for i in invoices)
-    paid_invoices = sum(i.amount for i in invoices if i.status == models.InvoiceStatus.paid)
-    pending_invoices = sum(i.amount for i in invoices if i.status == models.InvoiceStatus.pending)
-    overdue_invoices = sum(i.amount for i in invoices if i.status == models.InvoiceStatus.overdue)
+    total_invoiced = float(sum(amount or 0 for amount in invoice_totals.values()))
+    paid_invoices = float(invoice_totals.get(models.InvoiceStatus.paid) or 0)
+    pending_invoices = float(invoice_totals.get(models.InvoiceStatus.pending) or 0)
+    overdue_invoices = float(invoice_totals.get(models.InvoiceStatus.overdue) or 0)
     
-    # Monthly breakdown
-    monthly_breakdown = {}
-    for record in records:
-        month = record.record_date.strftime("%Y-%m")
-        if month not in monthly_breakdown:
-            monthly_breakdown[month] = {"income": 0, "expense": 0, "profit": 0}
-        
-        if record.record_type == models.FinancialRecordType.income:
-            monthly_breakdown[month]["income"] += record.amount
-        elif record.record_type == models.FinancialRecordType.expense:
-            monthly_breakdown[month]["expense"] += record.amount
-            
-        monthly_breakdown[month]["profit"] = monthly_breakdown[month]["income"] - monthly_breakdown[month]["expense"]
-    
-    # Convert to sorted list for better usability
-    monthly_data = []
-    for month, data in sorted(monthly_breakdown.items()):
-        monthly_data.append({
-            "month": month,
-            "income": data["income"],
-            "expense": data["expense"],
-            "profit": data["profit"]
-        })
+    # Monthly breakdown, sorted by month
+    monthly_data = [
+        {"month": m["month"], "income": m["income"], "expense": m["expense"], "profit": m["profit"]}
+        for m in ledger.monthly()
+    ]
     
     return {
         "period": {
@@ -247,93 +278,77 @@ async def analyze_cost(
     if not end_date:
         end_date = datetime.now().date()
     
-    # Get employees
-    employees = db.query(models.User).all()
+    # Employees with their role names
+    employees = db.query(
+        models.User.user_id,
+        models.User.name,
+        models.Role.role_name
+    ).outerjoin(models.Role, models.Role.role_id == models.User.role_id).order_by(models.User.user_id).all()
     
-    # Get attendance records
-    attendance = db.query(models.EmployeeAttendance).filter(
-        models.EmployeeAttendance.work_date >= start_date,
-        models.EmployeeAttendance.work_date <= end_date
-    ).all()
+    # Hours worked by employee, from the daily attendance rollup
+    employee_hours = attendance_service.hours_by_user(db, start_date, end_date)
     
-    # Get completed tasks
-    tasks = db.query(models.Task).filter(
+    completed_in_range = (
         models.Task.status == models.TaskStatus.completed,
         models.Task.end_time >= start_date,
         models.Task.end_time <= end_date
-    ).all()
+    )
+    
+    # Completed task hours by employee
+    employee_task_hours = {
+        user_id: float(hours or 0)
+        for user_id, hours in db.query(
+            models.Task.assigned_to,
+            func.sum(models.Task.actual_time)
+        ).filter(*completed_in_range).group_by(models.Task.assigned_to)
+    }
     
-    # Calculate hours worked by employee
-    employee_hours = {}
-    for record in attendance:
-        if record.login_time and record.logout_time:
-            hours = (record.logout_time - record.login_time).total_seconds() / 3600
-            
-            if record.user_id not in employee_hours:
-                employee_hours[record.user_id] = 0
-                
-            employee_hours[record.user_id] += hours
+    # Assuming average hourly rate (would come from payroll system in real app)
+    hourly_rate = 25  # Default hourly rate
     
-    # Get employee details and create final employee data
+    # Create final employee data and the department/role distribution
     employee_data = []
-    for emp in employees:
-        hours = employee_hours.get(emp.user_id, 0)
-        
-        # Get employee completed tasks
-        emp_tasks = [t for t in tasks if t.assigned_to == emp.user_id]
-        task_hours = sum(t.actual_time or 0 for t in emp_tasks)
-        
-        # Assuming average hourly rate (would come from payroll system in real app)
-        hourly_rate = 25  # Default hourly rate
+    role_distribution = {}
+    for user_id, name, role_name in employees:
+        hours = employee_hours.get(user_id, 0)
+        task_hours = employee_task_hours.get(user_id, 0)
         
         employee_data.append({
-            "user_id": emp.user_id,
-            "name": emp.name,
+            "user_id": user_id,
+            "name": name,
             "hours_worked": hours,
             "task_hours": task_hours,
             "productivity_ratio": (task_hours / hours) if hours > 0 else 0,
             "cost": hours * hourly_rate
         })
-    
-    # Calculate department/role distribution
-    role_distribution = {}
-    for emp in employees:
-        role = db.query(models.Role).filter(models.Role.role_id == emp.role_id).first()
-        role_name = role.role_name if role else "Unknown"
         
-        if role_name not in role_distribution:
-            role_distribution[role_name] = {
-                "count": 0,
-                "hours": 0,
-                "cost": 0
-            }
-        
-        role_distribution[role_name]["count"] += 1
-        role_distribution[role_name]["hours"] += employee_hours.get(emp.user_id, 0)
-        role_distribution[role_name]["cost"] += employee_hours.get(emp.user_id, 0) * 25  # Default hourly rate
+        role = role_distribution.setdefault(role_name or "Unknown", {"count": 0, "hours": 0, "cost": 0})
+        role["count"] += 1
+        role["hours"] += hours
+        role["cost"] += hours * hourly_rate
     
-    # Calculate client project costs
-    client_costs = {}
-    for task in tasks:
-        if task.client_id and task.actual_time:
-            if task.client_id not in client_costs:
-                client = db.query(models.Client).filter(models.Client.client_id == task.client_id).first()
-                client_name = client.client_name if client else f"Client {task.client_id}"
-                
-                client_costs[task.client_id] = {
-                    "client_id": task.client_id,
-                    "client_name": client_name,
-                    "hours": 0,
-                    "cost": 0,
-                    "task_count": 0
-                }
-            
-            client_costs[task.client_id]["hours"] += task.actual_time
-            client_costs[task.client_id]["cost"] += task.actual_time * 25  # Default hourly rate
-            client_costs[task.client_id]["task_count"] += 1
+    # Client project costs, from completed tasks with logged time
+    client_hours = db.query(
+        models.Task.client_id,
+        models.Client.client_name,
+        func.sum(models.Task.actual_time),
+        func.count(models.Task.task_id)
+    ).outerjoin(models.Client, models.Client.client_id == models.Task.client_id).filter(
+        *completed_in_range,
+        models.Task.client_id.isnot(None),
+        models.Task.actual_time != 0
+    ).group_by(models.Task.client_id, models.Client.client_name).all()
     
-    # Convert client costs to list
-    client_cost_list = list(client_costs.values())
+    client_cost_list = [
+        {
+            "client_id": client_id,
+            "client_name": client_name or f"Client {client_id}",
+            "hours": float(hours or 0),
+            "cost": float(hours or 0) * hourly_rate,
+            "task_count": task_count
+        }
+        for client_id, client_name, hours, task_count in client_hours
+    ]
     
     # Calculate totals
     total_hours = sum(emp["hours_worked"] for emp in employee_data)
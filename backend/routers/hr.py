@@ -1,5 +1,5 @@
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query, File, UploadFile
+from fastapi import APIRouter, Depends, HTTPException, status, Query, File, UploadFile, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
 from datetime import datetime, date, timedelta
@@ -7,22 +7,28 @@ import logging
 import json
 
 from database import get_db
+from pagination import NEXT_CURSOR_RESPONSES, paginate
 import models
 import schemas
 from routers.auth import get_current_user
 from services.ai_service import AIService
+from services import exporter
+from services import attendance as attendance_service
+from services import performance, resume_screening
 
 router = APIRouter()
 
-@router.get("/employees", response_model=List[schemas.UserResponse])
+@router.get("/employees", response_model=List[schemas.UserResponse], responses=NEXT_CURSOR_RESPONSES)
 async def get_employees(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    cursor: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1),
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get all employees"""
-    employees = db.query(models.User).offset(skip).limit(limit).all()
+    """Get all employees (pass X-Next-Cursor back as cursor for the next page)"""
+    employees = paginate(db.query(models.User), [(models.User.user_id, False)], response, cursor, limit, skip)
     return employees
 
 @router.get("/employees/{user_id}", response_model=schemas.UserResponse)
@@ -102,12 +108,8 @@ async def analyze_employee_performance(
             detail="Employee not found"
         )
     
-    # Get attendance data
-    attendance_data = db.query(models.EmployeeAttendance).filter(
-        models.EmployeeAttendance.user_id == user_id,
-        models.EmployeeAttendance.work_date >= start_date,
-        models.EmployeeAttendance.work_date <= end_date
-    ).all()
+    # Daily attendance summaries from the rollup
+    attendance_days = attendance_service.employee_days(db, user_id, start_date, end_date)
     
     # Get task data
     task_data = db.query(models.Task).filter(
@@ -118,12 +120,14 @@ async def analyze_employee_performance(
     
     # Convert to dictionaries for AI service
     attendance_dicts = []
-    for a in attendance_data:
+    for day in attendance_days:
         attendance_dict = {
-            "user_id": a.user_id,
-            "login_time": a.login_time.isoformat() if a.login_time else None,
-            "logout_time": a.logout_time.isoformat() if a.logout_time else None,
-            "work_date": a.work_date.isoformat()
+            "user_id": user_id,
+            "login_time": day["first_login"].isoformat() if day["first_login"] else None,
+            "logout_time": day["last_logout"].isoformat() if day["last_logout"] else None,
+            "work_date": day["work_date"].isoformat(),
+            "hours_worked": day["hours_worked"],
+            "is_late": day["is_late"]
         }
         attendance_dicts.append(attendance_dict)
     
@@ -141,7 +145,7 @@ async def analyze_employee_performance(
         task_dicts.append(task_dict)
     
     # Use AI service to analyze performance
-    performance_analysis = AIService.analyze_employee_performance(
+    performance_analysis = await AIService.analyze_employee_performance_async(
         attendance_data=attendance_dicts,
         task_data=task_dicts
     )
@@ -162,6 +166,83 @@ async def analyze_employee_performance(
     
     return result
 
+@router.post("/analyze-performance/team", response_model=Dict[str, Any])
+async def analyze_team_performance(
+    user_ids: Optional[List[int]] = Query(None),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    include_narratives: bool = False,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Analyze the performance of several employees (all when user_ids is omitted) in one pass"""
+    # Set default date range if not provided
+    if not start_date:
+        start_date = datetime.now().date() - timedelta(days=30)
+    if not end_date:
+        end_date = datetime.now().date()
+    
+    employees_query = db.query(models.User.user_id, models.User.name, models.User.email)
+    if user_ids:
+        employees_query = employees_query.filter(models.User.user_id.in_(user_ids))
+    employees = employees_query.order_by(models.User.user_id).all()
+    
+    if user_ids:
+        missing = sorted(set(user_ids) - {employee.user_id for employee in employees})
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Employees not found: {', '.join(str(user_id) for user_id in missing)}"
+            )
+    
+    team_ids = [employee.user_id for employee in employees]
+    
+    # Attendance days and tasks of the whole team, one query each
+    attendance_days = attendance_service.team_days(db, team_ids, start_date, end_date)
+    task_dicts = [
+        {
+            "user_id": assigned_to,
+            "status": task_status.value,
+            "estimated_time": estimated_time,
+            "actual_time": actual_time
+        }
+        for assigned_to, task_status, estimated_time, actual_time in db.query(
+            models.Task.assigned_to,
+            models.Task.status,
+            models.Task.estimated_time,
+            models.Task.actual_time
+        ).filter(
+            models.Task.assigned_to.in_(team_ids),
+            models.Task.created_at >= start_date,
+            models.Task.created_at <= end_date
+        )
+    ]
+    
+    # Every employee's metrics from grouped aggregations
+    metrics = performance.team_metrics(team_ids, attendance_days, task_dicts)
+    
+    # Narratives are optional; several employees share each completion
+    narratives = await AIService.analyze_team_performance_async(metrics) if include_narratives else {}
+    
+    return {
+        "date_range": {
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat()
+        },
+        "employees": [
+            {
+                "employee": {
+                    "user_id": employee.user_id,
+                    "name": employee.name,
+                    "email": employee.email
+                },
+                "metrics": metrics[employee.user_id],
+                **narratives.get(employee.user_id, {})
+            }
+            for employee in employees
+        ]
+    }
+
 @router.post("/resume-analysis", response_model=Dict[str, Any])
 async def analyze_resume(
     position: str,
@@ -174,53 +255,7 @@ async def analyze_resume(
         resume_content = await resume.read()
         resume_text = resume_content.decode("utf-8")
         
-        # Create prompt for OpenAI
-        prompt = f"""
-        Analyze this resume for a {position} position:
-        
-        Resume:
-        {resume_text}
-        
-        Provide:
-        1. Key skills identified
-        2. Years of experience
-        3. Education summary
-        4. Relevant experience highlights
-        5. Skills match score (0-100) for the position
-        6. Strengths
-        7. Gaps or areas for improvement
-        8. Overall recommendation (Reject, Consider, Interview, Strong Candidate)
-        
-        Format as JSON with these keys:
-        - key_skills (array)
-        - years_experience (number)
-        - education (string)
-        - relevant_experience (array)
-        - skills_match_score (number)
-        - strengths (array)
-        - gaps (array)
-        - recommendation (string)
-        """
-        
-        # Call OpenAI API
-        import openai
-        import json
-        
-        response = openai.ChatCompletion.create(
-            model="gpt-4o",
-            messages=[{"role": "system", "content": "You are an HR recruitment specialist that analyzes resumes and provides structured assessments. Always respond with valid JSON."},
-                      {"role": "user", "content": prompt}]
-        )
-        
-        response_text = response.choices[0].message.content.strip()
-        
-        # Extract JSON if embedded in text
-        import re
-        json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
-        if json_match:
-            response_text = json_match.group(1)
-        
-        analysis = json.loads(response_text)
+        analysis = await AIService.analyze_resume_async(resume_text, position)
         
         # Add metadata
         analysis["metadata"] = {
@@ -238,6 +273,72 @@ async def analyze_resume(
             detail="Error analyzing resume"
         )
 
+@router.post("/resume-screenings", response_model=Dict[str, Any])
+async def screen_resumes(
+    position: str,
+    files: List[UploadFile] = File(...),
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Screen a batch of PDF, DOCX or text resumes for a position and store the assessments"""
+    if len(files) > resume_screening.RESUME_MAX_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {resume_screening.RESUME_MAX_FILES} files can be screened at once"
+        )
+    
+    # Files are read as they go to the extraction workers rather than all up front
+    uploads = [(file.filename, file) for file in files]
+    
+    return await resume_screening.screen(db, position, uploads, current_user.user_id)
+
+@router.get("/resume-screenings", response_model=List[schemas.ResumeScreeningResponse], responses=NEXT_CURSOR_RESPONSES)
+async def get_resume_screenings(
+    response: Response,
+    position: Optional[str] = None,
+    min_score: Optional[float] = None,
+    recommendation: Optional[str] = None,
+    cursor: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1),
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get stored resume screenings, best match first (pass X-Next-Cursor back as cursor for the next page)"""
+    query = db.query(models.ResumeScreening)
+    
+    if position:
+        query = query.filter(models.ResumeScreening.position == position)
+    
+    if min_score is not None:
+        query = query.filter(models.ResumeScreening.skills_match_score >= min_score)
+    
+    if recommendation:
+        query = query.filter(models.ResumeScreening.recommendation == recommendation)
+    
+    screenings = paginate(
+        query,
+        [(models.ResumeScreening.skills_match_score, True), (models.ResumeScreening.screening_id, True)],
+        response, cursor, limit, skip
+    )
+    return screenings
+
+@router.get("/attendance/export")
+async def export_attendance(
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    file_format: str = Query("csv", alias="format"),
+    gzip: bool = False,
+    current_user: models.User = Depends(get_current_user)
+):
+    """Download attendance records as CSV or NDJSON, optionally gzipped"""
+    if file_format not in exporter.FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported format: {file_format}"
+        )
+    return exporter.export_response("attendance", file_format, start_date, end_date, gzip)
+
 @router.get("/attendance-stats", response_model=Dict[str, Any])
 async def get_attendance_stats(
     start_date: Optional[date] = Query(None),
@@ -252,42 +353,19 @@ async def get_attendance_stats(
     if not end_date:
         end_date = datetime.now().date()
     
-    # Get all attendance records in date range
-    attendance = db.query(models.EmployeeAttendance).filter(
-        models.EmployeeAttendance.work_date >= start_date,
-        models.EmployeeAttendance.work_date <= end_date
-    ).all()
+    total_employees = attendance_service.employee_count(db)
     
-    # Get all employees
-    employees = db.query(models.User).all()
-    total_employees = len(employees)
-    
-    # Group attendance by date
-    attendance_by_date = {}
-    for record in attendance:
-        date_str = record.work_date.isoformat()
-        if date_str not in attendance_by_date:
-            attendance_by_date[date_str] = []
-        attendance_by_date[date_str].append(record)
-    
-    # Calculate daily stats
+    # Present and late counts per day, grouped by the database
     daily_stats = []
-    for date_str, records in attendance_by_date.items():
-        present_count = len(records)
-        absent_count = total_employees - present_count
-        late_count = sum(1 for r in records if r.login_time and r.login_time.time() > datetime.strptime("09:15:00", "%H:%M:%S").time())
-        
+    for work_date, present_count, late_count in attendance_service.daily_counts(db, start_date, end_date):
         daily_stats.append({
-            "date": date_str,
+            "date": work_date.isoformat(),
             "present": present_count,
-            "absent": absent_count,
-            "late": late_count,
+            "absent": total_employees - present_count,
+            "late": int(late_count),
             "attendance_rate": (present_count / total_employees) * 100 if total_employees > 0 else 0
         })
     
-    # Sort by date
-    daily_stats.sort(key=lambda x: x["date"])
-    
     # Calculate averages
     avg_present = sum(day["present"] for day in daily_stats) / len(daily_stats) if daily_stats else 0
     avg_absent = sum(day["absent"] for day in daily_stats) / len(daily_stats) if daily_stats else 0
@@ -1,19 +1,89 @@
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, date, timedelta
 import logging
 import json
+import asyncio
 
 from database import get_db
 import models
 import schemas
 from routers.auth import get_current_user
 from services.ai_service import AIService
+from services.sse import sse_event, SSE_HEADERS
+from services.job_queue import job_queue
 
 router = APIRouter()
 
+class EmailCopyParser:
+    """
+    Extracts the subject line, body and call-to-action from generated email copy.
+    Text can be fed in pieces as it streams; each line is inspected once it is
+    complete, so the subject line is known as soon as the first line arrives.
+    """
+    def __init__(self):
+        self.subject_line = ""
+        self.cta_suggestion = ""
+        self._lines: List[str] = []
+        self._buffer = ""
+        self._body_after_subject = False
+    
+    def feed(self, text: str) -> List[Tuple[str, str]]:
+        """Consume more text and return any (field, value) pairs found in completed lines."""
+        self._buffer += text
+        if not self._lines:
+            self._buffer = self._buffer.lstrip()
+        found = []
+        while "\n" in self._buffer:
+            line, self._buffer = self._buffer.split("\n", 1)
+            found.extend(self._parse_line(line))
+        return found
+    
+    def _parse_line(self, line: str) -> List[Tuple[str, str]]:
+        found = []
+        self._lines.append(line)
+        
+        # Extract subject line
+        if len(self._lines) == 1:
+            if "subject" in line.lower():
+                subject_parts = line.split(":", 1)
+                if len(subject_parts) > 1:
+                    self.subject_line = subject_parts[1].strip()
+                    self._body_after_subject = True
+            else:  # First line might be the subject
+                self.subject_line = line.strip()
+                self._body_after_subject = True
+            found.append(("subject_line", self.subject_line))
+        
+        # Look for CTA
+        if not self.cta_suggestion and ("call to action" in line.lower() or "cta" in line.lower()):
+            cta_parts = line.split(":", 1)
+            if len(cta_parts) > 1:
+                self.cta_suggestion = cta_parts[1].strip()
+                found.append(("cta_suggestion", self.cta_suggestion))
+        
+        return found
+    
+    def close(self) -> Dict[str, str]:
+        """Parse any trailing partial line and return the extracted parts."""
+        if self._buffer or not self._lines:
+            self._parse_line(self._buffer.rstrip())
+            self._buffer = ""
+        
+        if self._body_after_subject:
+            body = '\n'.join(self._lines[1:]).strip()
+        else:
+            body = '\n'.join(self._lines).strip()
+        
+        return {
+            "subject_line": self.subject_line,
+            "email_body": body,
+            "cta_suggestion": self.cta_suggestion
+        }
+
 @router.post("/analyze-meeting", response_model=schemas.MeetingAnalysisResponse)
 async def analyze_meeting(
     request: schemas.MeetingAnalysisRequest,
@@ -22,7 +92,7 @@ async def analyze_meeting(
 ):
     """Analyze meeting transcript to extract action items and insights"""
     try:
-        result = AIService.analyze_meeting_transcript(
+        result = await AIService.analyze_meeting_transcript_async(
             transcript=request.transcript,
             meeting_type=request.meeting_type
         )
@@ -38,6 +108,19 @@ async def analyze_meeting(
             detail=f"Error analyzing meeting transcript: {str(e)}"
         )
 
+@router.post("/analyze-meeting/jobs", response_model=schemas.AIJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_meeting_analysis_job(
+    request: schemas.MeetingAnalysisRequest,
+    current_user: models.User = Depends(get_current_user)
+):
+    """Queue a meeting transcript analysis; poll /api/ai/jobs/{job_id} for the result"""
+    return await asyncio.to_thread(
+        job_queue.submit,
+        "analyze_meeting_transcript",
+        {"transcript": request.transcript, "meeting_type": request.meeting_type},
+        current_user.user_id
+    )
+
 @router.post("/campaign-insights", response_model=schemas.MarketingInsightResponse)
 async def get_campaign_insights(
     request: schemas.MarketingInsightRequest,
@@ -46,7 +129,7 @@ async def get_campaign_insights(
 ):
     """Generate insights from marketing campaign data"""
     try:
-        result = AIService.generate_marketing_insights(
+        result = await AIService.generate_marketing_insights_async(
             campaign_data=request.campaign_data,
             market_segment=request.market_segment
         )
@@ -69,21 +152,12 @@ async def get_campaign_insights(
             detail=f"Error generating campaign insights: {str(e)}"
         )
 
-@router.post("/generate-email-copy", response_model=Dict[str, Any])
-async def generate_email_copy(
-    campaign_type: str,
-    target_audience: str,
-    key_points: List[str],
-    tone: Optional[str] = "professional",
-    current_user: models.User = Depends(get_current_user)
-):
-    """Generate email marketing copy with AI"""
-    try:
-        # Combine key points into a string
-        key_points_text = "\n".join([f"- {point}" for point in key_points])
-        
-        # Create prompt for AI model
-        prompt = f"""
+def _email_copy_prompt(campaign_type: str, target_audience: str, key_points: List[str], tone: Optional[str]) -> str:
+    # Combine key points into a string
+    key_points_text = "\n".join([f"- {point}" for point in key_points])
+    
+    # Create prompt for AI model
+    return f"""
         Generate a marketing email with:
         
         Campaign Type: {campaign_type}
@@ -98,44 +172,32 @@ async def generate_email_copy(
         2. Email body with proper greeting and sign-off
         3. Call-to-action suggestion
         """
+
+@router.post("/generate-email-copy", response_model=Dict[str, Any])
+async def generate_email_copy(
+    campaign_type: str,
+    target_audience: str,
+    key_points: List[str],
+    tone: Optional[str] = "professional",
+    current_user: models.User = Depends(get_current_user)
+):
+    """Generate email marketing copy with AI"""
+    try:
+        prompt = _email_copy_prompt(campaign_type, target_audience, key_points, tone)
         
         # Call AI Service instead of direct OpenAI call
-        email_copy = AIService.generate_text(prompt, context="email_marketing")
+        email_copy = await AIService.generate_text_async(prompt, context="email_marketing")
         
         # Parse the response to extract parts
-        lines = email_copy.split('\n')
-        subject_line = ""
-        body = email_copy
-        cta = ""
-        
-        # Extract subject line
-        for i, line in enumerate(lines):
-            if "subject" in line.lower() or "subject line" in line.lower():
-                subject_parts = line.split(":", 1)
-                if len(subject_parts) > 1:
-                    subject_line = subject_parts[1].strip()
-                    body = '\n'.join(lines[i+1:]).strip()
-                break
-            elif i == 0:  # First line might be the subject
-                subject_line = line.strip()
-                body = '\n'.join(lines[1:]).strip()
-                break
-        
-        # Look for CTA
-        for line in lines:
-            if "call to action" in line.lower() or "cta" in line.lower():
-                cta_parts = line.split(":", 1)
-                if len(cta_parts) > 1:
-                    cta = cta_parts[1].strip()
-                    break
+        parser = EmailCopyParser()
+        parser.feed(email_copy)
+        parts = parser.close()
         
         # Log the generation for feedback collection
         logging.info(f"Email copy generated for campaign type: {campaign_type}, audience: {target_audience}")
         
         return {
-            "subject_line": subject_line,
-            "email_body": body,
-            "cta_suggestion": cta,
+            **parts,
             "campaign_type": campaign_type,
             "target_audience": target_audience,
             "tone": tone
@@ -148,6 +210,43 @@ async def generate_email_copy(
             detail=f"Error generating email copy: {str(e)}"
         )
 
+@router.post("/generate-email-copy/stream")
+async def stream_email_copy(
+    campaign_type: str,
+    target_audience: str,
+    key_points: List[str],
+    tone: Optional[str] = "professional",
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Generate email marketing copy with AI, streamed as server-sent events.
+    Emits "token" events as text arrives, "subject_line" and "cta_suggestion" as soon
+    as they are recognised, and a final "result" event with the parsed email.
+    """
+    prompt = _email_copy_prompt(campaign_type, target_audience, key_points, tone)
+    
+    async def events():
+        parser = EmailCopyParser()
+        try:
+            async for delta in AIService.stream_text_async(prompt, context="email_marketing"):
+                yield sse_event({"text": delta}, event="token")
+                for field, value in parser.feed(delta):
+                    yield sse_event({field: value}, event=field)
+            
+            logging.info(f"Email copy streamed for campaign type: {campaign_type}, audience: {target_audience}")
+            
+            yield sse_event({
+                **parser.close(),
+                "campaign_type": campaign_type,
+                "target_audience": target_audience,
+                "tone": tone
+            }, event="result")
+        except Exception as e:
+            logging.error(f"Error streaming email copy: {str(e)}")
+            yield sse_event({"detail": f"Error generating email copy: {str(e)}"}, event="error")
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
 @router.post("/analyze-market-trends", response_model=Dict[str, Any])
 async def analyze_market_trends(
     industry: str,
@@ -181,7 +280,7 @@ async def analyze_market_trends(
         """
         
         # Call AI Service instead of direct OpenAI call
-        response_text = AIService.generate_structured_response(prompt, output_format="json")
+        response_text = await AIService.generate_structured_response_async(prompt, output_format="json")
         
         # Process and clean the response
         analysis = json.loads(response_text)
@@ -216,31 +315,23 @@ async def analyze_market_trends(
             detail=f"Error analyzing market trends: {str(e)}"
         )
 
-@router.post("/ai/enhance-email-template", response_model=Dict[str, Any])
-async def enhance_email_template(
-    template_id: int,
-    improvement_focus: Optional[List[str]] = Query(["open_rate", "conversion", "engagement"]),
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Use AI to enhance an existing email template for better performance"""
-    try:
-        # Get the template from database
-        # In a real implementation, fetch from database
-        template = {
-            "id": template_id,
-            "name": "Sample Template",
-            "subject": "Special offer for [company_name]",
-            "body": "Dear [first_name],\n\nWe wanted to let you know about our special offer...",
-            "current_open_rate": 22.5,
-            "current_click_rate": 3.8,
-            "current_conversion_rate": 1.2
-        }
-        
-        # Create prompt for AI
-        improvement_focus_text = ", ".join(improvement_focus)
-        
-        prompt = f"""
+def _enhance_template_prompt(template_id: int, improvement_focus: List[str]) -> str:
+    # Get the template from database
+    # In a real implementation, fetch from database
+    template = {
+        "id": template_id,
+        "name": "Sample Template",
+        "subject": "Special offer for [company_name]",
+        "body": "Dear [first_name],\n\nWe wanted to let you know about our special offer...",
+        "current_open_rate": 22.5,
+        "current_click_rate": 3.8,
+        "current_conversion_rate": 1.2
+    }
+    
+    # Create prompt for AI
+    improvement_focus_text = ", ".join(improvement_focus)
+    
+    return f"""
         Enhance this email marketing template to improve {improvement_focus_text}.
         
         Current template:
@@ -266,9 +357,20 @@ async def enhance_email_template(
         - enhancements (array of improvements made)
         - expected_metrics (object with projected open_rate, click_rate, conversion_rate)
         """
+
+@router.post("/ai/enhance-email-template", response_model=Dict[str, Any])
+async def enhance_email_template(
+    template_id: int,
+    improvement_focus: Optional[List[str]] = Query(["open_rate", "conversion", "engagement"]),
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Use AI to enhance an existing email template for better performance"""
+    try:
+        prompt = _enhance_template_prompt(template_id, improvement_focus)
         
         # Call AI Service
-        response_text = AIService.generate_structured_response(prompt, output_format="json")
+        response_text = await AIService.generate_structured_response_async(prompt, output_format="json")
         enhancements = json.loads(response_text)
         
         # Add additional metadata
@@ -285,6 +387,38 @@ async def enhance_email_template(
             detail=f"Error enhancing email template: {str(e)}"
         )
 
+@router.post("/ai/enhance-email-template/stream")
+async def stream_enhanced_email_template(
+    template_id: int,
+    improvement_focus: Optional[List[str]] = Query(["open_rate", "conversion", "engagement"]),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Enhance an email template with AI, streamed as server-sent events.
+    Emits "token" events as the JSON is generated and a final "result" event with
+    the parsed enhancements.
+    """
+    prompt = _enhance_template_prompt(template_id, improvement_focus)
+    
+    async def events():
+        parts = []
+        try:
+            async for delta in AIService.stream_structured_response_async(prompt, output_format="json"):
+                parts.append(delta)
+                yield sse_event({"text": delta}, event="token")
+            
+            enhancements = json.loads(AIService.extract_json_text("".join(parts).strip()))
+            enhancements["original_template_id"] = template_id
+            enhancements["improvement_focus"] = improvement_focus
+            enhancements["generated_at"] = datetime.now().isoformat()
+            
+            yield sse_event(enhancements, event="result")
+        except Exception as e:
+            logging.error(f"Error streaming email template enhancement: {str(e)}")
+            yield sse_event({"detail": f"Error enhancing email template: {str(e)}"}, event="error")
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
 @router.post("/ai/analyze-campaign-performance", response_model=Dict[str, Any])
 async def analyze_campaign_performance(
     campaign_id: int,
@@ -358,7 +492,7 @@ async def analyze_campaign_performance(
         """
         
         # Call AI Service
-        response_text = AIService.generate_structured_response(prompt, output_format="json")
+        response_text = await AIService.generate_structured_response_async(prompt, output_format="json")
         analysis = json.loads(response_text)
         
         # Add additional metadata
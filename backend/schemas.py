@@ -1,5 +1,4 @@
-
-from pydantic import BaseModel, EmailStr, Field, validator
+from pydantic import BaseModel, EmailStr, Field, HttpUrl, validator
 from typing import List, Optional, Dict, Any, Union
 from datetime import datetime
 from enum import Enum
@@ -118,12 +117,47 @@ class TaskResponse(TaskBase):
     actual_time: Optional[float] = None
     start_time: Optional[datetime] = None
     end_time: Optional[datetime] = None
+    progress_description: Optional[str] = None
+    drive_link: Optional[str] = None
     created_at: datetime
     updated_at: datetime
     
     class Config:
         orm_mode = True
 
+class TaskProgressUpdate(BaseModel):
+    progress_description: Optional[str] = None
+    drive_link: Optional[HttpUrl] = None
+
+class TaskAttachmentResponse(BaseModel):
+    attachment_id: int
+    task_id: int
+    file_name: str
+    file_url: str
+    file_type: Optional[str] = None
+    file_size: int
+    checksum: Optional[str] = None
+    uploaded_by: Optional[int] = None
+    created_at: datetime
+    
+    class Config:
+        orm_mode = True
+
+# Resumable attachment uploads
+class AttachmentUploadCreate(BaseModel):
+    file_name: str
+    file_size: int = Field(..., gt=0)
+    file_type: Optional[str] = None
+    checksum: Optional[str] = Field(None, regex=r"^[0-9a-fA-F]{64}$")  # sha256, verified on completion
+
+class AttachmentUploadResponse(BaseModel):
+    upload_id: str
+    task_id: int
+    file_name: str
+    file_size: int
+    offset: int
+    chunk_size: int
+
 # Attendance schemas
 class AttendanceBase(BaseModel):
     user_id: int
@@ -274,3 +308,56 @@ class MarketingInsightResponse(BaseModel):
     performance_analysis: Dict[str, Any]
     trend_identification: List[str]
     optimization_suggestions: List[Dict[str, Any]]
+
+class AIBatchJob(BaseModel):
+    id: Optional[str] = None
+    method: str
+    params: Dict[str, Any] = {}
+    timeout: Optional[float] = None
+
+class AIBatchRequest(BaseModel):
+    jobs: List[AIBatchJob]
+    concurrency: Optional[int] = None
+    timeout: Optional[float] = None
+
+class SentimentBatchRequest(BaseModel):
+    messages: List[str]
+
+class AIJobStatusEnum(str, Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+class AIJobResponse(BaseModel):
+    job_id: str
+    job_type: str
+    status: AIJobStatusEnum
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    attempts: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    
+    @validator("status", pre=True)
+    def status_value(cls, v):
+        # ORM rows carry models.AIJobStatus members
+        return getattr(v, "value", v)
+    
+    class Config:
+        orm_mode = True
+
+# Resume screening schemas
+class ResumeScreeningResponse(BaseModel):
+    screening_id: int
+    position: str
+    content_hash: str
+    file_name: Optional[str] = None
+    skills_match_score: Optional[float] = None
+    recommendation: Optional[str] = None
+    analysis: Optional[Dict[str, Any]] = None
+    created_at: datetime
+    
+    class Config:
+        orm_mode = True
@@ -6,6 +6,7 @@ import sys
 from sqlalchemy.orm import Session
 from database import SessionLocal, engine
 import models
+from services import ledger_rollup, attendance_rollup
 from datetime import datetime, timedelta
 import logging
 import random
@@ -171,6 +172,7 @@ def seed_data():
             logger.info(f"Added employee: {emp_data['name']}")
             
         # Add attendance records for employees
+        seeded_days = []
         for employee in created_employees:
             # Today's attendance (if working hours)
             current_hour = datetime.now().hour
@@ -189,6 +191,7 @@ def seed_data():
                         work_date=datetime.now().date()
                     )
                     db.add(attendance)
+                    seeded_days.append((employee.user_id, datetime.now().date()))
                     logger.info(f"Added today's attendance for {employee.name}")
             
             # Previous days' attendance (last 7 days)
@@ -214,6 +217,10 @@ def seed_data():
                         work_date=work_date
                     )
                     db.add(attendance)
+                    seeded_days.append((employee.user_id, work_date))
+        
+        # Keep the daily attendance rollup in step with the new attendance
+        attendance_rollup.refresh_days(db, seeded_days)
         
         # Create tasks for employees with realistic status and progress
         if created_employees and clients:
@@ -303,6 +310,7 @@ def seed_data():
                     logger.info(f"Added task '{task_title}' for {employee.name} (Status: {status})")
         
         # Create some financial records for testing
+        financial_records = []
         for i in range(10):
             # Income records for each client
             for client_name, client in list(clients.items()):
@@ -319,6 +327,7 @@ def seed_data():
                         record_date=record_date
                     )
                     db.add(record)
+                    financial_records.append(record)
             
             # Expense records
             expense_categories = ["Office rent", "Utilities", "Salaries", "Software subscriptions", 
@@ -331,6 +340,10 @@ def seed_data():
                 record_date=datetime.now() - timedelta(days=random.randint(0, 365))
             )
             db.add(expense)
+            financial_records.append(expense)
+        
+        # Keep the monthly ledger rollup in step with the new records
+        ledger_rollup.add_records(db, [(r.record_type, r.amount, r.record_date) for r in financial_records])
         
         # Create invoices for clients
         for client_name, client in list(clients.items()):
@@ -0,0 +1,72 @@
+"""
+Batch execution of AIService analyses with bounded concurrency.
+
+Jobs run at most `concurrency` at a time, each under its own timeout, and
+results are yielded in completion order so callers can stream them back.
+"""
+import os
+import time
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from services.ai_service import AIService
+
+AI_BATCH_MAX_JOBS = int(os.getenv("AI_BATCH_MAX_JOBS", "200"))
+AI_BATCH_MAX_CONCURRENCY = int(os.getenv("AI_BATCH_MAX_CONCURRENCY", "16"))
+AI_BATCH_DEFAULT_CONCURRENCY = int(os.getenv("AI_BATCH_DEFAULT_CONCURRENCY", "8"))
+AI_BATCH_DEFAULT_TIMEOUT = float(os.getenv("AI_BATCH_DEFAULT_TIMEOUT", "60"))
+
+# AIService methods that can be run as batch jobs
+BATCH_METHODS = {
+    "analyze_client_input": AIService.analyze_client_input_async,
+    "analyze_platform_messages": AIService.analyze_platform_messages_async,
+    "predict_task_timeline": AIService.predict_task_timeline_async,
+    "analyze_meeting_transcript": AIService.analyze_meeting_transcript_async,
+    "generate_marketing_insights": AIService.generate_marketing_insights_async,
+    "analyze_financial_data": AIService.analyze_financial_data_async,
+    "analyze_employee_performance": AIService.analyze_employee_performance_async,
+    "analyze_task_progress": AIService.analyze_task_progress_async,
+    "analyze_resume": AIService.analyze_resume_async,
+}
+
+
+async def run_batch(jobs: List[Dict[str, Any]], concurrency: Optional[int] = None,
+                    timeout: Optional[float] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run jobs ({"id", "method", "params", "timeout"}) and yield one result per job
+    as soon as it finishes.
+    """
+    concurrency = max(1, min(concurrency or AI_BATCH_DEFAULT_CONCURRENCY, AI_BATCH_MAX_CONCURRENCY))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_job(index: int, job: Dict[str, Any]) -> Dict[str, Any]:
+        outcome = {
+            "index": index,
+            "id": job.get("id"),
+            "method": job["method"]
+        }
+        job_timeout = job.get("timeout") or timeout or AI_BATCH_DEFAULT_TIMEOUT
+        async with semaphore:
+            # The timeout only covers running time, not time spent queued
+            started = time.perf_counter()
+            try:
+                method = BATCH_METHODS[job["method"]]
+                result = await asyncio.wait_for(method(**job.get("params", {})), job_timeout)
+                outcome.update(status="ok", result=result)
+            except asyncio.TimeoutError:
+                outcome.update(status="timeout", error=f"Timed out after {job_timeout} seconds")
+            except Exception as e:
+                logging.error(f"Error in batch job {index} ({job['method']}): {str(e)}")
+                outcome.update(status="error", error=str(e))
+            outcome["elapsed"] = time.perf_counter() - started
+        return outcome
+
+    tasks = [asyncio.ensure_future(run_job(index, job)) for index, job in enumerate(jobs)]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        # Stop outstanding work if the consumer goes away
+        for task in tasks:
+            task.cancel()
@@ -1,37 +1,162 @@
 import os
+import asyncio
+import importlib
 import logging
-from typing import List, Dict, Any, Optional, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Iterable, List, Dict, Any, Optional, Union
 import json
-import openai
 from datetime import datetime
-import pandas as pd
-import nltk
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
 from dotenv import load_dotenv
 
+from services import llm_client
+from services.llm_client import ChatRequest
+from services import sentiment as sentiment_service
+from services.prompt_budget import build_history_context, count_tokens
+from services import transcripts
+from services.financial_aggregation import LedgerAggregate, aggregate_records
+
 # Load environment variables
 load_dotenv()
 
-# Configure OpenAI API
-openai.api_key = os.getenv("OPENAI_API_KEY")
+# pandas is slow to import, so it is loaded on first use (or by prewarm() after
+# startup) rather than when this module is imported.
+def prewarm():
+    """Load the deferred dependencies ahead of the first request that needs them."""
+    try:
+        importlib.import_module("pandas")
+        sentiment_service.get_analyzer()
+    except Exception as e:
+        logging.error(f"Error prewarming AI dependencies: {str(e)}")
+
+# Each AIService method is written once as a "steps" generator that yields a
+# ChatRequest whenever it needs a completion and receives the response text
+# back. The drivers below answer those requests either blocking or awaiting,
+# which gives every method a sync and an async entry point sharing one body.
+# Errors raised by the client are thrown back into the generator so each
+# method's own fallback handling still applies.
+#
+# A step may also yield a list mixing ChatRequests and plain callables (local
+# work such as sentiment scoring). The items of a list are independent of each
+# other, so the drivers run them concurrently and send back a list of results
+# in the same order.
+
+LLM_FANOUT_WORKERS = int(os.getenv("LLM_FANOUT_WORKERS", "16"))
+
+# Worker threads used by the blocking driver to run a batch of steps at once
+_fanout_pool = ThreadPoolExecutor(max_workers=LLM_FANOUT_WORKERS, thread_name_prefix="ai-fanout")
+
+def _answer(item):
+    if isinstance(item, ChatRequest):
+        return llm_client.complete(item)
+    return item()
+
+async def _answer_async(item):
+    if isinstance(item, ChatRequest):
+        return await llm_client.complete_async(item)
+    return await asyncio.to_thread(item)
+
+def _run(steps):
+    """Drive a steps generator to completion using the blocking client."""
+    try:
+        request = next(steps)
+        while True:
+            try:
+                if isinstance(request, list):
+                    response = list(_fanout_pool.map(_answer, request))
+                else:
+                    response = _answer(request)
+            except Exception as e:
+                request = steps.throw(e)
+            else:
+                request = steps.send(response)
+    except StopIteration as done:
+        return done.value
+
+async def _run_async(steps):
+    """Drive a steps generator to completion using the pooled async client."""
+    try:
+        request = next(steps)
+        while True:
+            try:
+                if isinstance(request, list):
+                    response = list(await asyncio.gather(*[_answer_async(item) for item in request]))
+                else:
+                    response = await _answer_async(request)
+            except Exception as e:
+                request = steps.throw(e)
+            else:
+                request = steps.send(response)
+    except StopIteration as done:
+        return done.value
 
-# Download NLTK resources if not already present
-try:
-    nltk.data.find('vader_lexicon')
-except LookupError:
-    nltk.download('vader_lexicon')
+def _in_batches(requests, size):
+    """Yield requests as concurrent batches of at most size, returning all responses in order."""
+    responses = []
+    for start in range(0, len(requests), max(1, size)):
+        responses.extend((yield requests[start:start + max(1, size)]))
+    return responses
 
-# Initialize sentiment analyzer
-sia = SentimentIntensityAnalyzer()
+def _parse_json(response_text: str) -> Dict[str, Any]:
+    """Parse a JSON completion, unwrapping a ```json fence if the model added one."""
+    import re
+    json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
+    if json_match:
+        response_text = json_match.group(1)
+    return json.loads(response_text)
+
+# Result of a meeting analysis that could not be completed
+MEETING_ANALYSIS_FALLBACK = {
+    "summary": "Error analyzing transcript.",
+    "action_items": [],
+    "key_insights": [],
+    "sentiment_analysis": {"sentiment": "neutral", "confidence": 0.5}
+}
+
+_PERFORMANCE_NARRATIVE_ERROR = {
+    "performance_assessment": {"rating": "unknown", "explanation": "Analysis error"},
+    "strengths": ["Unable to determine strengths"],
+    "improvement_areas": ["Unable to determine improvement areas"],
+    "recommendations": ["Unable to generate recommendations"]
+}
+
+def _performance_metrics_text(metrics: Dict[str, float]) -> str:
+    return (
+        f"Average Hours Worked per Day: {metrics['avg_hours_worked']:.2f} hours\n"
+        f"Punctuality Rate: {metrics['punctuality_rate']:.2f}%\n"
+        f"Task Completion Rate: {metrics['task_completion_rate']:.2f}%\n"
+        f"Average Time per Task: {metrics['avg_task_time']:.2f} hours\n"
+        f"Efficiency Rate (estimated vs actual time): {metrics['efficiency_rate']:.2f}%"
+    )
+
+def _performance_narrative(analysis: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "performance_assessment": analysis.get("performance_assessment", {}),
+        "strengths": analysis.get("strengths", []),
+        "improvement_areas": analysis.get("improvement_areas", []),
+        "recommendations": analysis.get("recommendations", [])
+    }
 
 class AIService:
     @staticmethod
-    def analyze_client_input(text: str, client_history: Optional[List[Dict[str, Any]]] = None, platform_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    def analyze_client_input(text: str, client_history: Optional[Union[Dict[str, Any], List[Dict[str, Any]]]] = None, platform_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Analyze client input using NLP to extract requirements, sentiment, and priority.
         Now supports platform communication data.
         """
+        return _run(AIService._analyze_client_input_steps(text, client_history, platform_data))
+
+    @staticmethod
+    async def analyze_client_input_async(text: str, client_history: Optional[Union[Dict[str, Any], List[Dict[str, Any]]]] = None, platform_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Awaitable variant of analyze_client_input."""
+        return await _run_async(AIService._analyze_client_input_steps(text, client_history, platform_data))
+
+    @staticmethod
+    def _analyze_client_input_steps(text: str, client_history: Optional[Union[Dict[str, Any], List[Dict[str, Any]]]] = None, platform_data: Optional[Dict[str, Any]] = None):
         try:
+            # Sentiment is scored per message and averaged, so the client's own
+            # words and each platform message count equally
+            sentiment_texts = [text] if text else []
+            
             # Combine platform data if available
             if platform_data:
                 platform_text = f"\nPlatform Communications:\n"
@@ -39,21 +164,35 @@ class AIService:
                     platform_text += f"\n--- {platform.capitalize()} Messages ---\n"
                     for msg in messages[:5]:  # Limit to 5 messages per platform
                         platform_text += f"{msg.get('sender', 'Unknown')}: {msg.get('content', '')}\n"
+                    sentiment_texts.extend(msg.get('content', '') for msg in messages if msg.get('content'))
                 
                 text = text + platform_text
             
-            # Extract key requirements using OpenAI
-            requirements_prompt = f"Extract the key requirements or tasks from this client input:\n\n{text}\n\nList only the requirements, one per line."
-            requirements_response = openai.ChatCompletion.create(
-                model="gpt-4o",
-                messages=[{"role": "system", "content": "You are a helpful assistant that extracts key requirements from client inputs."},
-                          {"role": "user", "content": requirements_prompt}]
-            )
-            requirements_text = requirements_response.choices[0].message.content.strip()
+            sentiment_scores = sentiment_service.score_batch(sentiment_texts)["aggregate"]
+            
+            # Past tasks and messages are compacted to fit the prompt budget
+            history_text = build_history_context(text, client_history)
+            history_section = f"Relevant client history:\n{history_text}\n\n" if history_text else ""
+            
+            # Requirements extraction and task suggestion only depend on the
+            # input text, so they run concurrently
+            requirements_prompt = f"Extract the key requirements or tasks from this client input:\n\n{text}\n\n{history_section}List only the requirements, one per line."
+            tasks_prompt = f"Based on this client input:\n\n{text}\n\n{history_section}Generate 3-5 actionable tasks that should be created. For each task, provide a title, brief description, and estimated hours to complete."
+            requirements_text, tasks_text = yield [
+                ChatRequest(
+                    system="You are a helpful assistant that extracts key requirements from client inputs.",
+                    prompt=requirements_prompt,
+                    task="extract_client_requirements"
+                ),
+                ChatRequest(
+                    system="You are a helpful assistant that generates actionable tasks from client requirements.",
+                    prompt=tasks_prompt,
+                    task="suggest_client_tasks"
+                )
+            ]
             requirements = [req.strip() for req in requirements_text.split('\n') if req.strip()]
             
             # Analyze sentiment
-            sentiment_scores = sia.polarity_scores(text)
             if sentiment_scores['compound'] >= 0.05:
                 sentiment = "positive"
             elif sentiment_scores['compound'] <= -0.05:
@@ -79,15 +218,6 @@ class AIService:
             else:
                 priority = "low"
             
-            # Generate suggested tasks using OpenAI
-            tasks_prompt = f"Based on this client input:\n\n{text}\n\nGenerate 3-5 actionable tasks that should be created. For each task, provide a title, brief description, and estimated hours to complete."
-            tasks_response = openai.ChatCompletion.create(
-                model="gpt-4o",
-                messages=[{"role": "system", "content": "You are a helpful assistant that generates actionable tasks from client requirements."},
-                          {"role": "user", "content": tasks_prompt}]
-            )
-            tasks_text = tasks_response.choices[0].message.content.strip()
-            
             # Parse the tasks
             suggested_tasks = []
             for line in tasks_text.split('\n'):
@@ -135,6 +265,15 @@ class AIService:
         """
         Analyze messages from external platforms like Slack, Discord, etc.
         """
+        return _run(AIService._analyze_platform_messages_steps(messages, client_name))
+
+    @staticmethod
+    async def analyze_platform_messages_async(messages: List[Dict[str, Any]], client_name: Optional[str] = None) -> Dict[str, Any]:
+        """Awaitable variant of analyze_platform_messages."""
+        return await _run_async(AIService._analyze_platform_messages_steps(messages, client_name))
+
+    @staticmethod
+    def _analyze_platform_messages_steps(messages: List[Dict[str, Any]], client_name: Optional[str] = None):
         try:
             if not messages:
                 return {
@@ -165,7 +304,7 @@ class AIService:
                     text += f"{sender} ({timestamp}): {content}\n"
             
             # Use the existing client input analysis function with the formatted text
-            return AIService.analyze_client_input(text)
+            return (yield from AIService._analyze_client_input_steps(text))
             
         except Exception as e:
             logging.error(f"Error analyzing platform messages: {str(e)}")
@@ -181,6 +320,15 @@ class AIService:
         """
         Predict task timeline and complexity based on description and historical data.
         """
+        return _run(AIService._predict_task_timeline_steps(task_description, client_history))
+
+    @staticmethod
+    async def predict_task_timeline_async(task_description: str, client_history: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Awaitable variant of predict_task_timeline."""
+        return await _run_async(AIService._predict_task_timeline_steps(task_description, client_history))
+
+    @staticmethod
+    def _predict_task_timeline_steps(task_description: str, client_history: Optional[List[Dict[str, Any]]] = None):
         try:
             # Use OpenAI to analyze the task
             prompt = f"""
@@ -199,15 +347,12 @@ class AIService:
             potential_challenges (array of strings)
             """
             
-            response = openai.ChatCompletion.create(
-                model="gpt-4o",
-                messages=[{"role": "system", "content": "You are a helpful assistant that analyzes tasks and provides structured information. Always respond with valid JSON."},
-                          {"role": "user", "content": prompt}]
+            response_text = yield ChatRequest(
+                system="You are a helpful assistant that analyzes tasks and provides structured information. Always respond with valid JSON.",
+                prompt=prompt,
+                task="predict_task_timeline"
             )
             
-            # Extract and parse the JSON response
-            response_text = response.choices[0].message.content.strip()
-            
             # Extract JSON if embedded in text
             import re
             json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
@@ -237,7 +382,29 @@ class AIService:
         """
         Analyze meeting transcript to extract summary, action items, and insights.
         """
+        return _run(AIService._analyze_meeting_transcript_steps(transcript, meeting_type))
+
+    @staticmethod
+    async def analyze_meeting_transcript_async(transcript: str, meeting_type: str) -> Dict[str, Any]:
+        """Awaitable variant of analyze_meeting_transcript."""
+        return await _run_async(AIService._analyze_meeting_transcript_steps(transcript, meeting_type))
+
+    @staticmethod
+    def analyze_meeting_transcript_or_raise(transcript: str, meeting_type: str) -> Dict[str, Any]:
+        """
+        Like analyze_meeting_transcript, but raises when the completion or its parsing
+        fails instead of returning the fallback, so background jobs can retry it.
+        """
+        return _run(AIService._analyze_meeting_transcript_steps(transcript, meeting_type, raise_errors=True))
+
+    @staticmethod
+    def _analyze_meeting_transcript_steps(transcript: str, meeting_type: str, raise_errors: bool = False):
         try:
+            chunks = transcripts.split_transcript(transcript)
+            if len(chunks) > 1:
+                # Too long for one prompt: analyse the chunks concurrently, then merge
+                return (yield from AIService._analyze_long_meeting_steps(chunks, meeting_type))
+
             # Use OpenAI to analyze the meeting transcript
             prompt = f"""
             Analyze this {meeting_type} meeting transcript and provide:
@@ -256,22 +423,13 @@ class AIService:
             sentiment_analysis (object with overall sentiment and confidence score)
             """
             
-            response = openai.ChatCompletion.create(
-                model="gpt-4o",
-                messages=[{"role": "system", "content": "You are a helpful assistant that analyzes meeting transcripts and extracts key information. Always respond with valid JSON."},
-                          {"role": "user", "content": prompt}]
+            response_text = yield ChatRequest(
+                system="You are a helpful assistant that analyzes meeting transcripts and extracts key information. Always respond with valid JSON.",
+                prompt=prompt,
+                task="analyze_meeting_transcript"
             )
             
-            # Extract and parse the JSON response
-            response_text = response.choices[0].message.content.strip()
-            
-            # Extract JSON if embedded in text
-            import re
-            json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
-            if json_match:
-                response_text = json_match.group(1)
-            
-            analysis = json.loads(response_text)
+            analysis = _parse_json(response_text)
             
             return {
                 "summary": analysis.get("summary", "No summary available."),
@@ -281,19 +439,95 @@ class AIService:
             }
             
         except Exception as e:
+            if raise_errors:
+                raise
             logging.error(f"Error analyzing meeting transcript: {str(e)}")
-            return {
-                "summary": "Error analyzing transcript.",
-                "action_items": [],
-                "key_insights": [],
-                "sentiment_analysis": {"sentiment": "neutral", "confidence": 0.5}
-            }
+            return dict(MEETING_ANALYSIS_FALLBACK)
+
+    @staticmethod
+    def _analyze_long_meeting_steps(chunks: List[str], meeting_type: str):
+        """Map-reduce over transcript chunks: per-chunk analyses, local merging, then a summary of summaries."""
+        system = "You are a helpful assistant that analyzes meeting transcripts and extracts key information. Always respond with valid JSON."
+        requests = []
+        for index, chunk in enumerate(chunks, start=1):
+            prompt = f"""
+            This is part {index} of {len(chunks)} of a {meeting_type} meeting transcript.
+            Consecutive parts overlap slightly. Analyze only this part and provide:
+            1. A brief summary of this part (2-3 sentences)
+            2. Action items agreed in this part, with assignee if mentioned
+            3. Key insights or decisions made in this part
+            4. A sentiment analysis (positive, neutral, negative)
+            
+            Transcript part:
+            {chunk}
+            
+            Format the response as valid JSON with these fields:
+            summary (string),
+            action_items (array of objects with "task" and "assignee" fields),
+            key_insights (array of strings),
+            sentiment_analysis (object with "sentiment" and "confidence" fields)
+            """
+            requests.append(ChatRequest(system=system, prompt=prompt, task="analyze_meeting_chunk"))
+
+        responses = yield from _in_batches(requests, transcripts.MEETING_CHUNK_CONCURRENCY)
+
+        partials = []
+        weights = []
+        for chunk, response_text in zip(chunks, responses):
+            try:
+                partials.append(_parse_json(response_text))
+                weights.append(count_tokens(chunk))
+            except Exception as e:
+                # One unreadable part should not sink the whole analysis
+                logging.error(f"Error parsing meeting transcript chunk analysis: {str(e)}")
+        if not partials:
+            raise ValueError("No transcript chunk could be analyzed")
+
+        # Reduce the partial summaries, in rounds if they do not fit in one prompt
+        summaries = [str(partial.get("summary", "")).strip() for partial in partials if partial.get("summary")]
+        while len(summaries) > 1:
+            groups = transcripts.group_by_tokens(summaries)
+            if len(groups) >= len(summaries):
+                groups = [summaries[start:start + 2] for start in range(0, len(summaries), 2)]
+            requests = []
+            for group in groups:
+                prompt = f"""
+                Combine these consecutive summaries of parts of a {meeting_type} meeting
+                into a single brief summary (2-3 sentences) of the whole. Reply with the summary only.
+                
+                Summaries:
+                {chr(10).join(f"- {summary}" for summary in group)}
+                """
+                requests.append(ChatRequest(
+                    system="You are a helpful assistant that summarizes meetings concisely.",
+                    prompt=prompt,
+                    task="summarize_meeting_chunks"
+                ))
+            summaries = [response.strip() for response in (yield from _in_batches(requests, transcripts.MEETING_CHUNK_CONCURRENCY))]
+
+        return {
+            "summary": summaries[0] if summaries else "No summary available.",
+            "action_items": transcripts.merge_action_items([partial.get("action_items", []) for partial in partials]),
+            "key_insights": transcripts.merge_insights([partial.get("key_insights", []) for partial in partials]),
+            "sentiment_analysis": transcripts.combine_sentiments(
+                [partial.get("sentiment_analysis") for partial in partials], weights
+            )
+        }
     
     @staticmethod
     def generate_marketing_insights(campaign_data: Dict[str, Any], market_segment: Optional[str] = None) -> Dict[str, Any]:
         """
         Generate marketing insights from campaign data.
         """
+        return _run(AIService._generate_marketing_insights_steps(campaign_data, market_segment))
+
+    @staticmethod
+    async def generate_marketing_insights_async(campaign_data: Dict[str, Any], market_segment: Optional[str] = None) -> Dict[str, Any]:
+        """Awaitable variant of generate_marketing_insights."""
+        return await _run_async(AIService._generate_marketing_insights_steps(campaign_data, market_segment))
+
+    @staticmethod
+    def _generate_marketing_insights_steps(campaign_data: Dict[str, Any], market_segment: Optional[str] = None):
         try:
             # Prepare the prompt with campaign data and market segment
             prompt = f"""
@@ -315,15 +549,12 @@ class AIService:
             optimization_suggestions (array of objects with "area" and "suggestion" fields)
             """
             
-            response = openai.ChatCompletion.create(
-                model="gpt-4o",
-                messages=[{"role": "system", "content": "You are a marketing analyst that provides data-driven insights. Always respond with valid JSON."},
-                          {"role": "user", "content": prompt}]
+            response_text = yield ChatRequest(
+                system="You are a marketing analyst that provides data-driven insights. Always respond with valid JSON.",
+                prompt=prompt,
+                task="generate_marketing_insights"
             )
             
-            # Extract and parse the JSON response
-            response_text = response.choices[0].message.content.strip()
-            
             # Extract JSON if embedded in text
             import re
             json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
@@ -347,45 +578,29 @@ class AIService:
             }
     
     @staticmethod
-    def analyze_financial_data(financial_records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def analyze_financial_data(financial_records: Optional[Iterable[Dict[str, Any]]] = None, ledger: Optional[LedgerAggregate] = None) -> Dict[str, Any]:
         """
         Analyze financial records to generate insights and predictions.
+        Callers that have already aggregated the records can pass the ledger instead.
         """
+        return _run(AIService._analyze_financial_data_steps(financial_records, ledger))
+
+    @staticmethod
+    async def analyze_financial_data_async(financial_records: Optional[Iterable[Dict[str, Any]]] = None, ledger: Optional[LedgerAggregate] = None) -> Dict[str, Any]:
+        """Awaitable variant of analyze_financial_data."""
+        return await _run_async(AIService._analyze_financial_data_steps(financial_records, ledger))
+
+    @staticmethod
+    def _analyze_financial_data_steps(financial_records: Optional[Iterable[Dict[str, Any]]] = None, ledger: Optional[LedgerAggregate] = None):
         try:
-            # Convert to DataFrame for analysis
-            df = pd.DataFrame(financial_records)
-            
-            # Calculate basic metrics
-            total_income = df[df['record_type'] == 'income']['amount'].sum()
-            total_expenses = df[df['record_type'] == 'expense']['amount'].sum()
-            net_profit = total_income - total_expenses
-            profit_margin = (net_profit / total_income) * 100 if total_income > 0 else 0
-            
-            # Group by date for trend analysis
-            if 'record_date' in df.columns:
-                df['record_date'] = pd.to_datetime(df['record_date'])
-                df['month'] = df['record_date'].dt.strftime('%Y-%m')
-                monthly_data = df.groupby(['month', 'record_type'])['amount'].sum().unstack().fillna(0)
-                
-                # Calculate monthly profit
-                if 'income' in monthly_data.columns and 'expense' in monthly_data.columns:
-                    monthly_data['profit'] = monthly_data['income'] - monthly_data['expense']
-                    
-                    # Calculate growth rates
-                    monthly_data['profit_growth'] = monthly_data['profit'].pct_change() * 100
-                    
-                    # Identify positive and negative trends
-                    positive_months = monthly_data[monthly_data['profit_growth'] > 5].index.tolist()
-                    negative_months = monthly_data[monthly_data['profit_growth'] < -5].index.tolist()
-                    
-                    # Last 3 months trend
-                    recent_trend = "stable"
-                    if len(monthly_data) >= 3:
-                        last_3_months = monthly_data['profit_growth'].tail(3).mean()
-                        if last_3_months > 5:
-                            recent_trend = "positive"
-                        elif last_3_months < -5:
-                            recent_trend = "negative"
+            if ledger is None:
+                ledger = aggregate_records(financial_records or [])
+            metrics = ledger.summary()
+            total_income = metrics["total_income"]
+            total_expenses = metrics["total_expenses"]
+            net_profit = metrics["net_profit"]
+            profit_margin = metrics["profit_margin"]
+            recent_trend = metrics["recent_trend"]
             
             # Use OpenAI for deeper analysis and recommendations
             prompt = f"""
@@ -410,15 +625,12 @@ class AIService:
             prediction (string)
             """
             
-            response = openai.ChatCompletion.create(
-                model="gpt-4o",
-                messages=[{"role": "system", "content": "You are a financial analyst that provides data-driven insights. Always respond with valid JSON."},
-                          {"role": "user", "content": prompt}]
+            response_text = yield ChatRequest(
+                system="You are a financial analyst that provides data-driven insights. Always respond with valid JSON.",
+                prompt=prompt,
+                task="analyze_financial_data"
             )
             
-            # Extract and parse the JSON response
-            response_text = response.choices[0].message.content.strip()
-            
             # Extract JSON if embedded in text
             import re
             json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
@@ -462,52 +674,26 @@ class AIService:
         """
         Analyze employee performance based on attendance and task completion.
         """
+        return _run(AIService._analyze_employee_performance_steps(attendance_data, task_data))
+
+    @staticmethod
+    async def analyze_employee_performance_async(attendance_data: List[Dict[str, Any]], task_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Awaitable variant of analyze_employee_performance."""
+        return await _run_async(AIService._analyze_employee_performance_steps(attendance_data, task_data))
+
+    @staticmethod
+    def _analyze_employee_performance_steps(attendance_data: List[Dict[str, Any]], task_data: List[Dict[str, Any]]):
         try:
-            # Convert to DataFrames
-            attendance_df = pd.DataFrame(attendance_data)
-            task_df = pd.DataFrame(task_data)
-            
-            # Calculate attendance metrics
-            attendance_df['login_time'] = pd.to_datetime(attendance_df['login_time'])
-            attendance_df['logout_time'] = pd.to_datetime(attendance_df['logout_time'])
-            attendance_df['work_date'] = pd.to_datetime(attendance_df['work_date'])
-            
-            # Calculate hours worked
-            attendance_df['hours_worked'] = (attendance_df['logout_time'] - attendance_df['login_time']).dt.total_seconds() / 3600
-            
-            # Calculate punctuality (assuming workday starts at 9 AM)
-            attendance_df['time_of_day'] = attendance_df['login_time'].dt.time
-            attendance_df['is_late'] = attendance_df['time_of_day'] > pd.to_datetime('09:15:00').time()
-            
-            avg_hours_worked = attendance_df['hours_worked'].mean()
-            punctuality_rate = 100 - (attendance_df['is_late'].mean() * 100)
+            from services.performance import employee_metrics
             
-            # Calculate task metrics
-            task_completion_rate = 0
-            avg_task_time = 0
-            efficiency_rate = 0
-            
-            if not task_df.empty and 'status' in task_df.columns:
-                task_completion_rate = (task_df['status'] == 'completed').mean() * 100
-                
-                if 'actual_time' in task_df.columns and 'estimated_time' in task_df.columns:
-                    completed_tasks = task_df[task_df['status'] == 'completed']
-                    if not completed_tasks.empty:
-                        avg_task_time = completed_tasks['actual_time'].mean()
-                        
-                        # Calculate efficiency (estimated vs actual time)
-                        completed_tasks['efficiency'] = completed_tasks['estimated_time'] / completed_tasks['actual_time']
-                        efficiency_rate = completed_tasks['efficiency'].mean() * 100
+            # Attendance and task metrics; daily rollup rows carry hours_worked and is_late already
+            metrics = employee_metrics(attendance_data, task_data)
             
             # Use AI to analyze the metrics and provide insights
             prompt = f"""
             Analyze these employee performance metrics and provide insights:
             
-            Average Hours Worked per Day: {avg_hours_worked:.2f} hours
-            Punctuality Rate: {punctuality_rate:.2f}%
-            Task Completion Rate: {task_completion_rate:.2f}%
-            Average Time per Task: {avg_task_time:.2f} hours
-            Efficiency Rate (estimated vs actual time): {efficiency_rate:.2f}%
+            {_performance_metrics_text(metrics)}
             
             Provide:
             1. A performance assessment
@@ -522,35 +708,17 @@ class AIService:
             recommendations (array of strings)
             """
             
-            response = openai.ChatCompletion.create(
-                model="gpt-4o",
-                messages=[{"role": "system", "content": "You are an HR analyst that provides balanced, data-driven insights about employee performance. Always respond with valid JSON."},
-                          {"role": "user", "content": prompt}]
+            response_text = yield ChatRequest(
+                system="You are an HR analyst that provides balanced, data-driven insights about employee performance. Always respond with valid JSON.",
+                prompt=prompt,
+                task="analyze_employee_performance"
             )
             
-            # Extract and parse the JSON response
-            response_text = response.choices[0].message.content.strip()
-            
-            # Extract JSON if embedded in text
-            import re
-            json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
-            if json_match:
-                response_text = json_match.group(1)
-            
-            analysis = json.loads(response_text)
+            analysis = _parse_json(response_text)
             
             return {
-                "metrics": {
-                    "avg_hours_worked": avg_hours_worked,
-                    "punctuality_rate": punctuality_rate,
-                    "task_completion_rate": task_completion_rate,
-                    "avg_task_time": avg_task_time,
-                    "efficiency_rate": efficiency_rate
-                },
-                "performance_assessment": analysis.get("performance_assessment", {}),
-                "strengths": analysis.get("strengths", []),
-                "improvement_areas": analysis.get("improvement_areas", []),
-                "recommendations": analysis.get("recommendations", [])
+                "metrics": metrics,
+                **_performance_narrative(analysis)
             }
             
         except Exception as e:
@@ -563,18 +731,92 @@ class AIService:
                     "avg_task_time": 0,
                     "efficiency_rate": 0
                 },
-                "performance_assessment": {"rating": "unknown", "explanation": "Analysis error"},
-                "strengths": ["Unable to determine strengths"],
-                "improvement_areas": ["Unable to determine improvement areas"],
-                "recommendations": ["Unable to generate recommendations"]
+                **_PERFORMANCE_NARRATIVE_ERROR
             }
     
+    @staticmethod
+    def analyze_team_performance(metrics: Dict[int, Dict[str, float]]) -> Dict[int, Dict[str, Any]]:
+        """
+        Generate performance narratives for many employees from their precomputed
+        metrics (see services.performance.team_metrics), several employees per completion.
+        """
+        return _run(AIService._analyze_team_performance_steps(metrics))
+
+    @staticmethod
+    async def analyze_team_performance_async(metrics: Dict[int, Dict[str, float]]) -> Dict[int, Dict[str, Any]]:
+        """Awaitable variant of analyze_team_performance."""
+        return await _run_async(AIService._analyze_team_performance_steps(metrics))
+
+    @staticmethod
+    def _analyze_team_performance_steps(metrics: Dict[int, Dict[str, float]]):
+        from services.performance import TEAM_NARRATIVE_BATCH_SIZE, TEAM_NARRATIVE_CONCURRENCY
+        
+        system = "You are an HR analyst that provides balanced, data-driven insights about employee performance. Always respond with valid JSON."
+        user_ids = list(metrics)
+        size = max(1, TEAM_NARRATIVE_BATCH_SIZE)
+        batches = [user_ids[start:start + size] for start in range(0, len(user_ids), size)]
+        requests = []
+        for batch in batches:
+            employees = "\n\n".join(
+                f"Employee {user_id}:\n{_performance_metrics_text(metrics[user_id])}" for user_id in batch
+            )
+            prompt = f"""
+            Analyze the performance metrics of each of these employees and provide insights for each one:
+            
+            {employees}
+            
+            For each employee provide:
+            1. A performance assessment
+            2. Strengths based on these metrics
+            3. Areas for improvement
+            4. Specific recommendations to enhance productivity
+            
+            Format the response as a valid JSON object whose keys are the employee numbers
+            and whose values are objects with these fields:
+            performance_assessment (object with rating and explanation),
+            strengths (array of strings),
+            improvement_areas (array of strings),
+            recommendations (array of strings)
+            """
+            requests.append(ChatRequest(system=system, prompt=prompt, task="analyze_team_performance"))
+        
+        try:
+            responses = yield from _in_batches(requests, TEAM_NARRATIVE_CONCURRENCY)
+        except Exception as e:
+            logging.error(f"Error analyzing team performance: {str(e)}")
+            return {user_id: dict(_PERFORMANCE_NARRATIVE_ERROR) for user_id in user_ids}
+        
+        narratives = {}
+        for batch, response_text in zip(batches, responses):
+            try:
+                analyses = _parse_json(response_text)
+            except ValueError as e:
+                logging.error(f"Error parsing team performance analysis: {str(e)}")
+                analyses = {}
+            if not isinstance(analyses, dict):
+                # Valid JSON but not keyed by employee; every employee in the batch gets the fallback
+                logging.error(f"Team performance analysis is a {type(analyses).__name__}, not an object")
+                analyses = {}
+            for user_id in batch:
+                analysis = analyses.get(str(user_id))
+                narratives[user_id] = _performance_narrative(analysis) if isinstance(analysis, dict) else dict(_PERFORMANCE_NARRATIVE_ERROR)
+        return narratives
+    
     @staticmethod
     def analyze_task_progress(context: Dict[str, Any]) -> Dict[str, Any]:
         """
         Analyze task progress and generate insights based on the progress description,
         attachments, and drive links.
         """
+        return _run(AIService._analyze_task_progress_steps(context))
+
+    @staticmethod
+    async def analyze_task_progress_async(context: Dict[str, Any]) -> Dict[str, Any]:
+        """Awaitable variant of analyze_task_progress."""
+        return await _run_async(AIService._analyze_task_progress_steps(context))
+
+    @staticmethod
+    def _analyze_task_progress_steps(context: Dict[str, Any]):
         try:
             # Extract relevant information from context
             task_title = context.get('task_title', '')
@@ -622,17 +864,12 @@ class AIService:
             potential_issues (array of strings)
             """
             
-            response = openai.ChatCompletion.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "You are an AI assistant that analyzes task progress and provides helpful insights. Be concise and practical with your insights."},
-                    {"role": "user", "content": prompt}
-                ]
+            response_text = yield ChatRequest(
+                system="You are an AI assistant that analyzes task progress and provides helpful insights. Be concise and practical with your insights.",
+                prompt=prompt,
+                task="analyze_task_progress"
             )
             
-            # Extract and parse the JSON response
-            response_text = response.choices[0].message.content.strip()
-            
             # Extract JSON if embedded in text
             import re
             json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
@@ -665,3 +902,171 @@ class AIService:
                 ],
                 "potential_issues": []
             }
+    
+    @staticmethod
+    def analyze_resume(resume_text: str, position: str) -> Dict[str, Any]:
+        """
+        Analyze a resume against a position for recruitment.
+        Errors are raised to the caller rather than replaced with a fallback.
+        """
+        return _run(AIService._analyze_resume_steps(resume_text, position))
+
+    @staticmethod
+    async def analyze_resume_async(resume_text: str, position: str) -> Dict[str, Any]:
+        """Awaitable variant of analyze_resume."""
+        return await _run_async(AIService._analyze_resume_steps(resume_text, position))
+
+    @staticmethod
+    def _analyze_resume_steps(resume_text: str, position: str):
+        prompt = f"""
+        Analyze this resume for a {position} position:
+        
+        Resume:
+        {resume_text}
+        
+        Provide:
+        1. Key skills identified
+        2. Years of experience
+        3. Education summary
+        4. Relevant experience highlights
+        5. Skills match score (0-100) for the position
+        6. Strengths
+        7. Gaps or areas for improvement
+        8. Overall recommendation (Reject, Consider, Interview, Strong Candidate)
+        
+        Format as JSON with these keys:
+        - key_skills (array)
+        - years_experience (number)
+        - education (string)
+        - relevant_experience (array)
+        - skills_match_score (number)
+        - strengths (array)
+        - gaps (array)
+        - recommendation (string)
+        """
+        
+        response_text = yield ChatRequest(
+            system="You are an HR recruitment specialist that analyzes resumes and provides structured assessments. Always respond with valid JSON.",
+            prompt=prompt,
+            task="analyze_resume"
+        )
+        
+        # Extract JSON if embedded in text
+        import re
+        json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
+        if json_match:
+            response_text = json_match.group(1)
+        
+        return json.loads(response_text)
+    
+    @staticmethod
+    def _text_request(prompt: str, context: Optional[str] = None) -> ChatRequest:
+        system_prompts = {
+            "email_marketing": "You are an expert email marketing copywriter. Write clear, persuasive copy that matches the requested tone.",
+        }
+        return ChatRequest(
+            system=system_prompts.get(context, "You are a helpful assistant for a digital agency."),
+            prompt=prompt,
+            task="generate_text"
+        )
+    
+    @staticmethod
+    def generate_text(prompt: str, context: Optional[str] = None) -> str:
+        """
+        Generate free-form text for a prompt. Errors are raised to the caller.
+        """
+        return _run(AIService._generate_text_steps(prompt, context))
+
+    @staticmethod
+    async def generate_text_async(prompt: str, context: Optional[str] = None) -> str:
+        """Awaitable variant of generate_text."""
+        return await _run_async(AIService._generate_text_steps(prompt, context))
+
+    @staticmethod
+    async def stream_text_async(prompt: str, context: Optional[str] = None) -> AsyncIterator[str]:
+        """Streaming variant of generate_text, yielding text as the model produces it."""
+        async for delta in llm_client.stream_async(AIService._text_request(prompt, context)):
+            yield delta
+
+    @staticmethod
+    def _generate_text_steps(prompt: str, context: Optional[str] = None):
+        return (yield AIService._text_request(prompt, context))
+    
+    @staticmethod
+    def _structured_request(prompt: str, output_format: str = "json") -> ChatRequest:
+        return ChatRequest(
+            system=f"You are a helpful assistant that provides structured analysis. Always respond with valid {output_format.upper()}.",
+            prompt=prompt,
+            task="generate_structured_response"
+        )
+    
+    @staticmethod
+    def extract_json_text(response_text: str) -> str:
+        """Strip a ```json fence from a model response if present."""
+        import re
+        json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
+        if json_match:
+            return json_match.group(1)
+        return response_text
+    
+    @staticmethod
+    def generate_structured_response(prompt: str, output_format: str = "json") -> str:
+        """
+        Generate a structured (JSON by default) response and return its raw text
+        for the caller to parse. Errors are raised to the caller.
+        """
+        return _run(AIService._generate_structured_response_steps(prompt, output_format))
+
+    @staticmethod
+    async def generate_structured_response_async(prompt: str, output_format: str = "json") -> str:
+        """Awaitable variant of generate_structured_response."""
+        return await _run_async(AIService._generate_structured_response_steps(prompt, output_format))
+
+    @staticmethod
+    async def stream_structured_response_async(prompt: str, output_format: str = "json") -> AsyncIterator[str]:
+        """Streaming variant of generate_structured_response, yielding raw text as it arrives."""
+        async for delta in llm_client.stream_async(AIService._structured_request(prompt, output_format)):
+            yield delta
+
+    @staticmethod
+    def _generate_structured_response_steps(prompt: str, output_format: str = "json"):
+        response_text = yield AIService._structured_request(prompt, output_format)
+        return AIService.extract_json_text(response_text)
+    
+    @staticmethod
+    def _assistant_request(query: str, user_role: str, knowledge_base: Optional[Dict[str, Any]] = None) -> ChatRequest:
+        prompt = f"""
+        User role: {user_role}
+        
+        Relevant knowledge:
+        {json.dumps(knowledge_base or {}, indent=2, default=str)}
+        
+        Question: {query}
+        """
+        return ChatRequest(
+            system="You are the HyperFlow assistant. Answer concisely using the provided knowledge and tailor the answer to the user's role.",
+            prompt=prompt,
+            task="generate_assistant_response"
+        )
+    
+    @staticmethod
+    def generate_assistant_response(query: str, user_role: str, knowledge_base: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Answer an assistant query using the caller's role and knowledge base.
+        """
+        return _run(AIService._generate_assistant_response_steps(query, user_role, knowledge_base))
+
+    @staticmethod
+    async def generate_assistant_response_async(query: str, user_role: str, knowledge_base: Optional[Dict[str, Any]] = None) -> str:
+        """Awaitable variant of generate_assistant_response."""
+        return await _run_async(AIService._generate_assistant_response_steps(query, user_role, knowledge_base))
+
+    @staticmethod
+    async def stream_assistant_response_async(query: str, user_role: str, knowledge_base: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """Streaming variant of generate_assistant_response."""
+        async for delta in llm_client.stream_async(AIService._assistant_request(query, user_role, knowledge_base)):
+            yield delta
+
+    @staticmethod
+    def _generate_assistant_response_steps(query: str, user_role: str, knowledge_base: Optional[Dict[str, Any]] = None):
+        return (yield AIService._assistant_request(query, user_role, knowledge_base))
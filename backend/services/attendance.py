@@ -0,0 +1,172 @@
+"""
+Attendance statistics computed by the database.
+
+Readers use the per-employee daily rollup (services.attendance_rollup), one
+compact row per employee-day with hours worked and a late flag already
+computed. With ATTENDANCE_ROLLUP_ENABLED=false they fall back to grouping raw
+employee_attendance rows. Either way presence, lateness and hours are summed
+by the database, and the lateness cutoff is passed as a bound parameter.
+"""
+import os
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import Time, bindparam, case, extract, func, literal_column
+from sqlalchemy.orm import Session
+
+import models
+
+# Load environment variables
+load_dotenv()
+
+# Logins after this time of day count as late
+LATE_AFTER: time = datetime.strptime(os.getenv("ATTENDANCE_LATE_AFTER", "09:15:00"), "%H:%M:%S").time()
+
+# Read attendance_daily_rollup (disable to always aggregate raw attendance rows)
+ATTENDANCE_ROLLUP_ENABLED = os.getenv("ATTENDANCE_ROLLUP_ENABLED", "true").lower() == "true"
+
+
+def _use_rollup(use_rollup: Optional[bool]) -> bool:
+    return ATTENDANCE_ROLLUP_ENABLED if use_rollup is None else use_rollup
+
+
+def work_day(value: Any) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+
+def summarize_day(sessions: Iterable[Tuple[Optional[datetime], Optional[datetime]]]) -> Dict[str, Any]:
+    """first_login, last_logout, hours_worked and is_late for one employee-day of (login, logout) pairs."""
+    logins = []
+    logouts = []
+    seconds = 0.0
+    closed = False
+    for login_time, logout_time in sessions:
+        if login_time:
+            logins.append(login_time)
+        if logout_time:
+            logouts.append(logout_time)
+        if login_time and logout_time:
+            seconds += (logout_time - login_time).total_seconds()
+            closed = True
+    first_login = min(logins) if logins else None
+    return {
+        "first_login": first_login,
+        "last_logout": max(logouts) if logouts else None,
+        # None until a session is closed, so averages skip days still in progress
+        "hours_worked": seconds / 3600 if closed else None,
+        "is_late": bool(first_login and first_login.time() > LATE_AFTER)
+    }
+
+
+def duration_seconds(db: Session, start, end):
+    """SQL expression for the seconds between two datetime columns, in the session's dialect."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        return func.timestampdiff(literal_column("SECOND"), start, end)
+    if dialect == "sqlite":
+        return (func.julianday(end) - func.julianday(start)) * 86400
+    return extract("epoch", end - start)
+
+
+def daily_counts(db: Session, start_date: date, end_date: date,
+                 use_rollup: Optional[bool] = None) -> List[Tuple[object, int, int]]:
+    """(work_date, present, late) for each day in range with any attendance, oldest first."""
+    if _use_rollup(use_rollup):
+        rollup = models.AttendanceDailyRollup
+        return db.query(
+            rollup.work_date,
+            func.count(),
+            func.coalesce(func.sum(case((rollup.is_late, 1), else_=0)), 0)
+        ).filter(
+            rollup.work_date >= start_date,
+            rollup.work_date <= end_date
+        ).group_by(rollup.work_date).order_by(rollup.work_date).all()
+
+    # Count employees rather than rows, so an employee with several sessions in a day counts
+    # once, as in the rollup; they are late when their first login of the day is
+    late_after = bindparam("late_after", LATE_AFTER, type_=Time)
+    first_logins = db.query(
+        models.EmployeeAttendance.work_date.label("work_date"),
+        func.min(models.EmployeeAttendance.login_time).label("first_login")
+    ).filter(
+        models.EmployeeAttendance.work_date >= start_date,
+        models.EmployeeAttendance.work_date < end_date + timedelta(days=1)
+    ).group_by(models.EmployeeAttendance.work_date, models.EmployeeAttendance.user_id).subquery()
+    return [
+        (work_day(work_date), present, late)
+        for work_date, present, late in db.query(
+            first_logins.c.work_date,
+            func.count(),
+            func.coalesce(func.sum(case((func.time(first_logins.c.first_login) > late_after, 1), else_=0)), 0)
+        ).group_by(first_logins.c.work_date).order_by(first_logins.c.work_date)
+    ]
+
+
+def hours_by_user(db: Session, start_date: date, end_date: date,
+                  use_rollup: Optional[bool] = None) -> Dict[int, float]:
+    """Hours worked in closed sessions per employee, for work days start_date through end_date."""
+    if _use_rollup(use_rollup):
+        rollup = models.AttendanceDailyRollup
+        rows = db.query(rollup.user_id, func.sum(rollup.hours_worked)).filter(
+            rollup.work_date >= start_date,
+            rollup.work_date <= end_date
+        ).group_by(rollup.user_id)
+    else:
+        attendance = models.EmployeeAttendance
+        rows = db.query(
+            attendance.user_id,
+            func.sum(duration_seconds(db, attendance.login_time, attendance.logout_time)) / 3600
+        ).filter(
+            attendance.work_date >= start_date,
+            attendance.work_date <= end_date,
+            attendance.login_time.isnot(None),
+            attendance.logout_time.isnot(None)
+        ).group_by(attendance.user_id)
+    return {user_id: float(hours or 0) for user_id, hours in rows}
+
+
+def team_days(db: Session, user_ids: List[int], start_date: date, end_date: date,
+              use_rollup: Optional[bool] = None) -> List[Dict[str, Any]]:
+    """One summary (see summarize_day) per work day of each employee, with its user_id, in one query."""
+    if _use_rollup(use_rollup):
+        rollup = models.AttendanceDailyRollup
+        return [
+            {"user_id": user_id, "work_date": work_date, "first_login": first_login, "last_logout": last_logout,
+             "hours_worked": hours_worked, "is_late": bool(is_late)}
+            for user_id, work_date, first_login, last_logout, hours_worked, is_late in db.query(
+                rollup.user_id, rollup.work_date, rollup.first_login, rollup.last_logout,
+                rollup.hours_worked, rollup.is_late
+            ).filter(
+                rollup.user_id.in_(user_ids),
+                rollup.work_date >= start_date,
+                rollup.work_date <= end_date
+            ).order_by(rollup.user_id, rollup.work_date)
+        ]
+
+    days: Dict[Tuple[int, date], list] = {}
+    for user_id, work_date, login_time, logout_time in db.query(
+        models.EmployeeAttendance.user_id,
+        models.EmployeeAttendance.work_date,
+        models.EmployeeAttendance.login_time,
+        models.EmployeeAttendance.logout_time
+    ).filter(
+        models.EmployeeAttendance.user_id.in_(user_ids),
+        models.EmployeeAttendance.work_date >= start_date,
+        models.EmployeeAttendance.work_date < end_date + timedelta(days=1)
+    ):
+        days.setdefault((user_id, work_day(work_date)), []).append((login_time, logout_time))
+    return [
+        {"user_id": user_id, "work_date": day, **summarize_day(sessions)}
+        for (user_id, day), sessions in sorted(days.items())
+    ]
+
+
+def employee_days(db: Session, user_id: int, start_date: date, end_date: date,
+                  use_rollup: Optional[bool] = None) -> List[Dict[str, Any]]:
+    """One summary per work day of an employee (see summarize_day), oldest first."""
+    return team_days(db, [user_id], start_date, end_date, use_rollup)
+
+
+def employee_count(db: Session) -> int:
+    return db.query(func.count()).select_from(models.User).scalar() or 0
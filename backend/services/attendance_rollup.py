@@ -0,0 +1,99 @@
+"""
+Daily attendance rollup: one row per employee per work day.
+
+attendance_daily_rollup holds the first login, last logout, hours worked
+(summed over the day's closed sessions) and a late flag for each
+(user_id, work_date), as computed by services.attendance.summarize_day().
+Writers call refresh_day() in the same transaction that changes
+employee_attendance, so the rollup commits or rolls back with the raw rows.
+refresh_day() recomputes the day from its few raw rows, so calling it again is
+harmless. rebuild() recomputes a date range from employee_attendance, for
+backfills or after the lateness cutoff changes.
+"""
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+import models
+from services.attendance import summarize_day, work_day
+
+logger = logging.getLogger(__name__)
+
+
+def refresh_day(db: Session, user_id: int, work_date: Any):
+    """
+    Recompute one employee-day from employee_attendance. Does not commit; call
+    it in the transaction that changes the attendance rows.
+    """
+    day = work_day(work_date)
+    db.flush()
+    sessions = db.query(
+        models.EmployeeAttendance.login_time,
+        models.EmployeeAttendance.logout_time
+    ).filter(
+        models.EmployeeAttendance.user_id == user_id,
+        models.EmployeeAttendance.work_date >= day,
+        models.EmployeeAttendance.work_date < day + timedelta(days=1)
+    ).all()
+    if not sessions:
+        db.query(models.AttendanceDailyRollup).filter(
+            models.AttendanceDailyRollup.user_id == user_id,
+            models.AttendanceDailyRollup.work_date == day
+        ).delete(synchronize_session=False)
+        return
+    db.merge(models.AttendanceDailyRollup(
+        user_id=user_id,
+        work_date=day,
+        updated_at=datetime.now(),
+        **summarize_day(sessions)
+    ))
+
+
+def refresh_days(db: Session, days: Iterable[Tuple[int, Any]]):
+    for user_id, work_date in sorted({(user_id, work_day(work_date)) for user_id, work_date in days}):
+        refresh_day(db, user_id, work_date)
+
+
+def rebuild(db: Session, start_date: Optional[date] = None, end_date: Optional[date] = None) -> int:
+    """
+    Recompute rollup rows from employee_attendance for start_date through
+    end_date (all days when omitted) and commit. Returns the number of rows written.
+    """
+    rollup = db.query(models.AttendanceDailyRollup)
+    sessions = db.query(models.EmployeeAttendance)
+    if start_date:
+        rollup = rollup.filter(models.AttendanceDailyRollup.work_date >= start_date)
+        sessions = sessions.filter(models.EmployeeAttendance.work_date >= start_date)
+    if end_date:
+        rollup = rollup.filter(models.AttendanceDailyRollup.work_date <= end_date)
+        sessions = sessions.filter(models.EmployeeAttendance.work_date < end_date + timedelta(days=1))
+
+    written = 0
+    now = datetime.now()
+    try:
+        rollup.delete(synchronize_session=False)
+        user_ids = [user_id for (user_id,) in sessions.with_entities(
+            models.EmployeeAttendance.user_id
+        ).distinct().order_by(models.EmployeeAttendance.user_id)]
+        # One employee at a time, so memory is bounded by a single attendance history
+        for user_id in user_ids:
+            days: Dict[date, list] = {}
+            for work_date, login_time, logout_time in sessions.with_entities(
+                models.EmployeeAttendance.work_date,
+                models.EmployeeAttendance.login_time,
+                models.EmployeeAttendance.logout_time
+            ).filter(models.EmployeeAttendance.user_id == user_id):
+                days.setdefault(work_day(work_date), []).append((login_time, logout_time))
+            db.bulk_insert_mappings(models.AttendanceDailyRollup, [
+                {"user_id": user_id, "work_date": day, "updated_at": now, **summarize_day(day_sessions)}
+                for day, day_sessions in sorted(days.items())
+            ])
+            written += len(days)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    logger.info(f"Rebuilt {written} daily attendance rollup rows")
+    return written
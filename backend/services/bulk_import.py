@@ -0,0 +1,269 @@
+"""
+Streaming bulk import of financial records and invoices.
+
+Uploaded CSV or NDJSON files are read one row at a time. Each row is validated
+against the same schema as the single-row endpoint. Valid rows are inserted in
+multi-row INSERT statements, with one commit per batch, so memory stays
+constant however long the file is. Imported financial records are folded into
+the monthly ledger rollup in the same transaction as their batch. Rows that
+are not valid UTF-8, fail validation or fail insertion are reported by line
+number. The report keeps only the first IMPORT_MAX_REPORTED_ERRORS errors in
+full.
+"""
+import io
+import os
+import csv
+import re
+import json
+import logging
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+import models
+import schemas
+from database import SessionLocal
+from services import ledger_rollup
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+IMPORT_MAX_REPORTED_ERRORS = int(os.getenv("IMPORT_MAX_REPORTED_ERRORS", "1000"))
+
+FORMATS = ("csv", "ndjson")
+
+_DATE_ONLY = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+# Bytes that are not valid UTF-8 decode to lone surrogates under "surrogateescape"
+_UNDECODABLE = re.compile("[\udc80-\udcff]")
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str] = None) -> str:
+    name = (filename or "").lower()
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in (content_type or ""):
+        return "ndjson"
+    return "csv"
+
+
+def iter_rows(stream: BinaryIO, file_format: str) -> Iterator[Tuple[int, Any]]:
+    """Yield (line number, row) pairs; a row is a dict, or an Exception for an unparseable line."""
+    # Invalid UTF-8 fails only the rows that contain it instead of aborting the import mid-file
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", errors="surrogateescape", newline="")
+    try:
+        if file_format == "ndjson":
+            for line_number, line in enumerate(text, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    if _UNDECODABLE.search(line):
+                        raise ValueError("not valid UTF-8")
+                    row = json.loads(line)
+                    if not isinstance(row, dict):
+                        raise ValueError("expected a JSON object")
+                except ValueError as e:
+                    yield line_number, e
+                else:
+                    yield line_number, row
+        else:
+            reader = csv.DictReader(text)
+            for row in reader:
+                if any(_UNDECODABLE.search(cell) for cell in _cells(row)):
+                    yield reader.line_num, ValueError("not valid UTF-8")
+                    continue
+                # Blank cells mean "not given", so optional fields fall back to their defaults
+                yield reader.line_num, {
+                    (key or "").strip(): value for key, value in row.items()
+                    if key and value is not None and value.strip() != ""
+                }
+    finally:
+        text.detach()
+
+
+def _cells(row: Dict[Optional[str], Any]) -> Iterator[str]:
+    for key, value in row.items():
+        yield key or ""
+        # Extra cells beyond the header are collected in a list under the None key
+        for cell in value if isinstance(value, list) else [value]:
+            if cell is not None:
+                yield cell
+
+
+class _Importer:
+    schema = None
+    model = None
+    # Datetime fields that bank and accounting exports often give as plain dates
+    date_fields: Tuple[str, ...] = ()
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def parse(self, row: Dict[str, Any]):
+        for field in self.date_fields:
+            value = row.get(field)
+            if isinstance(value, str) and _DATE_ONLY.match(value):
+                row[field] = value + "T00:00:00"
+        return self.schema.parse_obj(row)
+
+    def to_values(self, item) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def check_batch(self, batch: List[Tuple[int, Dict[str, Any]]]) -> Dict[int, str]:
+        """Errors for rows that are valid alone but conflict with the database, by line number."""
+        return {}
+
+    def after_insert(self, batch: List[Tuple[int, Dict[str, Any]]]):
+        pass
+
+
+class _FinancialRecordImporter(_Importer):
+    schema = schemas.FinancialRecordCreate
+    model = models.FinancialRecord
+    date_fields = ("record_date",)
+
+    def to_values(self, item: schemas.FinancialRecordCreate) -> Dict[str, Any]:
+        values = item.dict()
+        values["record_type"] = models.FinancialRecordType(item.record_type.value)
+        return values
+
+    def after_insert(self, batch):
+        ledger_rollup.add_records(self.db, [
+            (values["record_type"], values["amount"], values["record_date"]) for _, values in batch
+        ])
+
+
+class _InvoiceImporter(_Importer):
+    schema = schemas.InvoiceCreate
+    model = models.Invoice
+    date_fields = ("due_date",)
+
+    def to_values(self, item: schemas.InvoiceCreate) -> Dict[str, Any]:
+        values = item.dict()
+        values["status"] = models.InvoiceStatus(item.status.value)
+        return values
+
+    def check_batch(self, batch):
+        numbers = {values["invoice_number"] for _, values in batch}
+        client_ids = {values["client_id"] for _, values in batch}
+        existing_numbers = {number for (number,) in self.db.query(models.Invoice.invoice_number).filter(
+            models.Invoice.invoice_number.in_(numbers)
+        )}
+        known_clients = {client_id for (client_id,) in self.db.query(models.Client.client_id).filter(
+            models.Client.client_id.in_(client_ids)
+        )}
+        errors = {}
+        seen = set()
+        for line_number, values in batch:
+            if values["client_id"] not in known_clients:
+                errors[line_number] = "Client not found"
+            elif values["invoice_number"] in existing_numbers or values["invoice_number"] in seen:
+                errors[line_number] = "Invoice number already exists"
+            seen.add(values["invoice_number"])
+        return errors
+
+
+IMPORTERS = {
+    "financial-records": _FinancialRecordImporter,
+    "invoices": _InvoiceImporter,
+}
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows_read = 0
+        self.imported = 0
+        self.failed = 0
+        self.batches = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def error(self, line_number: int, message: Any):
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_REPORTED_ERRORS:
+            self.errors.append({"row": line_number, "errors": message if isinstance(message, list) else [str(message)]})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "rows_read": self.rows_read,
+            "imported": self.imported,
+            "failed": self.failed,
+            "batches": self.batches,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors)
+        }
+
+
+def _validation_messages(error: ValidationError) -> List[str]:
+    return [f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in error.errors()]
+
+
+def _insert_batch(importer: _Importer, batch: List[Tuple[int, Dict[str, Any]]], report: ImportReport):
+    db = importer.db
+    conflicts = importer.check_batch(batch)
+    for line_number, message in conflicts.items():
+        report.error(line_number, message)
+    batch = [(line_number, values) for line_number, values in batch if line_number not in conflicts]
+    if not batch:
+        return
+    try:
+        db.execute(insert(importer.model), [values for _, values in batch])
+        importer.after_insert(batch)
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.warning(f"Bulk import batch failed, retrying row by row: {str(e)}")
+        # Find the offending rows; each row commits with its own rollup update
+        for line_number, values in batch:
+            try:
+                db.execute(insert(importer.model), [values])
+                importer.after_insert([(line_number, values)])
+                db.commit()
+            except SQLAlchemyError as row_error:
+                db.rollback()
+                report.error(line_number, str(getattr(row_error, "orig", row_error)))
+            else:
+                report.imported += 1
+    else:
+        report.imported += len(batch)
+    report.batches += 1
+
+
+def import_file(db: Session, kind: str, stream: BinaryIO, file_format: str = "csv",
+                batch_size: int = IMPORT_BATCH_SIZE) -> Dict[str, Any]:
+    """Import an uploaded file of financial records or invoices and return the row-level report."""
+    if kind not in IMPORTERS:
+        raise ValueError(f"Unknown import type: {kind}")
+    if file_format not in FORMATS:
+        raise ValueError(f"Unsupported format: {file_format}")
+    importer = IMPORTERS[kind](db)
+    report = ImportReport()
+    batch: List[Tuple[int, Dict[str, Any]]] = []
+    for line_number, row in iter_rows(stream, file_format):
+        report.rows_read += 1
+        if isinstance(row, Exception):
+            report.error(line_number, f"Unreadable row: {row}")
+            continue
+        try:
+            batch.append((line_number, importer.to_values(importer.parse(row))))
+        except ValidationError as e:
+            report.error(line_number, _validation_messages(e))
+            continue
+        if len(batch) >= batch_size:
+            _insert_batch(importer, batch, report)
+            batch = []
+    if batch:
+        _insert_batch(importer, batch, report)
+    return report.as_dict()
+
+
+def import_upload(kind: str, stream: BinaryIO, file_format: str = "csv", session_factory=None) -> Dict[str, Any]:
+    """Run import_file on a session of its own; sessions must not be shared with the calling thread."""
+    db = (session_factory or SessionLocal)()
+    try:
+        return import_file(db, kind, stream, file_format)
+    finally:
+        db.close()
@@ -0,0 +1,140 @@
+"""
+Streaming exports of the ledger, invoices and attendance.
+
+Rows are read through a server-side cursor (stream_results with yield_per) and
+encoded as CSV or NDJSON in chunks of about EXPORT_CHUNK_BYTES. The output can
+be gzip-compressed on the fly. Memory use therefore does not depend on how many
+rows are exported. The generator is synchronous, so Starlette iterates it in
+its threadpool and the event loop stays free. It opens its own session, which
+lives for the whole response rather than just the request handler.
+"""
+import io
+import os
+import csv
+import json
+import zlib
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator, Optional
+
+from dotenv import load_dotenv
+from fastapi.responses import StreamingResponse
+
+import models
+from database import SessionLocal
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "2000"))
+EXPORT_CHUNK_BYTES = int(os.getenv("EXPORT_CHUNK_BYTES", str(64 * 1024)))
+
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+# Exportable tables: the model, its date column for range filters, and the exported columns
+DATASETS: Dict[str, Dict[str, Any]] = {
+    "financial-records": {
+        "model": models.FinancialRecord,
+        "date_column": "record_date",
+        "columns": ["record_id", "record_type", "amount", "description", "record_date", "created_at"],
+    },
+    "invoices": {
+        "model": models.Invoice,
+        "date_column": "created_at",
+        "columns": ["invoice_id", "client_id", "invoice_number", "amount", "due_date", "status", "created_at"],
+    },
+    "attendance": {
+        "model": models.EmployeeAttendance,
+        "date_column": "work_date",
+        "columns": ["attendance_id", "user_id", "work_date", "login_time", "logout_time"],
+    },
+}
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return getattr(value, "value", value)
+
+
+def filename(dataset: str, file_format: str, gzip: bool = False) -> str:
+    name = f"{dataset}-{datetime.now().strftime('%Y%m%d')}.{file_format}"
+    return name + ".gz" if gzip else name
+
+
+def _encoded_rows(dataset: str, file_format: str, start_date: Optional[date], end_date: Optional[date],
+                  session_factory) -> Iterator[bytes]:
+    spec = DATASETS[dataset]
+    model = spec["model"]
+    columns = spec["columns"]
+    date_column = getattr(model, spec["date_column"])
+    primary_key = getattr(model, columns[0])
+
+    db = (session_factory or SessionLocal)()
+    try:
+        query = db.query(*[getattr(model, column) for column in columns])
+        if start_date:
+            query = query.filter(date_column >= start_date)
+        if end_date:
+            # DATETIME columns: include the whole end day
+            query = query.filter(date_column < end_date + timedelta(days=1))
+        rows = query.order_by(date_column, primary_key).execution_options(stream_results=True).yield_per(EXPORT_BATCH_ROWS)
+
+        buffer = io.StringIO()
+        if file_format == "csv":
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            for row in rows:
+                writer.writerow([_plain(value) for value in row])
+                if buffer.tell() >= EXPORT_CHUNK_BYTES:
+                    yield buffer.getvalue().encode("utf-8")
+                    buffer.seek(0)
+                    buffer.truncate()
+        else:
+            for row in rows:
+                buffer.write(json.dumps({column: _plain(value) for column, value in zip(columns, row)}))
+                buffer.write("\n")
+                if buffer.tell() >= EXPORT_CHUNK_BYTES:
+                    yield buffer.getvalue().encode("utf-8")
+                    buffer.seek(0)
+                    buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+    except Exception as e:
+        # Headers are already sent, so the client sees a truncated body
+        logger.error(f"Error exporting {dataset}: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+
+def stream_export(dataset: str, file_format: str = "csv", start_date: Optional[date] = None,
+                  end_date: Optional[date] = None, gzip: bool = False,
+                  session_factory=None) -> Iterator[bytes]:
+    """Yield the export of a dataset as encoded (and optionally gzipped) byte chunks."""
+    if dataset not in DATASETS:
+        raise ValueError(f"Unknown export: {dataset}")
+    if file_format not in FORMATS:
+        raise ValueError(f"Unsupported format: {file_format}")
+    chunks = _encoded_rows(dataset, file_format, start_date, end_date, session_factory)
+    if not gzip:
+        yield from chunks
+        return
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31: gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_response(dataset: str, file_format: str = "csv", start_date: Optional[date] = None,
+                    end_date: Optional[date] = None, gzip: bool = False) -> StreamingResponse:
+    """A download response streaming the export."""
+    return StreamingResponse(
+        stream_export(dataset, file_format, start_date, end_date, gzip),
+        media_type="application/gzip" if gzip else FORMATS[file_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename(dataset, file_format, gzip)}"'}
+    )
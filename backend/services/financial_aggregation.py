@@ -0,0 +1,134 @@
+"""
+Single-pass aggregation of ledger rows (financial records).
+
+Totals, the monthly income/expense/profit breakdown, month-over-month profit
+growth and the recent trend are all derived from one pass over any iterable of
+rows. Both the finance summary route and AIService.analyze_financial_data use
+it, so callers can stream rows from the database without first building a list
+or a DataFrame. All figures are plain Python floats, so they serialize as JSON.
+"""
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+# Month-over-month profit growth (percent) counted as a positive or negative month
+GROWTH_THRESHOLD = 5.0
+# Months averaged for the recent trend
+TREND_MONTHS = 3
+
+
+def month_key(value: Any) -> str:
+    """'YYYY-MM' for a date, datetime or ISO date string."""
+    if isinstance(value, (date, datetime)):
+        return f"{value.year:04d}-{value.month:02d}"
+    text = str(value)
+    if len(text) >= 7 and text[4] == "-":
+        return text[:7]
+    parsed = datetime.fromisoformat(text)
+    return f"{parsed.year:04d}-{parsed.month:02d}"
+
+
+def _type_name(record_type: Any) -> str:
+    return getattr(record_type, "value", record_type)
+
+
+class LedgerAggregate:
+    """Running totals for a stream of ledger rows. Feed rows with add() or add_records()."""
+
+    def __init__(self):
+        self.total_income = 0.0
+        self.total_expenses = 0.0
+        self.record_count = 0
+        # month -> [income, expense]
+        self._months: Dict[str, List[float]] = {}
+
+    def add(self, record_type: Any, amount: Any, record_date: Any = None):
+        amount = float(amount or 0)
+        record_type = _type_name(record_type)
+        if record_type == "income":
+            self.total_income += amount
+            index = 0
+        elif record_type == "expense":
+            self.total_expenses += amount
+            index = 1
+        else:
+            return
+        self.record_count += 1
+        if record_date is not None:
+            month = month_key(record_date)
+            totals = self._months.get(month)
+            if totals is None:
+                totals = self._months[month] = [0.0, 0.0]
+            totals[index] += amount
+
+    def add_month(self, month: str, income: float = 0.0, expense: float = 0.0, count: int = 0):
+        """Fold in totals that were already aggregated per month (e.g. by the database)."""
+        income, expense = float(income or 0), float(expense or 0)
+        self.total_income += income
+        self.total_expenses += expense
+        self.record_count += count
+        totals = self._months.setdefault(month, [0.0, 0.0])
+        totals[0] += income
+        totals[1] += expense
+
+    def add_records(self, records: Iterable[Mapping[str, Any]]) -> "LedgerAggregate":
+        """Fold in dicts with record_type, amount and (optionally) record_date keys."""
+        add = self.add
+        for record in records:
+            add(record.get("record_type"), record.get("amount"), record.get("record_date"))
+        return self
+
+    @property
+    def net_profit(self) -> float:
+        return self.total_income - self.total_expenses
+
+    @property
+    def profit_margin(self) -> float:
+        return (self.net_profit / self.total_income) * 100 if self.total_income > 0 else 0
+
+    def monthly(self) -> List[Dict[str, Any]]:
+        """Per-month income, expense, profit and profit growth (percent vs the previous month), oldest first."""
+        breakdown = []
+        previous_profit: Optional[float] = None
+        for month in sorted(self._months):
+            income, expense = self._months[month]
+            profit = income - expense
+            growth = None
+            if previous_profit:
+                growth = (profit - previous_profit) / abs(previous_profit) * 100
+            breakdown.append({
+                "month": month,
+                "income": income,
+                "expense": expense,
+                "profit": profit,
+                "profit_growth": growth
+            })
+            previous_profit = profit
+        return breakdown
+
+    def summary(self) -> Dict[str, Any]:
+        monthly = self.monthly()
+        recent = [m["profit_growth"] for m in monthly[-TREND_MONTHS:] if m["profit_growth"] is not None]
+        recent_trend = "stable"
+        if len(monthly) >= TREND_MONTHS and recent:
+            average = sum(recent) / len(recent)
+            if average > GROWTH_THRESHOLD:
+                recent_trend = "positive"
+            elif average < -GROWTH_THRESHOLD:
+                recent_trend = "negative"
+        return {
+            "total_income": self.total_income,
+            "total_expenses": self.total_expenses,
+            "net_profit": self.net_profit,
+            "profit_margin": self.profit_margin,
+            "record_count": self.record_count,
+            "monthly": monthly,
+            "positive_months": [m["month"] for m in monthly
+                                if m["profit_growth"] is not None and m["profit_growth"] > GROWTH_THRESHOLD],
+            "negative_months": [m["month"] for m in monthly
+                                if m["profit_growth"] is not None and m["profit_growth"] < -GROWTH_THRESHOLD],
+            "recent_trend": recent_trend
+        }
+
+
+def aggregate_records(records: Iterable[Mapping[str, Any]]) -> LedgerAggregate:
+    return LedgerAggregate().add_records(records)
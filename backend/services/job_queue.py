@@ -0,0 +1,272 @@
+"""
+Durable background jobs for long-running AI analyses.
+
+Submitting a job writes a row to ai_jobs and hands its id to an in-process
+worker pool. The client then polls for the result instead of holding the HTTP
+connection open. The table is the source of truth. Workers claim a job with a
+conditional UPDATE, so a job runs only once even when several API processes
+share the database. Idle workers sweep the table for queued jobs and for
+running jobs whose worker stopped sending heartbeats. So jobs survive restarts
+and are picked up by any process. The outcome is written only while the
+worker still holds the job's claim token, so a worker whose job was requeued
+cannot overwrite the run that replaced it. A job whose handler raises goes
+back to the queue until JOB_MAX_ATTEMPTS attempts are used up; only then is
+it failed, with the job type's fallback as its result.
+"""
+import os
+import uuid
+import queue
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import func
+
+from database import SessionLocal
+import models
+from services.ai_service import AIService, MEETING_ANALYSIS_FALLBACK
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUE_ENABLED = os.getenv("JOB_QUEUE_ENABLED", "true").lower() == "true"
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "5"))
+JOB_STALE_AFTER = int(os.getenv("JOB_STALE_AFTER", "900"))  # seconds without a heartbeat before a running job is presumed orphaned
+JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", str(JOB_STALE_AFTER / 3)))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+# Job types and the blocking AIService method that runs each (called with the job params).
+# Handlers raise on failure so the job is retried, up to JOB_MAX_ATTEMPTS attempts.
+JOB_HANDLERS: Dict[str, Callable[..., Any]] = {
+    "analyze_meeting_transcript": AIService.analyze_meeting_transcript_or_raise,
+}
+
+# Result recorded for a job type once its attempts are used up
+JOB_FALLBACKS: Dict[str, Any] = {
+    "analyze_meeting_transcript": MEETING_ANALYSIS_FALLBACK,
+}
+
+
+class JobQueue:
+    def __init__(self, workers: int = JOB_WORKERS, session_factory=SessionLocal):
+        self.workers = workers
+        self.session_factory = session_factory
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._threads = []
+        self._stopping = threading.Event()
+
+    # Lifecycle
+
+    def start(self):
+        if self._threads:
+            return
+        self._stopping.clear()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"ai-job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        # Resume jobs left queued by a previous run without waiting for the first idle sweep
+        threading.Thread(target=self._sweep_safely, name="ai-job-recovery", daemon=True).start()
+        logger.info(f"Started {self.workers} AI job workers")
+
+    def stop(self, timeout: float = 5):
+        self._stopping.set()
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    # Public API
+
+    def submit(self, job_type: str, params: Dict[str, Any], user_id: Optional[int] = None) -> models.AIJob:
+        """Persist a job and queue it for the workers."""
+        if job_type not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job type: {job_type}")
+        db = self.session_factory()
+        try:
+            job = models.AIJob(
+                job_id=uuid.uuid4().hex,
+                job_type=job_type,
+                params=params,
+                status=models.AIJobStatus.queued,
+                attempts=0,
+                created_by=user_id,
+                created_at=datetime.now()
+            )
+            db.add(job)
+            db.commit()
+            db.refresh(job)
+            db.expunge(job)
+        finally:
+            db.close()
+        self._queue.put(job.job_id)
+        return job
+
+    def get(self, job_id: str) -> Optional[models.AIJob]:
+        db = self.session_factory()
+        try:
+            job = db.query(models.AIJob).filter(models.AIJob.job_id == job_id).first()
+            if job is not None:
+                db.expunge(job)
+            return job
+        finally:
+            db.close()
+
+    # Workers
+
+    def _work(self):
+        while not self._stopping.is_set():
+            try:
+                job_id = self._queue.get(timeout=JOB_POLL_INTERVAL)
+            except queue.Empty:
+                # Nothing handed to us directly; look for work left by restarts or other processes
+                self._sweep_safely()
+                continue
+            if job_id is None:
+                break
+            try:
+                self._run(job_id)
+            except Exception as e:
+                logger.error(f"Error running AI job {job_id}: {str(e)}")
+
+    def _sweep_safely(self):
+        try:
+            self._sweep()
+        except Exception as e:
+            logger.error(f"Error sweeping AI jobs: {str(e)}")
+
+    def _sweep(self):
+        """Requeue orphaned running jobs and pick up queued jobs nobody is working on."""
+        db = self.session_factory()
+        try:
+            stale_before = datetime.now() - timedelta(seconds=JOB_STALE_AFTER)
+            orphaned = db.query(models.AIJob).filter(
+                models.AIJob.status == models.AIJobStatus.running,
+                func.coalesce(models.AIJob.heartbeat_at, models.AIJob.started_at) < stale_before
+            )
+            abandoned = orphaned.filter(models.AIJob.attempts >= JOB_MAX_ATTEMPTS)
+            for job_type, fallback in JOB_FALLBACKS.items():
+                abandoned.filter(models.AIJob.job_type == job_type).update(
+                    {models.AIJob.result: fallback}, synchronize_session=False
+                )
+            abandoned.update({
+                models.AIJob.status: models.AIJobStatus.failed,
+                models.AIJob.error: "Abandoned after too many attempts",
+                models.AIJob.finished_at: datetime.now(),
+                models.AIJob.claim_token: None
+            }, synchronize_session=False)
+            # Dropping the claim token keeps a stalled worker from writing its result later
+            orphaned.update({
+                models.AIJob.status: models.AIJobStatus.queued,
+                models.AIJob.claim_token: None
+            }, synchronize_session=False)
+            db.commit()
+
+            queued = db.query(models.AIJob.job_id).filter(
+                models.AIJob.status == models.AIJobStatus.queued
+            ).order_by(models.AIJob.created_at).limit(self.workers).all()
+        finally:
+            db.close()
+        for (job_id,) in queued:
+            self._queue.put(job_id)
+
+    def _claim(self, db, job_id: str) -> Optional[str]:
+        """Claim a queued job and return the claim token, or None if another worker has it."""
+        # Conditional update so only one worker (in any process) gets the job
+        token = uuid.uuid4().hex
+        now = datetime.now()
+        claimed = db.query(models.AIJob).filter(
+            models.AIJob.job_id == job_id,
+            models.AIJob.status == models.AIJobStatus.queued
+        ).update({
+            models.AIJob.status: models.AIJobStatus.running,
+            models.AIJob.started_at: now,
+            models.AIJob.heartbeat_at: now,
+            models.AIJob.claim_token: token,
+            models.AIJob.attempts: models.AIJob.attempts + 1
+        }, synchronize_session=False)
+        db.commit()
+        return token if claimed == 1 else None
+
+    def _heartbeat(self, job_id: str, token: str, stop: threading.Event):
+        """Refresh heartbeat_at while the job runs, so the sweep does not take it for orphaned."""
+        while not stop.wait(JOB_HEARTBEAT_INTERVAL):
+            db = self.session_factory()
+            try:
+                beat = db.query(models.AIJob).filter(
+                    models.AIJob.job_id == job_id,
+                    models.AIJob.claim_token == token
+                ).update({models.AIJob.heartbeat_at: datetime.now()}, synchronize_session=False)
+                db.commit()
+                if not beat:
+                    return
+            except Exception as e:
+                logger.error(f"Error refreshing heartbeat of AI job {job_id}: {str(e)}")
+            finally:
+                db.close()
+
+    def _finish(self, db, job_id: str, token: str, values: Dict[Any, Any]) -> bool:
+        """Record a job's outcome, unless the job was requeued and this worker no longer holds the claim."""
+        updated = db.query(models.AIJob).filter(
+            models.AIJob.job_id == job_id,
+            models.AIJob.status == models.AIJobStatus.running,
+            models.AIJob.claim_token == token
+        ).update({**values, models.AIJob.claim_token: None}, synchronize_session=False)
+        db.commit()
+        if not updated:
+            logger.warning(f"AI job {job_id} was reclaimed by another worker; discarding this run's outcome")
+        return updated == 1
+
+    def _run(self, job_id: str):
+        db = self.session_factory()
+        try:
+            token = self._claim(db, job_id)
+            if token is None:
+                return
+            job = db.query(models.AIJob).filter(models.AIJob.job_id == job_id).first()
+            job_type, params, attempts = job.job_type, job.params or {}, job.attempts
+            db.commit()
+
+            stop_heartbeat = threading.Event()
+            threading.Thread(
+                target=self._heartbeat, args=(job_id, token, stop_heartbeat),
+                name=f"ai-job-heartbeat-{job_id[:8]}", daemon=True
+            ).start()
+            try:
+                result = JOB_HANDLERS[job_type](**params)
+            except Exception as e:
+                if attempts < JOB_MAX_ATTEMPTS:
+                    # Back in the queue; the next idle sweep (within JOB_POLL_INTERVAL) retries it
+                    logger.warning(f"AI job {job_id} ({job_type}) failed on attempt {attempts}, will retry: {str(e)}")
+                    self._finish(db, job_id, token, {
+                        models.AIJob.status: models.AIJobStatus.queued,
+                        models.AIJob.error: str(e)
+                    })
+                    return
+                logger.error(f"AI job {job_id} ({job_type}) failed after {attempts} attempts: {str(e)}")
+                outcome = {
+                    models.AIJob.status: models.AIJobStatus.failed,
+                    models.AIJob.error: str(e),
+                    models.AIJob.result: JOB_FALLBACKS.get(job_type)
+                }
+            else:
+                outcome = {
+                    models.AIJob.status: models.AIJobStatus.succeeded,
+                    models.AIJob.error: None,
+                    models.AIJob.result: result
+                }
+            finally:
+                stop_heartbeat.set()
+            self._finish(db, job_id, token, {**outcome, models.AIJob.finished_at: datetime.now()})
+        finally:
+            db.close()
+
+
+# Shared queue for the API process
+job_queue = JobQueue()
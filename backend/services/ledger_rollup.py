@@ -0,0 +1,209 @@
+"""
+Monthly ledger rollup: income and expense totals per calendar month.
+
+monthly_ledger_rollup holds one row per (month, record_type) with the sum and
+count of the matching financial_records. Writers call add_records() in the same
+transaction that inserts the records, so the rollup commits or rolls back with
+them. Readers call load_ledger(). It takes whole months in the requested range
+from the rollup and scans raw rows only for partial months at either edge.
+rebuild() recomputes the rollup from financial_records, for backfills or after
+records were changed outside these paths.
+"""
+import os
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import extract, func
+from sqlalchemy.orm import Session
+
+import models
+from services.financial_aggregation import LedgerAggregate
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Read whole months from the rollup (disable to always aggregate raw records)
+LEDGER_ROLLUP_ENABLED = os.getenv("LEDGER_ROLLUP_ENABLED", "true").lower() == "true"
+
+
+def month_start(value: Any) -> date:
+    return date(value.year, value.month, 1)
+
+
+def _next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def _record_type(value: Any) -> models.FinancialRecordType:
+    if isinstance(value, models.FinancialRecordType):
+        return value
+    return models.FinancialRecordType(getattr(value, "value", value))
+
+
+def _upsert(db: Session, month: date, record_type: models.FinancialRecordType, amount: float, count: int):
+    """Add amount and count to one rollup row, creating it if needed, in a single statement."""
+    table = models.MonthlyLedgerRollup.__table__
+    values = {"month": month, "record_type": record_type, "total_amount": amount,
+              "record_count": count, "updated_at": datetime.now()}
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table).values(**values)
+        stmt = stmt.on_duplicate_key_update(
+            total_amount=table.c.total_amount + stmt.inserted.total_amount,
+            record_count=table.c.record_count + stmt.inserted.record_count,
+            updated_at=stmt.inserted.updated_at
+        )
+    elif dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.month, table.c.record_type],
+            set_={
+                "total_amount": table.c.total_amount + stmt.excluded.total_amount,
+                "record_count": table.c.record_count + stmt.excluded.record_count,
+                "updated_at": stmt.excluded.updated_at
+            }
+        )
+    else:
+        updated = db.query(models.MonthlyLedgerRollup).filter(
+            models.MonthlyLedgerRollup.month == month,
+            models.MonthlyLedgerRollup.record_type == record_type
+        ).update({
+            models.MonthlyLedgerRollup.total_amount: models.MonthlyLedgerRollup.total_amount + amount,
+            models.MonthlyLedgerRollup.record_count: models.MonthlyLedgerRollup.record_count + count,
+            models.MonthlyLedgerRollup.updated_at: values["updated_at"]
+        }, synchronize_session=False)
+        if updated:
+            return
+        stmt = table.insert().values(**values)
+    db.execute(stmt)
+
+
+def add_records(db: Session, records: Iterable[Tuple[Any, Any, Any]]):
+    """
+    Fold (record_type, amount, record_date) tuples into the rollup. Does not
+    commit; call it in the transaction that inserts the records.
+    """
+    totals: Dict[Tuple[date, models.FinancialRecordType], list] = {}
+    for record_type, amount, record_date in records:
+        key = (month_start(record_date), _record_type(record_type))
+        bucket = totals.setdefault(key, [0.0, 0])
+        bucket[0] += float(amount or 0)
+        bucket[1] += 1
+    for (month, record_type), (amount, count) in sorted(totals.items(), key=lambda item: (item[0][0], item[0][1].value)):
+        _upsert(db, month, record_type, amount, count)
+
+
+def add_record(db: Session, record: models.FinancialRecord):
+    add_records(db, [(record.record_type, record.amount, record.record_date)])
+
+
+def _add_raw(db: Session, ledger: LedgerAggregate, start: date, end_exclusive: date):
+    """Aggregate raw financial_records in [start, end_exclusive) into the ledger, grouped by the database."""
+    year = extract("year", models.FinancialRecord.record_date)
+    month = extract("month", models.FinancialRecord.record_date)
+    rows = db.query(
+        year, month,
+        models.FinancialRecord.record_type,
+        func.sum(models.FinancialRecord.amount),
+        func.count(models.FinancialRecord.record_id)
+    ).filter(
+        models.FinancialRecord.record_date >= start,
+        models.FinancialRecord.record_date < end_exclusive
+    ).group_by(year, month, models.FinancialRecord.record_type).all()
+    for record_year, record_month, record_type, amount, count in rows:
+        _add_month(ledger, f"{int(record_year):04d}-{int(record_month):02d}", record_type, amount, count)
+
+
+def _add_month(ledger: LedgerAggregate, month: str, record_type, amount, count):
+    if record_type == models.FinancialRecordType.income:
+        ledger.add_month(month, income=amount, count=count)
+    elif record_type == models.FinancialRecordType.expense:
+        ledger.add_month(month, expense=amount, count=count)
+
+
+def load_ledger(db: Session, start_date: date, end_date: date, use_rollup: Optional[bool] = None) -> LedgerAggregate:
+    """Ledger totals for financial records dated start_date through end_date (inclusive)."""
+    ledger = LedgerAggregate()
+    end_exclusive = end_date + timedelta(days=1)
+    # Whole months covered by the range
+    first_month = month_start(start_date) if start_date.day == 1 else _next_month(month_start(start_date))
+    after_last_month = month_start(end_exclusive)
+
+    if use_rollup is None:
+        use_rollup = LEDGER_ROLLUP_ENABLED
+    if not use_rollup or first_month >= after_last_month:
+        _add_raw(db, ledger, start_date, end_exclusive)
+        return ledger
+
+    # Partial month at the start, whole months from the rollup, partial month at the end
+    if start_date < first_month:
+        _add_raw(db, ledger, start_date, first_month)
+    rollups = db.query(
+        models.MonthlyLedgerRollup.month,
+        models.MonthlyLedgerRollup.record_type,
+        models.MonthlyLedgerRollup.total_amount,
+        models.MonthlyLedgerRollup.record_count
+    ).filter(
+        models.MonthlyLedgerRollup.month >= first_month,
+        models.MonthlyLedgerRollup.month < after_last_month
+    ).all()
+    for month, record_type, amount, count in rollups:
+        _add_month(ledger, month.strftime("%Y-%m"), record_type, amount, count)
+    if after_last_month < end_exclusive:
+        _add_raw(db, ledger, after_last_month, end_exclusive)
+    return ledger
+
+
+def rebuild(db: Session, start_month: Optional[date] = None, end_month: Optional[date] = None) -> int:
+    """
+    Recompute rollup rows from financial_records for the months from start_month
+    through end_month (all months when omitted) and commit. Returns the number of rows written.
+    """
+    rollup = db.query(models.MonthlyLedgerRollup)
+    records = db.query(models.FinancialRecord.record_type, models.FinancialRecord.amount, models.FinancialRecord.record_date)
+    if start_month:
+        start_month = month_start(start_month)
+        rollup = rollup.filter(models.MonthlyLedgerRollup.month >= start_month)
+        records = records.filter(models.FinancialRecord.record_date >= start_month)
+    if end_month:
+        after_end = _next_month(month_start(end_month))
+        rollup = rollup.filter(models.MonthlyLedgerRollup.month < after_end)
+        records = records.filter(models.FinancialRecord.record_date < after_end)
+
+    try:
+        rollup.delete(synchronize_session=False)
+        year = extract("year", models.FinancialRecord.record_date)
+        month = extract("month", models.FinancialRecord.record_date)
+        grouped = records.with_entities(
+            year, month,
+            models.FinancialRecord.record_type,
+            func.sum(models.FinancialRecord.amount),
+            func.count(models.FinancialRecord.record_id)
+        ).group_by(year, month, models.FinancialRecord.record_type).all()
+        now = datetime.now()
+        db.bulk_insert_mappings(models.MonthlyLedgerRollup, [
+            {
+                "month": date(int(record_year), int(record_month), 1),
+                "record_type": record_type,
+                "total_amount": float(amount or 0),
+                "record_count": count,
+                "updated_at": now
+            }
+            for record_year, record_month, record_type, amount, count in grouped
+        ])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    logger.info(f"Rebuilt {len(grouped)} monthly ledger rollup rows")
+    return len(grouped)
+
@@ -0,0 +1,271 @@
+"""
+Content-addressed cache for chat completion responses.
+
+Entries are keyed by a hash of model, system prompt and user prompt. A bounded
+in-process LRU tier answers repeat prompts without I/O, and an optional SQLite
+tier (LLM_CACHE_PATH) lets several workers share responses. TTLs are set per
+AIService method through the ChatRequest task name.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Any
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH")  # SQLite file for the shared tier; disabled when unset
+LLM_CACHE_DEFAULT_TTL = int(os.getenv("LLM_CACHE_DEFAULT_TTL", "600"))
+LLM_CACHE_PURGE_INTERVAL = float(os.getenv("LLM_CACHE_PURGE_INTERVAL", "300"))  # seconds between deletes of expired disk entries
+
+# Seconds a response stays fresh, by ChatRequest task (AIService method or stage). 0 disables caching.
+CACHE_TTLS = {
+    "extract_client_requirements": 600,
+    "suggest_client_tasks": 600,
+    "predict_task_timeline": 3600,
+    "analyze_meeting_transcript": 86400,
+    "analyze_meeting_chunk": 86400,
+    "summarize_meeting_chunks": 86400,
+    "generate_marketing_insights": 3600,
+    "analyze_financial_data": 900,
+    "analyze_employee_performance": 3600,
+    "analyze_team_performance": 3600,
+    "analyze_task_progress": 300,
+    "analyze_resume": 86400,
+    "generate_text": 0,
+    "generate_structured_response": 600,
+    "generate_assistant_response": 0,
+}
+
+
+def cache_key(model: str, system: str, prompt: str) -> str:
+    """Stable hash of everything that determines a completion."""
+    raw = json.dumps([model, system, prompt], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def ttl_for(task: Optional[str]) -> int:
+    return CACHE_TTLS.get(task, LLM_CACHE_DEFAULT_TTL)
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "latency", "tokens")
+
+    def __init__(self, value: str, expires_at: float, latency: float, tokens: int):
+        self.value = value
+        self.expires_at = expires_at
+        self.latency = latency
+        self.tokens = tokens
+
+
+class LLMCache:
+    def __init__(self, max_entries: int = LLM_CACHE_MAX_ENTRIES, max_bytes: int = LLM_CACHE_MAX_BYTES,
+                 path: Optional[str] = LLM_CACHE_PATH, enabled: bool = LLM_CACHE_ENABLED):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.path = path
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "saved_seconds": 0.0,
+            "saved_tokens": 0,
+        }
+        self._task_stats: Dict[str, Dict[str, int]] = {}
+        self._next_purge = 0.0
+        if self.enabled and self.path:
+            self._init_disk()
+
+    # Disk tier
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            self._local.conn = conn
+        return conn
+
+    def _init_disk(self):
+        try:
+            conn = self._connection()
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "cache_key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, "
+                "latency REAL NOT NULL, tokens INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_expires_at ON llm_cache (expires_at)")
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Disabling on-disk LLM cache at {self.path}: {e}")
+            self.path = None
+
+    def _disk_get(self, key: str) -> Optional[_Entry]:
+        try:
+            row = self._connection().execute(
+                "SELECT value, expires_at, latency, tokens FROM llm_cache WHERE cache_key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache read failed: {e}")
+            return None
+        if row is None or row[1] <= time.time():
+            return None
+        return _Entry(*row)
+
+    def _disk_set(self, key: str, entry: _Entry):
+        try:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (cache_key, value, expires_at, latency, tokens) VALUES (?, ?, ?, ?, ?)",
+                (key, entry.value, entry.expires_at, entry.latency, entry.tokens)
+            )
+            if self._purge_due():
+                # Expired rows are never returned, so they only need clearing out now and then
+                conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache write failed: {e}")
+
+    def _purge_due(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_purge:
+                return False
+            self._next_purge = now + LLM_CACHE_PURGE_INTERVAL
+            return True
+
+    # Memory tier
+
+    def _memory_get(self, key: str) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _memory_set(self, key: str, entry: _Entry):
+        size = len(entry.value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats["evictions"] += 1
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry.value)
+
+    # Public API
+
+    def _record(self, task: Optional[str], outcome: str, entry: Optional[_Entry] = None):
+        with self._lock:
+            self._stats[outcome] += 1
+            if entry is not None:
+                self._stats["saved_seconds"] += entry.latency
+                self._stats["saved_tokens"] += entry.tokens
+            counters = self._task_stats.setdefault(task or "default", {"hits": 0, "misses": 0})
+            counters["misses" if outcome == "misses" else "hits"] += 1
+
+    def get(self, model: str, system: str, prompt: str, task: Optional[str] = None) -> Optional[str]:
+        """Return a fresh cached response or None."""
+        if not self.enabled or ttl_for(task) <= 0:
+            return None
+        key = cache_key(model, system, prompt)
+        entry = self._memory_get(key)
+        if entry is not None:
+            self._record(task, "memory_hits", entry)
+            return entry.value
+        if self.path:
+            entry = self._disk_get(key)
+            if entry is not None:
+                self._memory_set(key, entry)
+                self._record(task, "disk_hits", entry)
+                return entry.value
+        self._record(task, "misses")
+        return None
+
+    def set(self, model: str, system: str, prompt: str, value: str, task: Optional[str] = None,
+            latency: float = 0.0, tokens: int = 0):
+        """Store a response along with what it cost to produce."""
+        ttl = ttl_for(task)
+        if not self.enabled or ttl <= 0:
+            return
+        key = cache_key(model, system, prompt)
+        entry = _Entry(value, time.time() + ttl, latency, tokens)
+        self._memory_set(key, entry)
+        if self.path:
+            self._disk_set(key, entry)
+        with self._lock:
+            self._stats["stores"] += 1
+
+    async def get_async(self, model: str, system: str, prompt: str, task: Optional[str] = None) -> Optional[str]:
+        if not self.path:
+            return self.get(model, system, prompt, task)
+        return await asyncio.to_thread(self.get, model, system, prompt, task)
+
+    async def set_async(self, model: str, system: str, prompt: str, value: str, task: Optional[str] = None,
+                        latency: float = 0.0, tokens: int = 0):
+        if not self.path:
+            return self.set(model, system, prompt, value, task, latency, tokens)
+        await asyncio.to_thread(self.set, model, system, prompt, value, task, latency, tokens)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.path:
+            try:
+                conn = self._connection()
+                conn.execute("DELETE FROM llm_cache")
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"LLM cache clear failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+            lookups = hits + self._stats["misses"]
+            return {
+                "enabled": self.enabled,
+                "disk_tier": bool(self.path),
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                **self._stats,
+                "hit_rate": (hits / lookups) * 100 if lookups > 0 else 0,
+                "by_task": {task: dict(counters) for task, counters in self._task_stats.items()},
+            }
+
+
+# Shared cache instance
+cache = LLMCache()
@@ -0,0 +1,108 @@
+"""
+Chat completion client shared by AIService and the routers.
+
+Every completion passes through here: the response cache is checked first,
+identical in-flight requests are coalesced, and only then is the configured
+provider (see services.llm_providers) called, under the deadlines, retries
+and circuit breaker in services.resilience. Blocking entry points serve
+scripts and background threads; async ones let route handlers await
+completions without stalling the event loop.
+"""
+import time
+import asyncio
+import logging
+from typing import AsyncIterator
+
+from services.llm_cache import cache, cache_key
+from services.llm_providers import ChatRequest, DEFAULT_MODEL, get_provider
+from services.single_flight import SingleFlight
+from services import resilience
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["ChatRequest", "DEFAULT_MODEL", "flights", "complete", "complete_async", "stream_async", "aclose"]
+
+# Identical completions already in flight are shared rather than re-sent
+flights = SingleFlight()
+
+
+def _fetch(request: ChatRequest) -> str:
+    started = time.perf_counter()
+    provider = get_provider()
+    content, tokens = resilience.call(lambda timeout: provider.complete(request, timeout), request.task)
+    cache.set(request.model, request.system, request.prompt, content, request.task,
+              latency=time.perf_counter() - started, tokens=tokens)
+    return content
+
+
+async def _fetch_async(request: ChatRequest) -> str:
+    started = time.perf_counter()
+    provider = get_provider()
+    content, tokens = await resilience.call_async(lambda: provider.complete_async(request), request.task)
+    await cache.set_async(request.model, request.system, request.prompt, content, request.task,
+                          latency=time.perf_counter() - started, tokens=tokens)
+    return content
+
+
+def complete(request: ChatRequest) -> str:
+    """Run a chat completion and return the message content, blocking the caller."""
+    cached = cache.get(request.model, request.system, request.prompt, request.task)
+    if cached is not None:
+        return cached
+    key = cache_key(request.model, request.system, request.prompt)
+    return flights.do(key, lambda: _fetch(request))
+
+
+async def complete_async(request: ChatRequest) -> str:
+    """Run a chat completion without blocking the event loop and return the message content."""
+    cached = await cache.get_async(request.model, request.system, request.prompt, request.task)
+    if cached is not None:
+        return cached
+    key = cache_key(request.model, request.system, request.prompt)
+    return await flights.do_async(key, lambda: _fetch_async(request))
+
+
+async def stream_async(request: ChatRequest) -> AsyncIterator[str]:
+    """
+    Stream a chat completion, yielding content deltas as the provider sends them.
+    A cached response is yielded whole; a completed stream is cached like any other.
+    """
+    cached = await cache.get_async(request.model, request.system, request.prompt, request.task)
+    if cached is not None:
+        yield cached
+        return
+    started = time.perf_counter()
+    parts = []
+    # Streams are not retried once started, but still respect the circuit breaker and
+    # the task's deadline, which covers the whole stream as it does a single completion
+    resilience.breaker.allow()
+    deadline = time.monotonic() + resilience.deadline_for(request.task)
+    stream = get_provider().stream_async(request)
+    try:
+        while True:
+            try:
+                delta = await asyncio.wait_for(stream.__anext__(), max(0.0, deadline - time.monotonic()))
+            except StopAsyncIteration:
+                break
+            except asyncio.TimeoutError:
+                resilience.breaker.count("deadline_exceeded")
+                raise resilience.DeadlineExceeded(f"Deadline for {request.task or 'completion'} exceeded")
+            parts.append(delta)
+            yield delta
+    except (asyncio.CancelledError, GeneratorExit):
+        # The consumer went away; that says nothing about the provider
+        resilience.breaker.record_release()
+        raise
+    except Exception as e:
+        resilience.record_error(e)
+        raise
+    finally:
+        await stream.aclose()
+    resilience.breaker.record_success()
+    await cache.set_async(request.model, request.system, request.prompt, "".join(parts).strip(), request.task,
+                          latency=time.perf_counter() - started)
+
+
+async def aclose():
+    """Release provider resources such as pooled HTTP clients (called on application shutdown)."""
+    await get_provider().aclose()
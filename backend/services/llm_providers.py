@@ -0,0 +1,380 @@
+"""
+Chat completion providers.
+
+The provider is chosen with LLM_PROVIDER:
+- "openai" (default) sends completions to the OpenAI REST API over pooled httpx clients.
+- "local" is a deterministic stand-in that answers every AIService method with
+  schema-valid output after a configurable latency and token rate, so the AI
+  routes can be load-tested without network access or spend.
+"""
+import os
+import json
+import re
+import time
+import random
+import asyncio
+import hashlib
+import logging
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai")
+DEFAULT_MODEL = os.getenv("LLM_MODEL", "gpt-4o")
+
+# OpenAI connection settings
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+
+# Connection pool settings
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "120"))
+
+# Local stand-in settings
+LOCAL_LLM_LATENCY = float(os.getenv("LOCAL_LLM_LATENCY", "0.5"))  # seconds before the first token
+LOCAL_LLM_TOKENS_PER_SECOND = float(os.getenv("LOCAL_LLM_TOKENS_PER_SECOND", "50"))
+LOCAL_LLM_ERROR_RATE = float(os.getenv("LOCAL_LLM_ERROR_RATE", "0"))
+
+
+@dataclass(frozen=True)
+class ChatRequest:
+    """A single system + user prompt completion request."""
+    system: str
+    prompt: str
+    model: str = DEFAULT_MODEL
+    task: Optional[str] = None  # kind of completion (usually the AIService method), used for cache TTLs and stats
+
+    def messages(self) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.prompt}
+        ]
+
+    def payload(self) -> Dict[str, object]:
+        return {"model": self.model, "messages": self.messages()}
+
+
+class LLMProvider:
+    """Interface every provider implements. complete methods return (content, total_tokens)."""
+    name = "base"
+
+    def complete(self, request: ChatRequest, timeout: Optional[float] = None) -> Tuple[str, int]:
+        """Blocking completion; timeout (seconds) caps how long the call may wait."""
+        raise NotImplementedError
+
+    async def complete_async(self, request: ChatRequest) -> Tuple[str, int]:
+        raise NotImplementedError
+
+    async def stream_async(self, request: ChatRequest) -> AsyncIterator[str]:
+        raise NotImplementedError
+        yield  # pragma: no cover
+
+    async def aclose(self):
+        pass
+
+
+class OpenAIProvider(LLMProvider):
+    name = "openai"
+
+    def __init__(self, api_key: Optional[str] = OPENAI_API_KEY, base_url: str = OPENAI_BASE_URL):
+        self.api_key = api_key
+        self.base_url = base_url
+        self._sync_client: Optional[httpx.Client] = None
+        self._sync_client_lock = threading.Lock()
+        # One async client per event loop, with the generator that closes it
+        self._async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def _client_options(self) -> Dict[str, object]:
+        return {
+            "base_url": self.base_url,
+            "headers": {"Authorization": f"Bearer {self.api_key}"},
+            "limits": httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS
+            ),
+            "timeout": LLM_REQUEST_TIMEOUT
+        }
+
+    def get_sync_client(self) -> httpx.Client:
+        """Return the process-wide blocking HTTP client, creating it on first use."""
+        if self._sync_client is None:
+            with self._sync_client_lock:
+                if self._sync_client is None:
+                    self._sync_client = httpx.Client(**self._client_options())
+        return self._sync_client
+
+    @staticmethod
+    async def _async_client_lifetime(client: httpx.AsyncClient) -> AsyncIterator[httpx.AsyncClient]:
+        # The loop finalizes its async generators before closing (asyncio.run and uvicorn
+        # call shutdown_asyncgens), so the client's pool is closed on the loop that owns it
+        try:
+            yield client
+        finally:
+            await client.aclose()
+
+    async def get_async_client(self) -> httpx.AsyncClient:
+        """
+        Return the pooled async HTTP client of the running event loop, creating it on
+        first use. Each loop has its own client, closed when that loop shuts down.
+        """
+        loop = asyncio.get_running_loop()
+        entry = self._async_clients.get(loop)
+        if entry is None:
+            for closed_loop in [other for other in self._async_clients if other.is_closed()]:
+                del self._async_clients[closed_loop]
+            client = httpx.AsyncClient(**self._client_options())
+            lifetime = self._async_client_lifetime(client)
+            self._async_clients[loop] = (client, lifetime)
+            await lifetime.__anext__()
+            return client
+        return entry[0]
+
+    @staticmethod
+    def _parse_response(response: httpx.Response) -> Tuple[str, int]:
+        response.raise_for_status()
+        data = response.json()
+        content = data["choices"][0]["message"]["content"].strip()
+        tokens = (data.get("usage") or {}).get("total_tokens", 0)
+        return content, tokens
+
+    def complete(self, request: ChatRequest, timeout: Optional[float] = None) -> Tuple[str, int]:
+        request_timeout = min(timeout, LLM_REQUEST_TIMEOUT) if timeout else httpx.USE_CLIENT_DEFAULT
+        response = self.get_sync_client().post("/chat/completions", json=request.payload(), timeout=request_timeout)
+        return self._parse_response(response)
+
+    async def complete_async(self, request: ChatRequest) -> Tuple[str, int]:
+        response = await (await self.get_async_client()).post("/chat/completions", json=request.payload())
+        return self._parse_response(response)
+
+    async def stream_async(self, request: ChatRequest) -> AsyncIterator[str]:
+        payload = {**request.payload(), "stream": True}
+        async with (await self.get_async_client()).stream("POST", "/chat/completions", json=payload) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                choices = json.loads(data).get("choices") or []
+                delta = choices[0].get("delta", {}).get("content") if choices else None
+                if delta:
+                    yield delta
+
+    async def aclose(self):
+        entry = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if entry is not None:
+            await entry[1].aclose()
+        if self._sync_client is not None:
+            self._sync_client.close()
+            self._sync_client = None
+
+
+class LocalProvider(LLMProvider):
+    """
+    Deterministic offline stand-in. The same request always produces the same
+    response; timing follows a fixed first-token latency plus a token rate.
+    An optional error rate simulates an unreliable provider.
+    """
+    name = "local"
+
+    def __init__(self, latency: float = LOCAL_LLM_LATENCY, tokens_per_second: float = LOCAL_LLM_TOKENS_PER_SECOND,
+                 error_rate: float = LOCAL_LLM_ERROR_RATE):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate  # fraction of calls that fail with a connection error
+
+    @staticmethod
+    def _count_tokens(text: str) -> int:
+        # Roughly four characters per token for English text
+        return max(1, len(text) // 4)
+
+    def _duration(self, content: str) -> float:
+        if self.tokens_per_second <= 0:
+            return self.latency
+        return self.latency + self._count_tokens(content) / self.tokens_per_second
+
+    def _usage(self, request: ChatRequest, content: str) -> int:
+        return self._count_tokens(request.system + request.prompt) + self._count_tokens(content)
+
+    def _maybe_fail(self):
+        if self.error_rate and random.random() < self.error_rate:
+            raise httpx.ConnectError("Simulated provider failure")
+
+    def complete(self, request: ChatRequest, timeout: Optional[float] = None) -> Tuple[str, int]:
+        self._maybe_fail()
+        content = self.respond(request)
+        duration = self._duration(content)
+        if timeout is not None and duration > timeout:
+            time.sleep(timeout)
+            raise httpx.ReadTimeout("Simulated provider timeout")
+        time.sleep(duration)
+        return content, self._usage(request, content)
+
+    async def complete_async(self, request: ChatRequest) -> Tuple[str, int]:
+        self._maybe_fail()
+        content = self.respond(request)
+        await asyncio.sleep(self._duration(content))
+        return content, self._usage(request, content)
+
+    async def stream_async(self, request: ChatRequest) -> AsyncIterator[str]:
+        self._maybe_fail()
+        content = self.respond(request)
+        await asyncio.sleep(self.latency)
+        # Emit roughly one token per chunk at the configured rate
+        delay = 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0
+        for start in range(0, len(content), 4):
+            yield content[start:start + 4]
+            if delay:
+                await asyncio.sleep(delay)
+
+    def respond(self, request: ChatRequest) -> str:
+        """Build the canned response for a request, seeded by its content."""
+        seed = hashlib.sha256((request.system + request.prompt).encode("utf-8")).hexdigest()
+        rng = random.Random(seed)
+        if request.task in _LOCAL_REQUEST_RESPONSES:
+            response = _LOCAL_REQUEST_RESPONSES[request.task](rng, request)
+            return json.dumps(response)
+        builder = _LOCAL_RESPONSES.get(request.task)
+        if builder is None:
+            return f"Local response {seed[:8]} for: {request.prompt.strip()[:200]}"
+        response = builder(rng)
+        return response if isinstance(response, str) else json.dumps(response)
+
+
+_SKILLS = ["project management", "copywriting", "graphic design", "WordPress", "SEO", "video editing",
+           "analytics", "client communication", "branding", "front-end development"]
+_ISSUES = ["Unclear requirements", "Dependency on client feedback", "Tight deadline", "Asset availability",
+           "Scope creep", "Third-party integration delays"]
+_AREAS = ["pricing", "operations", "marketing", "staffing", "collections", "tooling"]
+
+
+def _pick(rng: random.Random, items: List[str], low: int = 2, high: int = 4) -> List[str]:
+    return rng.sample(items, rng.randint(low, min(high, len(items))))
+
+
+def _local_meeting_analysis(rng: random.Random) -> Dict[str, Any]:
+    return {
+        "summary": "The team reviewed progress and agreed on next steps for the upcoming sprint.",
+        "action_items": [{"task": f"Follow up on {item}", "assignee": rng.choice(["Alex", "Sam", "Priya", None])}
+                         for item in _pick(rng, _SKILLS)],
+        "key_insights": [f"{issue} was discussed" for issue in _pick(rng, _ISSUES)],
+        "sentiment_analysis": {"sentiment": rng.choice(["positive", "neutral", "negative"]),
+                               "confidence": round(rng.uniform(0.5, 0.99), 2)},
+    }
+
+
+_LOCAL_RESPONSES = {
+    "extract_client_requirements": lambda rng: "\n".join(
+        f"{item.capitalize()} support for the client" for item in _pick(rng, _SKILLS, 2, 5)
+    ),
+    "suggest_client_tasks": lambda rng: "\n".join(
+        f"{item.title()} review: Plan and deliver the {item} work, {rng.randint(1, 16)} hours"
+        for item in _pick(rng, _SKILLS, 3, 5)
+    ),
+    "predict_task_timeline": lambda rng: {
+        "estimated_time": rng.randint(1, 40),
+        "task_complexity": rng.choice(["simple", "moderate", "complex"]),
+        "recommended_skills": _pick(rng, _SKILLS, 3, 5),
+        "potential_challenges": _pick(rng, _ISSUES),
+    },
+    "analyze_meeting_transcript": _local_meeting_analysis,
+    "analyze_meeting_chunk": _local_meeting_analysis,
+    "summarize_meeting_chunks": lambda rng: (
+        "The team reviewed progress on " + ", ".join(_pick(rng, _SKILLS)) + " and agreed on next steps."
+    ),
+    "generate_marketing_insights": lambda rng: {
+        "performance_analysis": {"strengths": ["Strong email engagement"], "weaknesses": ["High cost per click"]},
+        "trend_identification": [f"Growing interest in {item}" for item in _pick(rng, _SKILLS)],
+        "optimization_suggestions": [{"area": area, "suggestion": f"Rebalance spend on {area}"}
+                                     for area in _pick(rng, _AREAS)],
+    },
+    "analyze_financial_data": lambda rng: {
+        "financial_health": {"status": rng.choice(["healthy", "stable", "at risk"]),
+                             "explanation": "Based on income, expenses and the recent trend."},
+        "key_insights": [f"{area.capitalize()} costs changed noticeably" for area in _pick(rng, _AREAS)],
+        "recommendations": [{"area": area, "action": f"Review {area} spending"} for area in _pick(rng, _AREAS, 3, 3)],
+        "prediction": f"Profit expected to change by {rng.randint(-10, 15)}% next quarter.",
+    },
+    "analyze_employee_performance": lambda rng: {
+        "performance_assessment": {"rating": rng.choice(["excellent", "good", "needs improvement"]),
+                                   "explanation": "Derived from attendance and task metrics."},
+        "strengths": _pick(rng, ["Punctual", "Efficient", "Reliable", "Thorough"]),
+        "improvement_areas": _pick(rng, ["Time estimates", "Documentation", "Communication"], 1, 2),
+        "recommendations": _pick(rng, ["Set weekly goals", "Pair on complex tasks", "Log time daily"], 1, 3),
+    },
+    "analyze_task_progress": lambda rng: {
+        "analysis": "Progress is on track based on the latest update.",
+        "suggestions": _pick(rng, ["Upload screenshots", "Update the description", "Track time spent"]),
+        "potential_issues": _pick(rng, _ISSUES, 0, 2),
+    },
+    "analyze_resume": lambda rng: {
+        "key_skills": _pick(rng, _SKILLS, 3, 6),
+        "years_experience": rng.randint(0, 15),
+        "education": rng.choice(["Bachelor's degree", "Master's degree", "Diploma"]),
+        "relevant_experience": ["Agency work", "Freelance projects"],
+        "skills_match_score": rng.randint(20, 95),
+        "strengths": _pick(rng, ["Portfolio", "Communication", "Tooling"]),
+        "gaps": _pick(rng, ["Leadership", "Client handling", "Testing"], 1, 2),
+        "recommendation": rng.choice(["Reject", "Consider", "Interview", "Strong Candidate"]),
+    },
+    "generate_structured_response": lambda rng: {
+        "summary": "Locally generated structured response.",
+        "key_insights": [f"Insight about {item}" for item in _pick(rng, _SKILLS)],
+        "recommendations": [f"Invest in {item}" for item in _pick(rng, _SKILLS)],
+    },
+    "generate_text": lambda rng: (
+        f"Subject: {rng.choice(['A quick update', 'Something new for you', 'Your next step'])}\n\n"
+        "Hi there,\n\nWe have news we think you will like. " * rng.randint(1, 3)
+        + "\n\nBest regards,\nThe HyperFlow team\n\nCall to action: Book a call"
+    ),
+    "generate_assistant_response": lambda rng: (
+        "Here is what I found: " + ", ".join(_pick(rng, _SKILLS)) + " are the most relevant areas."
+    ),
+}
+
+
+def _local_team_performance(rng: random.Random, request: ChatRequest) -> Dict[str, Any]:
+    employees = re.findall(r"^\s*Employee (\d+):", request.prompt, re.MULTILINE)
+    return {employee: _LOCAL_RESPONSES["analyze_employee_performance"](rng) for employee in employees}
+
+
+# Builders that also need the request, to answer for each item listed in the prompt
+_LOCAL_REQUEST_RESPONSES = {
+    "analyze_team_performance": _local_team_performance,
+}
+
+PROVIDERS = {
+    "openai": OpenAIProvider,
+    "local": LocalProvider,
+}
+
+_provider: Optional[LLMProvider] = None
+
+
+def get_provider() -> LLMProvider:
+    """Return the configured provider, creating it on first use."""
+    global _provider
+    if _provider is None:
+        provider_class = PROVIDERS.get(LLM_PROVIDER)
+        if provider_class is None:
+            raise ValueError(f"Unknown LLM_PROVIDER '{LLM_PROVIDER}'. Expected one of: {', '.join(PROVIDERS)}")
+        _provider = provider_class()
+        logger.info(f"Using LLM provider: {_provider.name}")
+    return _provider
+
+
+def set_provider(provider: LLMProvider):
+    """Replace the active provider (used by benchmarks and scripts)."""
+    global _provider
+    _provider = provider
@@ -0,0 +1,85 @@
+"""
+Employee performance metrics from daily attendance and tasks.
+
+team_metrics() computes the metrics of any number of employees at once. The
+attendance days and tasks of the whole team each go into one DataFrame, and
+every metric is a single grouped aggregation over it, so the cost does not grow
+with a per-employee loop. The single-employee analysis uses the same function,
+so both report identical numbers.
+"""
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, List
+
+from dotenv import load_dotenv
+
+from services.attendance import summarize_day
+
+# Load environment variables
+load_dotenv()
+
+TEAM_NARRATIVE_BATCH_SIZE = int(os.getenv("TEAM_NARRATIVE_BATCH_SIZE", "10"))
+TEAM_NARRATIVE_CONCURRENCY = int(os.getenv("TEAM_NARRATIVE_CONCURRENCY", "8"))
+
+METRICS = ("avg_hours_worked", "punctuality_rate", "task_completion_rate", "avg_task_time", "efficiency_rate")
+
+
+def _day_values(day: Dict[str, Any]) -> Dict[str, Any]:
+    """hours_worked and is_late of an attendance day, computed from its times when not already given."""
+    if "hours_worked" in day:
+        return day
+    return {**day, **summarize_day([(
+        datetime.fromisoformat(day["login_time"]) if day.get("login_time") else None,
+        datetime.fromisoformat(day["logout_time"]) if day.get("logout_time") else None
+    )])}
+
+
+def team_metrics(user_ids: Iterable[int], attendance_days: Iterable[Dict[str, Any]],
+                 tasks: Iterable[Dict[str, Any]]) -> Dict[int, Dict[str, float]]:
+    """
+    Metrics for each employee in user_ids. Attendance days carry user_id,
+    hours_worked and is_late (or login_time/logout_time); tasks carry user_id,
+    status, estimated_time and actual_time. Metrics without data are 0.
+    """
+    import numpy as np
+    import pandas as pd
+
+    index = pd.Index(list(user_ids), name="user_id")
+    metrics = pd.DataFrame(np.nan, index=index, columns=list(METRICS))
+
+    attendance_df = pd.DataFrame([_day_values(day) for day in attendance_days],
+                                 columns=["user_id", "hours_worked", "is_late"])
+    if not attendance_df.empty:
+        attendance_df["hours_worked"] = pd.to_numeric(attendance_df["hours_worked"])
+        attendance_df["is_late"] = attendance_df["is_late"].astype(bool)
+        by_user = attendance_df.groupby("user_id")
+        metrics["avg_hours_worked"] = by_user["hours_worked"].mean()
+        metrics["punctuality_rate"] = 100 - by_user["is_late"].mean() * 100
+
+    task_df = pd.DataFrame(list(tasks), columns=["user_id", "status", "estimated_time", "actual_time"])
+    if not task_df.empty:
+        completed = task_df["status"] == "completed"
+        estimated_time = pd.to_numeric(task_df["estimated_time"])
+        actual_time = pd.to_numeric(task_df["actual_time"])
+        task_df["completed"] = completed
+        task_df["completed_time"] = actual_time.where(completed)
+        # Estimated vs actual time; tasks without a usable actual time are left out
+        task_df["efficiency"] = (estimated_time / actual_time).where(completed).replace([np.inf, -np.inf], np.nan)
+        by_user = task_df.groupby("user_id")
+        metrics["task_completion_rate"] = by_user["completed"].mean() * 100
+        metrics["avg_task_time"] = by_user["completed_time"].mean()
+        metrics["efficiency_rate"] = by_user["efficiency"].mean() * 100
+
+    return {
+        int(user_id): {name: float(value) for name, value in row.items()}
+        for user_id, row in metrics.fillna(0).to_dict("index").items()
+    }
+
+
+def employee_metrics(attendance_days: List[Dict[str, Any]], tasks: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Metrics of a single employee."""
+    return team_metrics(
+        [0],
+        [{**day, "user_id": 0} for day in attendance_days],
+        [{**task, "user_id": 0} for task in tasks]
+    )[0]
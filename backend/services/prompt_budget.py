@@ -0,0 +1,208 @@
+"""
+Token budgeting for client history sent along with AI prompts.
+
+Client history can run to thousands of tasks and messages. Before it reaches
+the model it is compacted to fit a token budget: the most recent items are
+kept, the remaining room goes to the items most relevant to the new input, and
+everything left over is folded into a short summary of counts.
+"""
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+CLIENT_HISTORY_TOKEN_BUDGET = int(os.getenv("CLIENT_HISTORY_TOKEN_BUDGET", "1500"))
+CLIENT_HISTORY_RECENT_ITEMS = int(os.getenv("CLIENT_HISTORY_RECENT_ITEMS", "5"))
+CLIENT_HISTORY_ITEM_MAX_TOKENS = int(os.getenv("CLIENT_HISTORY_ITEM_MAX_TOKENS", "80"))
+
+# Rough size of a short history line; used to decide how many rows are worth loading
+MIN_ITEM_TOKENS = 12
+# Characters kept per text column when loading history from the database
+ITEM_MAX_CHARS = CLIENT_HISTORY_ITEM_MAX_TOKENS * 4
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_WORD_RE = re.compile(r"[a-z][a-z0-9]{2,}")
+_STOPWORDS = {
+    "the", "and", "for", "with", "that", "this", "from", "have", "has", "are", "was", "were", "will",
+    "would", "should", "could", "can", "our", "your", "you", "they", "them", "their", "there", "here",
+    "what", "when", "which", "who", "how", "all", "any", "some", "need", "needs", "want", "like",
+    "also", "just", "into", "about", "please", "thanks", "thank", "hi", "hello", "not", "but", "its",
+    "been", "being", "more", "most", "very", "get", "got", "make", "new", "one", "per", "via"
+}
+
+
+def count_tokens(text: str) -> int:
+    """
+    Approximate the model token count locally: words and punctuation count as
+    one token each, with long words split every four characters.
+    """
+    if not text:
+        return 0
+    return sum((len(piece) + 3) // 4 if len(piece) > 4 else 1 for piece in _TOKEN_RE.findall(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    if count_tokens(text) <= max_tokens:
+        return text
+    used = 0
+    for match in _TOKEN_RE.finditer(text):
+        piece = match.group(0)
+        used += (len(piece) + 3) // 4 if len(piece) > 4 else 1
+        if used > max_tokens:
+            return text[:match.start()].rstrip() + "..."
+    return text
+
+
+def keywords(text: str, limit: Optional[int] = None) -> List[str]:
+    """Distinct content words of a text, most frequent first."""
+    counts = Counter(word for word in _WORD_RE.findall((text or "").lower()) if word not in _STOPWORDS)
+    return [word for word, _ in counts.most_common(limit)]
+
+
+def fetch_limit(budget: int = CLIENT_HISTORY_TOKEN_BUDGET) -> int:
+    """Most history rows of one kind that could possibly fit in the budget."""
+    return max(CLIENT_HISTORY_RECENT_ITEMS, budget // MIN_ITEM_TOKENS)
+
+
+@dataclass
+class HistoryItem:
+    kind: str
+    text: str
+    created_at: Optional[datetime] = None
+    label: Optional[str] = None  # task status or communication channel
+    tokens: int = 0
+    relevance: float = 0.0
+
+    def line(self) -> str:
+        when = self.created_at.strftime("%Y-%m-%d") if self.created_at else "undated"
+        label = f" ({self.label})" if self.label else ""
+        return f"- [{when}] {self.kind}{label}: {self.text}"
+
+
+def _parse_date(value: Any) -> Optional[datetime]:
+    """A datetime from a record, as naive UTC so naive and timezone-aware values sort together."""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _to_item(kind: str, record: Dict[str, Any]) -> Optional[HistoryItem]:
+    if kind == "task":
+        text = record.get("title") or ""
+        if record.get("description"):
+            text = f"{text} - {record['description']}" if text else record["description"]
+        label = record.get("status")
+    else:
+        text = record.get("message") or record.get("content") or ""
+        label = record.get("channel")
+    text = " ".join(str(text).split())
+    if not text:
+        return None
+    return HistoryItem(kind=kind, text=text, created_at=_parse_date(record.get("created_at")), label=label)
+
+
+def _collect(client_history: Union[Dict[str, Any], List[Dict[str, Any]]]) -> List[HistoryItem]:
+    if isinstance(client_history, list):
+        records = [("task" if "title" in record else "communication", record) for record in client_history]
+    else:
+        records = [("task", record) for record in client_history.get("tasks") or []]
+        records += [("communication", record) for record in client_history.get("communications") or []]
+    items = [_to_item(kind, record) for kind, record in records if isinstance(record, dict)]
+    return [item for item in items if item is not None]
+
+
+def _summarize(omitted: Iterable[HistoryItem], totals: Optional[Dict[str, Any]], shown: int) -> Optional[str]:
+    """
+    One paragraph describing what was left out. Database totals (see
+    routers/client.py) cover rows that were never loaded; otherwise the counts
+    come from the omitted items themselves.
+    """
+    omitted = list(omitted)
+    task_counts: Dict[str, int] = dict((totals or {}).get("tasks_by_status") or {})
+    channel_counts: Dict[str, int] = dict((totals or {}).get("communications_by_channel") or {})
+    if not totals:
+        for item in omitted:
+            counts = task_counts if item.kind == "task" else channel_counts
+            counts[item.label or "unknown"] = counts.get(item.label or "unknown", 0) + 1
+
+    total = sum(task_counts.values()) + sum(channel_counts.values())
+    if not omitted and total <= shown:
+        return None
+
+    parts = []
+    if task_counts:
+        parts.append("tasks by status: " + ", ".join(f"{label} {count}" for label, count in sorted(task_counts.items())))
+    if channel_counts:
+        parts.append("messages by channel: " + ", ".join(f"{label} {count}" for label, count in sorted(channel_counts.items())))
+    dates = [item.created_at for item in omitted if item.created_at]
+    first = _parse_date((totals or {}).get("first_activity")) or (min(dates) if dates else None)
+    if first:
+        parts.append(f"history since {first.strftime('%Y-%m-%d')}")
+    topics = keywords(" ".join(item.text for item in omitted), 8)
+    if topics:
+        parts.append("earlier topics: " + ", ".join(topics))
+    return f"Older history (summarized, {shown} of {total or shown + len(omitted)} items shown above): " + "; ".join(parts) + "."
+
+
+def build_history_context(text: str, client_history: Union[Dict[str, Any], List[Dict[str, Any]], None],
+                          budget: int = CLIENT_HISTORY_TOKEN_BUDGET) -> str:
+    """
+    Render client history as prompt text of at most `budget` tokens.
+
+    The most recent items are kept first, remaining room is filled with the
+    items sharing the most keywords with `text`, and anything that does not fit
+    is summarized. Chosen items are listed oldest first.
+    """
+    if not client_history or budget <= 0:
+        return ""
+    items = _collect(client_history)
+    totals = client_history.get("totals") if isinstance(client_history, dict) else None
+    if not items and not totals:
+        return ""
+
+    for item in items:
+        item.text = truncate_to_tokens(item.text, CLIENT_HISTORY_ITEM_MAX_TOKENS)
+        item.tokens = count_tokens(item.line()) + 1
+
+    by_recency = sorted(items, key=lambda item: item.created_at or datetime.min, reverse=True)
+    query_terms = set(keywords(text))
+    for rank, item in enumerate(by_recency):
+        overlap = len(query_terms & set(keywords(item.text))) / len(query_terms) if query_terms else 0.0
+        # Relevance dominates; recency breaks ties between equally relevant items
+        item.relevance = overlap + 0.1 / (1 + rank)
+
+    # Leave room for the summary paragraph
+    remaining = budget - 80
+    chosen = []
+    for item in by_recency[:CLIENT_HISTORY_RECENT_ITEMS]:
+        if item.tokens <= remaining:
+            chosen.append(item)
+            remaining -= item.tokens
+    for item in sorted(by_recency[CLIENT_HISTORY_RECENT_ITEMS:], key=lambda item: item.relevance, reverse=True):
+        if item.tokens <= remaining:
+            chosen.append(item)
+            remaining -= item.tokens
+
+    chosen_ids = {id(item) for item in chosen}
+    omitted = [item for item in items if id(item) not in chosen_ids]
+    chosen.sort(key=lambda item: item.created_at or datetime.min)
+
+    lines = [item.line() for item in chosen]
+    summary = _summarize(omitted, totals, len(chosen))
+    if summary:
+        lines.append(truncate_to_tokens(summary, max(budget - sum(item.tokens for item in chosen), 0)))
+    return "\n".join(lines)
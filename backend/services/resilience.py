@@ -0,0 +1,233 @@
+"""
+Deadlines, retries and a circuit breaker for model provider calls.
+
+Each completion gets a deadline by task that bounds the whole call, retries
+included. Transient failures (timeouts, connection errors, 429 and 5xx
+responses) are retried with jittered exponential backoff while the deadline
+allows. Once a run of calls has failed, the circuit opens and further calls fail
+immediately with CircuitOpenError. AIService turns that into its usual fallback
+responses. After a cooldown a single trial call decides whether to close the
+circuit again.
+"""
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+LLM_DEFAULT_DEADLINE = float(os.getenv("LLM_DEFAULT_DEADLINE", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "8"))
+LLM_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "5"))
+LLM_CIRCUIT_COOLDOWN = float(os.getenv("LLM_CIRCUIT_COOLDOWN", "30"))
+
+# Seconds allowed per completion (all attempts together), by ChatRequest task
+TASK_DEADLINES = {
+    "extract_client_requirements": 20,
+    "suggest_client_tasks": 30,
+    "predict_task_timeline": 20,
+    "analyze_meeting_transcript": 90,
+    "analyze_meeting_chunk": 60,
+    "summarize_meeting_chunks": 30,
+    "generate_marketing_insights": 45,
+    "analyze_financial_data": 45,
+    "analyze_employee_performance": 45,
+    "analyze_team_performance": 90,
+    "analyze_task_progress": 20,
+    "analyze_resume": 45,
+    "generate_text": 60,
+    "generate_structured_response": 45,
+    "generate_assistant_response": 30,
+}
+
+
+def deadline_for(task: Optional[str]) -> float:
+    return TASK_DEADLINES.get(task, LLM_DEFAULT_DEADLINE)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the provider while the circuit is open."""
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a completion, including its retries, runs past its deadline."""
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether an error says something about provider health (and is worth retrying)."""
+    if isinstance(error, httpx.HTTPStatusError):
+        code = error.response.status_code
+        return code == 429 or code >= 500
+    return isinstance(error, (httpx.TransportError, TimeoutError, asyncio.TimeoutError, DeadlineExceeded))
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff: uniform between 0 and base * 2^attempt (capped)."""
+    return random.uniform(0, min(LLM_RETRY_MAX_DELAY, LLM_RETRY_BASE_DELAY * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = LLM_CIRCUIT_FAILURE_THRESHOLD, cooldown: float = LLM_CIRCUIT_COOLDOWN):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self._stats = {"successes": 0, "failures": 0, "retries": 0, "deadline_exceeded": 0,
+                       "short_circuited": 0, "times_opened": 0}
+
+    def allow(self):
+        """Raise CircuitOpenError unless a call may go to the provider now."""
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self._state == self.CLOSED:
+                return
+            if self._state == self.HALF_OPEN and not self._trial_in_flight:
+                # Let exactly one trial call through
+                self._trial_in_flight = True
+                return
+            self._stats["short_circuited"] += 1
+        raise CircuitOpenError("LLM provider circuit is open; failing fast")
+
+    def record_success(self):
+        with self._lock:
+            self._stats["successes"] += 1
+            self._failures = 0
+            if self._state != self.CLOSED:
+                logger.info("LLM provider circuit closed")
+            self._state = self.CLOSED
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._stats["failures"] += 1
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._stats["times_opened"] += 1
+                    logger.warning(f"LLM provider circuit opened after {self._failures} consecutive failures")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def record_release(self):
+        """A trial call ended without telling us anything about provider health."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def count(self, stat: str):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def state(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._state
+            retry_in = None
+            if state == self.OPEN:
+                retry_in = max(0.0, self.cooldown - (time.monotonic() - self._opened_at))
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "cooldown": self.cooldown,
+                "retry_in": retry_in,
+                **self._stats
+            }
+
+
+# Shared breaker for the configured provider
+breaker = CircuitBreaker()
+
+
+def record_error(error: BaseException):
+    """Count a failed provider call against the breaker if it reflects provider health."""
+    if isinstance(error, Exception) and is_transient(error):
+        breaker.record_failure()
+    else:
+        breaker.record_release()
+
+
+def call(fn: Callable[[float], Any], task: Optional[str] = None) -> Any:
+    """
+    Run fn(timeout) under the task's deadline, retrying transient failures.
+    fn receives the seconds left before the deadline and should not wait longer.
+    """
+    deadline = time.monotonic() + deadline_for(task)
+    attempt = 0
+    while True:
+        breaker.allow()
+        remaining = deadline - time.monotonic()
+        try:
+            if remaining <= 0:
+                raise DeadlineExceeded(f"Deadline for {task or 'completion'} exceeded")
+            result = fn(remaining)
+        except Exception as e:
+            record_error(e)
+            if isinstance(e, DeadlineExceeded) or (is_transient(e) and time.monotonic() >= deadline):
+                breaker.count("deadline_exceeded")
+                if not isinstance(e, DeadlineExceeded):
+                    raise DeadlineExceeded(f"Deadline for {task or 'completion'} exceeded") from e
+                raise
+            delay = backoff_delay(attempt)
+            if not is_transient(e) or attempt >= LLM_MAX_RETRIES or time.monotonic() + delay >= deadline:
+                raise
+            attempt += 1
+            breaker.count("retries")
+            logger.warning(f"Retrying {task or 'completion'} in {delay:.2f}s after error: {e}")
+            time.sleep(delay)
+        else:
+            breaker.record_success()
+            return result
+
+
+async def call_async(fn: Callable[[], Awaitable[Any]], task: Optional[str] = None) -> Any:
+    """Await fn() under the task's deadline, retrying transient failures."""
+    deadline = time.monotonic() + deadline_for(task)
+    attempt = 0
+    while True:
+        breaker.allow()
+        remaining = deadline - time.monotonic()
+        try:
+            if remaining <= 0:
+                raise DeadlineExceeded(f"Deadline for {task or 'completion'} exceeded")
+            try:
+                result = await asyncio.wait_for(fn(), remaining)
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded(f"Deadline for {task or 'completion'} exceeded")
+        except asyncio.CancelledError:
+            breaker.record_release()
+            raise
+        except Exception as e:
+            record_error(e)
+            if isinstance(e, DeadlineExceeded):
+                breaker.count("deadline_exceeded")
+                raise
+            delay = backoff_delay(attempt)
+            if not is_transient(e) or attempt >= LLM_MAX_RETRIES or time.monotonic() + delay >= deadline:
+                raise
+            attempt += 1
+            breaker.count("retries")
+            logger.warning(f"Retrying {task or 'completion'} in {delay:.2f}s after error: {e}")
+            await asyncio.sleep(delay)
+        else:
+            breaker.record_success()
+            return result
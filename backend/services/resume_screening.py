@@ -0,0 +1,225 @@
+"""
+Bulk resume screening.
+
+A batch of uploaded resumes goes through three stages:
+
+1. Text is extracted in a process pool (services.resume_text), so parsing PDFs
+   uses several cores and does not block the event loop. Uploads are read
+   just before they are sent to a worker, so at most RESUME_EXTRACT_IN_FLIGHT
+   files are held in memory at once.
+2. Resumes are deduplicated by a hash of their normalized text, both within
+   the batch and against earlier screenings for the same position. Earlier
+   assessments are reused rather than scored again.
+3. The remaining resumes are scored by AIService.analyze_resume, with at most
+   RESUME_SCREENING_CONCURRENCY completions in flight.
+
+New assessments are stored in resume_screenings, so recruiters can list them
+sorted by match score without re-running anything.
+"""
+import os
+import asyncio
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import models
+from services import resume_text
+from services.ai_service import AIService
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+RESUME_EXTRACT_WORKERS = int(os.getenv("RESUME_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+RESUME_EXTRACT_IN_FLIGHT = int(os.getenv("RESUME_EXTRACT_IN_FLIGHT", str(2 * RESUME_EXTRACT_WORKERS)))
+RESUME_SCREENING_CONCURRENCY = int(os.getenv("RESUME_SCREENING_CONCURRENCY", "8"))
+RESUME_MAX_FILES = int(os.getenv("RESUME_MAX_FILES", "200"))
+RESUME_MAX_FILE_BYTES = int(os.getenv("RESUME_MAX_FILE_BYTES", str(5 * 1024 * 1024)))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _extract_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned rather than forked, so workers do not inherit the server's threads and locks
+            _pool = ProcessPoolExecutor(
+                max_workers=max(1, RESUME_EXTRACT_WORKERS),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def shutdown():
+    """Stop the extraction workers; a new pool is started on the next batch."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+async def extract_all(files: List[Tuple[str, Any]]) -> List[Any]:
+    """
+    (text, content hash) for each (file name, upload) pair, or the exception raised for it.
+    An upload is anything with an async read(size), such as fastapi.UploadFile.
+    """
+    loop = asyncio.get_running_loop()
+    pool = _extract_pool()
+    in_flight = asyncio.Semaphore(max(1, RESUME_EXTRACT_IN_FLIGHT))
+
+    async def extract(name: str, upload) -> Tuple[str, str]:
+        async with in_flight:
+            # Read one byte past the limit so oversized files are rejected without reading them whole
+            data = await upload.read(RESUME_MAX_FILE_BYTES + 1)
+            if len(data) > RESUME_MAX_FILE_BYTES:
+                raise ValueError(f"File exceeds {RESUME_MAX_FILE_BYTES} bytes")
+            return await loop.run_in_executor(pool, resume_text.extract, name, data)
+
+    outcomes = await asyncio.gather(
+        *[extract(name, upload) for name, upload in files],
+        return_exceptions=True
+    )
+    if any(isinstance(outcome, BrokenProcessPool) for outcome in outcomes):
+        logger.error("Resume extraction pool broke; it will be restarted")
+        shutdown()
+    return outcomes
+
+
+def _score_value(analysis: Dict[str, Any]) -> Optional[float]:
+    try:
+        return float(analysis.get("skills_match_score"))
+    except (TypeError, ValueError):
+        return None
+
+
+async def _score(position: str, text: str, limit: asyncio.Semaphore) -> Dict[str, Any]:
+    async with limit:
+        return await AIService.analyze_resume_async(text, position)
+
+
+def _store(db: Session, rows: List[models.ResumeScreening]) -> List[models.ResumeScreening]:
+    """Insert new screenings. A resume stored meanwhile by a concurrent batch is returned as that existing row."""
+    try:
+        db.add_all(rows)
+        db.commit()
+        return rows
+    except IntegrityError:
+        db.rollback()
+    stored = []
+    for row in rows:
+        try:
+            db.add(row)
+            db.commit()
+            stored.append(row)
+        except IntegrityError:
+            db.rollback()
+            stored.append(db.query(models.ResumeScreening).filter(
+                models.ResumeScreening.position == row.position,
+                models.ResumeScreening.content_hash == row.content_hash
+            ).one())
+    return stored
+
+
+def _result(file_name: str, status: str, screening: Optional[models.ResumeScreening] = None,
+            error: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        "file_name": file_name,
+        "status": status,
+        "screening_id": screening.screening_id if screening else None,
+        "skills_match_score": screening.skills_match_score if screening else None,
+        "recommendation": screening.recommendation if screening else None,
+        "error": error
+    }
+
+
+async def screen(db: Session, position: str, files: List[Tuple[str, Any]],
+                 screened_by: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Screen (file name, upload) pairs for a position. Returns one result per file,
+    in upload order, with status screened, already_screened, duplicate or failed.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(files)
+    extracted = await extract_all(files)
+
+    texts: Dict[str, str] = {}
+    file_hashes: Dict[int, str] = {}
+    for index, outcome in enumerate(extracted):
+        if isinstance(outcome, Exception):
+            results[index] = _result(files[index][0], "failed", error=str(outcome) or type(outcome).__name__)
+            continue
+        text, digest = outcome
+        file_hashes[index] = digest
+        texts.setdefault(digest, text)
+
+    # Earlier assessments of the same resumes for this position
+    screenings: Dict[str, models.ResumeScreening] = {
+        row.content_hash: row for row in db.query(models.ResumeScreening).filter(
+            models.ResumeScreening.position == position,
+            models.ResumeScreening.content_hash.in_(list(texts))
+        )
+    } if texts else {}
+    previously_screened = set(screenings)
+
+    # Score each new distinct resume once
+    pending = [digest for digest in texts if digest not in screenings]
+    limit = asyncio.Semaphore(max(1, RESUME_SCREENING_CONCURRENCY))
+    analyses = await asyncio.gather(
+        *[_score(position, texts[digest], limit) for digest in pending],
+        return_exceptions=True
+    )
+    first_file = {}
+    for index, digest in file_hashes.items():
+        first_file.setdefault(digest, index)
+    errors: Dict[str, str] = {}
+    new_rows = []
+    for digest, analysis in zip(pending, analyses):
+        if isinstance(analysis, Exception) or not isinstance(analysis, dict):
+            logger.error(f"Error screening resume {files[first_file[digest]][0]}: {analysis}")
+            errors[digest] = "Error analyzing resume"
+            continue
+        new_rows.append(models.ResumeScreening(
+            position=position,
+            content_hash=digest,
+            file_name=files[first_file[digest]][0],
+            skills_match_score=_score_value(analysis),
+            recommendation=str(analysis.get("recommendation") or "")[:50] or None,
+            analysis=analysis,
+            screened_by=screened_by
+        ))
+    for row in _store(db, new_rows):
+        screenings[row.content_hash] = row
+
+    for index, digest in file_hashes.items():
+        name = files[index][0]
+        if digest in errors:
+            results[index] = _result(name, "failed", error=errors[digest])
+        elif digest in previously_screened:
+            results[index] = _result(name, "already_screened", screenings[digest])
+        elif first_file[digest] != index:
+            results[index] = _result(name, "duplicate", screenings[digest])
+        else:
+            results[index] = _result(name, "screened", screenings[digest])
+
+    counts: Dict[str, int] = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    return {
+        "position": position,
+        "files": len(files),
+        "screened": counts.get("screened", 0),
+        "already_screened": counts.get("already_screened", 0),
+        "duplicates": counts.get("duplicate", 0),
+        "failed": counts.get("failed", 0),
+        "results": results
+    }
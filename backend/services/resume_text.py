@@ -0,0 +1,84 @@
+"""
+Plain-text extraction from resume files (PDF, DOCX and plain text).
+
+The resume screening process pool runs extract() in its worker processes, so
+this module depends only on the standard library, plus pypdf for PDFs when it
+is installed.
+"""
+import io
+import re
+import zipfile
+import hashlib
+from typing import Tuple
+from xml.etree import ElementTree
+
+_WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_WHITESPACE = re.compile(r"\s+")
+
+
+def file_kind(filename: str) -> str:
+    name = (filename or "").lower()
+    if name.endswith(".pdf"):
+        return "pdf"
+    if name.endswith(".docx"):
+        return "docx"
+    return "text"
+
+
+def _pdf_text(data: bytes) -> str:
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise ValueError("PDF resumes need the pypdf package")
+    try:
+        reader = PdfReader(io.BytesIO(data))
+        return "\n".join(page.extract_text() or "" for page in reader.pages)
+    except Exception as e:
+        raise ValueError(f"Unreadable PDF: {e}")
+
+
+def _docx_text(data: bytes) -> str:
+    try:
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            document = ElementTree.fromstring(archive.read("word/document.xml"))
+    except (zipfile.BadZipFile, KeyError, ElementTree.ParseError):
+        raise ValueError("Not a valid DOCX file")
+    paragraphs = []
+    for paragraph in document.iter(f"{_WORD_NS}p"):
+        parts = []
+        for node in paragraph.iter():
+            if node.tag == f"{_WORD_NS}t" and node.text:
+                parts.append(node.text)
+            elif node.tag == f"{_WORD_NS}tab":
+                parts.append("\t")
+        paragraphs.append("".join(parts))
+    return "\n".join(paragraphs)
+
+
+def extract_text(filename: str, data: bytes) -> str:
+    """Text of a resume file; raises ValueError when none can be extracted."""
+    kind = file_kind(filename)
+    if kind == "pdf":
+        text = _pdf_text(data)
+    elif kind == "docx":
+        text = _docx_text(data)
+    else:
+        try:
+            text = data.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            raise ValueError("Not a UTF-8 text file")
+    if not text.strip():
+        raise ValueError("No text found in file")
+    return text.strip()
+
+
+def content_hash(text: str) -> str:
+    """Hash of the text with case and whitespace normalized, so the same resume in PDF and DOCX matches."""
+    normalized = _WHITESPACE.sub(" ", text).strip().lower()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def extract(filename: str, data: bytes) -> Tuple[str, str]:
+    """(text, content hash) of a resume file; the unit of work run in the process pool."""
+    text = extract_text(filename, data)
+    return text, content_hash(text)
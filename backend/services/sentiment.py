@@ -0,0 +1,329 @@
+"""
+Rule-based sentiment scoring with a vendored VADER lexicon.
+
+The lexicon ships in backend/data/vader_lexicon.txt (see VADER_LICENSE.txt) and
+is loaded once into a dict, so scoring needs neither NLTK nor a network
+download. Scores follow the VADER rules (boosters, negation, capitalisation,
+"but" clauses and punctuation emphasis) and are memoized by message hash, so
+re-scoring the same platform messages or communication logs is a lookup.
+"""
+import os
+import math
+import string
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+LEXICON_PATH = os.getenv(
+    "SENTIMENT_LEXICON_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "vader_lexicon.txt")
+)
+SENTIMENT_CACHE_SIZE = int(os.getenv("SENTIMENT_CACHE_SIZE", "50000"))
+SENTIMENT_BATCH_MAX_MESSAGES = int(os.getenv("SENTIMENT_BATCH_MAX_MESSAGES", "5000"))
+
+# Compound score thresholds used throughout the app
+POSITIVE_THRESHOLD = 0.05
+NEGATIVE_THRESHOLD = -0.05
+
+# Empirically derived VADER constants
+B_INCR = 0.293
+B_DECR = -0.293
+C_INCR = 0.733
+N_SCALAR = -0.74
+
+NEGATE = {
+    "aint", "arent", "cannot", "cant", "couldnt", "darent", "didnt", "doesnt",
+    "ain't", "aren't", "can't", "couldn't", "daren't", "didn't", "doesn't",
+    "dont", "hadnt", "hasnt", "havent", "isnt", "mightnt", "mustnt", "neither",
+    "don't", "hadn't", "hasn't", "haven't", "isn't", "mightn't", "mustn't",
+    "neednt", "needn't", "never", "none", "nope", "nor", "not", "nothing", "nowhere",
+    "oughtnt", "shant", "shouldnt", "uhuh", "wasnt", "werent",
+    "oughtn't", "shan't", "shouldn't", "uh-uh", "wasn't", "weren't",
+    "without", "wont", "wouldnt", "won't", "wouldn't", "rarely", "seldom", "despite"
+}
+
+BOOSTERS = {
+    **dict.fromkeys([
+        "absolutely", "amazingly", "awfully", "completely", "considerable", "considerably", "decidedly",
+        "deeply", "effing", "enormous", "enormously", "entirely", "especially", "exceptional",
+        "exceptionally", "extreme", "extremely", "fabulously", "flipping", "flippin", "frackin", "fracking",
+        "fricking", "frickin", "frigging", "friggin", "fully", "fuckin", "fucking", "fuggin", "fugging",
+        "greatly", "hella", "highly", "hugely", "incredible", "incredibly", "intensely", "major", "majorly",
+        "more", "most", "particularly", "purely", "quite", "really", "remarkably", "so", "substantially",
+        "thoroughly", "total", "totally", "tremendous", "tremendously", "uber", "unbelievably", "unusually",
+        "utter", "utterly", "very"
+    ], B_INCR),
+    **dict.fromkeys([
+        "almost", "barely", "hardly", "just enough", "kind of", "kinda", "kindof", "kind-of", "less",
+        "little", "marginal", "marginally", "occasional", "occasionally", "partly", "scarce", "scarcely",
+        "slight", "slightly", "somewhat", "sort of", "sorta", "sortof", "sort-of"
+    ], B_DECR),
+}
+
+SPECIAL_CASES = {
+    "the shit": 3, "the bomb": 3, "bad ass": 1.5, "badass": 1.5, "bus stop": 0.0,
+    "yeah right": -2, "kiss of death": -1.5, "to die for": 3, "beating heart": 3.5
+}
+
+
+def load_lexicon(path: str = LEXICON_PATH) -> Dict[str, float]:
+    """Read a token<TAB>mean-valence lexicon file into a dict."""
+    lexicon = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            parts = line.rstrip("\n").split("\t")
+            if len(parts) >= 2 and parts[0]:
+                lexicon[parts[0]] = float(parts[1])
+    return lexicon
+
+
+def _normalize(score: float, alpha: float = 15) -> float:
+    return max(-1.0, min(1.0, score / math.sqrt(score * score + alpha)))
+
+
+def _strip_punctuation(token: str) -> str:
+    # Leave emoticons such as ":)" intact
+    stripped = token.strip(string.punctuation)
+    return token if len(stripped) <= 2 else stripped
+
+
+def label_for(compound: float) -> str:
+    if compound >= POSITIVE_THRESHOLD:
+        return "positive"
+    if compound <= NEGATIVE_THRESHOLD:
+        return "negative"
+    return "neutral"
+
+
+class SentimentAnalyzer:
+    def __init__(self, lexicon: Dict[str, float], cache_size: int = SENTIMENT_CACHE_SIZE):
+        self.lexicon = lexicon
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[bytes, Dict[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+
+    # Memoization
+
+    def polarity_scores(self, text: str) -> Dict[str, float]:
+        """VADER neg/neu/pos/compound scores for one text, memoized by its hash."""
+        key = hashlib.blake2b((text or "").encode("utf-8"), digest_size=16).digest()
+        with self._lock:
+            scores = self._cache.get(key)
+            if scores is not None:
+                self._cache.move_to_end(key)
+                self._stats["hits"] += 1
+                return dict(scores)
+            self._stats["misses"] += 1
+        scores = self._score(text or "")
+        with self._lock:
+            self._cache[key] = scores
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return dict(scores)
+
+    def score_batch(self, messages: Iterable[str]) -> Dict[str, Any]:
+        """
+        Score every message and the batch as a whole. The aggregate averages
+        the per-message scores so one long message cannot drown out the rest.
+        """
+        scored = []
+        for text in messages:
+            scores = self.polarity_scores(text)
+            scores["label"] = label_for(scores["compound"])
+            scored.append(scores)
+        return {"messages": scored, "aggregate": aggregate(scored)}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"lexicon_size": len(self.lexicon), "cached": len(self._cache), **self._stats}
+
+    # VADER rules
+
+    def _score(self, text: str) -> Dict[str, float]:
+        words = [_strip_punctuation(token) for token in text.split()]
+        lowered = [word.lower() for word in words]
+        caps = sum(1 for word in words if word.isupper())
+        is_cap_diff = 0 < len(words) - caps < len(words)
+
+        sentiments = []
+        for i, word in enumerate(lowered):
+            if word in BOOSTERS or (word == "kind" and i < len(lowered) - 1 and lowered[i + 1] == "of"):
+                sentiments.append(0.0)
+                continue
+            sentiments.append(self._valence(words, lowered, i, is_cap_diff))
+
+        # Contrastive "but": the clause after it dominates
+        if "but" in lowered:
+            pivot = lowered.index("but")
+            sentiments = [s * 0.5 if i < pivot else s * 1.5 if i > pivot else s for i, s in enumerate(sentiments)]
+
+        return self._combine(sentiments, text)
+
+    def _valence(self, words: List[str], lowered: List[str], i: int, is_cap_diff: bool) -> float:
+        word = lowered[i]
+        if word not in self.lexicon:
+            return 0.0
+        valence = self.lexicon[word]
+
+        # "no" directly before another lexicon word negates it rather than scoring itself
+        if word == "no" and i != len(lowered) - 1 and lowered[i + 1] in self.lexicon:
+            valence = 0.0
+        if (i > 0 and lowered[i - 1] == "no") or (i > 1 and lowered[i - 2] == "no") \
+                or (i > 2 and lowered[i - 3] == "no" and lowered[i - 1] in ("or", "nor")):
+            valence = self.lexicon[word] * N_SCALAR
+
+        if words[i].isupper() and is_cap_diff:
+            valence += C_INCR if valence > 0 else -C_INCR
+
+        for start in range(3):
+            if i > start and lowered[i - (start + 1)] not in self.lexicon:
+                scalar = self._booster(words[i - (start + 1)], valence, is_cap_diff)
+                if start == 1:
+                    scalar *= 0.95
+                elif start == 2:
+                    scalar *= 0.9
+                valence = self._negation(valence + scalar, lowered, start, i)
+                if start == 2:
+                    valence = self._special_cases(valence, lowered, i)
+
+        # "least" negates unless it is "at least" / "very least"
+        if i > 0 and lowered[i - 1] == "least" and lowered[i - 1] not in self.lexicon:
+            if i == 1 or lowered[i - 2] not in ("at", "very"):
+                valence *= N_SCALAR
+        return valence
+
+    @staticmethod
+    def _booster(word: str, valence: float, is_cap_diff: bool) -> float:
+        scalar = BOOSTERS.get(word.lower(), 0.0)
+        if scalar:
+            if valence < 0:
+                scalar *= -1
+            if word.isupper() and is_cap_diff:
+                scalar += C_INCR if valence > 0 else -C_INCR
+        return scalar
+
+    @staticmethod
+    def _negated(word: str) -> bool:
+        return word in NEGATE or "n't" in word
+
+    def _negation(self, valence: float, lowered: List[str], start: int, i: int) -> float:
+        if start == 0:
+            if self._negated(lowered[i - 1]):
+                valence *= N_SCALAR
+        elif start == 1:
+            if lowered[i - 2] == "never" and lowered[i - 1] in ("so", "this"):
+                valence *= 1.25
+            elif lowered[i - 2] == "without" and lowered[i - 1] == "doubt":
+                pass
+            elif self._negated(lowered[i - 2]):
+                valence *= N_SCALAR
+        else:
+            if (lowered[i - 3] == "never" and lowered[i - 2] in ("so", "this")) or lowered[i - 1] in ("so", "this"):
+                valence *= 1.25
+            elif lowered[i - 3] == "without" and "doubt" in (lowered[i - 2], lowered[i - 1]):
+                pass
+            elif self._negated(lowered[i - 3]):
+                valence *= N_SCALAR
+        return valence
+
+    @staticmethod
+    def _special_cases(valence: float, lowered: List[str], i: int) -> float:
+        before = [
+            f"{lowered[i - 1]} {lowered[i]}",
+            f"{lowered[i - 2]} {lowered[i - 1]} {lowered[i]}",
+            f"{lowered[i - 2]} {lowered[i - 1]}",
+            f"{lowered[i - 3]} {lowered[i - 2]} {lowered[i - 1]}",
+            f"{lowered[i - 3]} {lowered[i - 2]}",
+        ]
+        for phrase in before:
+            if phrase in SPECIAL_CASES:
+                valence = SPECIAL_CASES[phrase]
+                break
+        if len(lowered) - 1 > i:
+            phrase = f"{lowered[i]} {lowered[i + 1]}"
+            if phrase in SPECIAL_CASES:
+                valence = SPECIAL_CASES[phrase]
+        if len(lowered) - 1 > i + 1:
+            phrase = f"{lowered[i]} {lowered[i + 1]} {lowered[i + 2]}"
+            if phrase in SPECIAL_CASES:
+                valence = SPECIAL_CASES[phrase]
+        # Multi-word boosters such as "sort of" and "kind of"
+        for phrase in (before[3], before[4], before[2]):
+            valence += BOOSTERS.get(phrase, 0.0)
+        return valence
+
+    @staticmethod
+    def _combine(sentiments: List[float], text: str) -> Dict[str, float]:
+        if not sentiments:
+            return {"neg": 0.0, "neu": 0.0, "pos": 0.0, "compound": 0.0}
+
+        # Emphasis from exclamation points (up to 4) and repeated question marks
+        question_marks = text.count("?")
+        emphasis = min(text.count("!"), 4) * 0.292
+        if question_marks > 1:
+            emphasis += question_marks * 0.18 if question_marks <= 3 else 0.96
+
+        total = sum(sentiments)
+        if total > 0:
+            total += emphasis
+        elif total < 0:
+            total -= emphasis
+        compound = _normalize(total)
+
+        pos_sum = sum(s + 1 for s in sentiments if s > 0)
+        neg_sum = sum(s - 1 for s in sentiments if s < 0)
+        neutral = sum(1 for s in sentiments if s == 0)
+        if pos_sum > abs(neg_sum):
+            pos_sum += emphasis
+        elif pos_sum < abs(neg_sum):
+            neg_sum -= emphasis
+
+        denominator = pos_sum + abs(neg_sum) + neutral
+        return {
+            "neg": round(abs(neg_sum / denominator), 3),
+            "neu": round(abs(neutral / denominator), 3),
+            "pos": round(abs(pos_sum / denominator), 3),
+            "compound": round(compound, 4)
+        }
+
+
+def aggregate(scores: List[Dict[str, float]]) -> Dict[str, Any]:
+    """Average per-message scores and count labels."""
+    count = len(scores)
+    if count == 0:
+        return {"count": 0, "compound": 0.0, "neg": 0.0, "neu": 0.0, "pos": 0.0,
+                "label": "neutral", "labels": {"positive": 0, "neutral": 0, "negative": 0}}
+    means = {field: round(sum(s[field] for s in scores) / count, 4) for field in ("compound", "neg", "neu", "pos")}
+    labels = {"positive": 0, "neutral": 0, "negative": 0}
+    for s in scores:
+        labels[s.get("label") or label_for(s["compound"])] += 1
+    return {"count": count, **means, "label": label_for(means["compound"]), "labels": labels}
+
+
+_analyzer: Optional[SentimentAnalyzer] = None
+_analyzer_lock = threading.Lock()
+
+
+def get_analyzer() -> SentimentAnalyzer:
+    """Return the shared analyzer, loading the lexicon on first use."""
+    global _analyzer
+    if _analyzer is None:
+        with _analyzer_lock:
+            if _analyzer is None:
+                _analyzer = SentimentAnalyzer(load_lexicon())
+    return _analyzer
+
+
+def polarity_scores(text: str) -> Dict[str, float]:
+    return get_analyzer().polarity_scores(text)
+
+
+def score_batch(messages: Iterable[str]) -> Dict[str, Any]:
+    return get_analyzer().score_batch(messages)
@@ -0,0 +1,19 @@
+"""
+Helpers for server-sent event (text/event-stream) responses.
+"""
+import json
+from typing import Any, Optional
+
+# Disable caching and proxy buffering so events reach the browser as they are produced
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no"
+}
+
+
+def sse_event(data: Any, event: Optional[str] = None) -> str:
+    """Format one event; data is JSON-encoded so it always fits on a single data line."""
+    message = f"data: {json.dumps(data, default=str)}\n\n"
+    if event:
+        message = f"event: {event}\n" + message
+    return message
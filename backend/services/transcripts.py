@@ -0,0 +1,173 @@
+"""
+Helpers for analysing meeting transcripts of any length.
+
+Long transcripts are split into overlapping chunks along speaker turns. Each
+chunk is analysed on its own and the partial results are merged here.
+Overlapping chunks report the same action items and insights twice, so
+near-duplicates are collapsed.
+"""
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from services.prompt_budget import count_tokens, keywords
+
+# Load environment variables
+load_dotenv()
+
+MEETING_CHUNK_TOKENS = int(os.getenv("MEETING_CHUNK_TOKENS", "3000"))
+MEETING_CHUNK_OVERLAP_TOKENS = int(os.getenv("MEETING_CHUNK_OVERLAP_TOKENS", "200"))
+MEETING_CHUNK_CONCURRENCY = int(os.getenv("MEETING_CHUNK_CONCURRENCY", "8"))
+
+# Items whose keyword sets overlap at least this much are treated as the same item
+DUPLICATE_SIMILARITY = 0.7
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_SENTIMENT_VALUES = {"positive": 1.0, "neutral": 0.0, "negative": -1.0}
+
+
+def _pieces(text: str, max_tokens: int) -> List[str]:
+    """Break text into lines (speaker turns), splitting any line that is too long on its own."""
+    pieces = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        if count_tokens(line) <= max_tokens:
+            pieces.append(line)
+            continue
+        words: List[str] = []
+        # Running count: tokens never span whitespace, so a joined run of words
+        # counts the sum of its words and the separating spaces cost nothing
+        words_tokens = 0
+        for sentence in _SENTENCE_RE.split(line):
+            for word in sentence.split():
+                words.append(word)
+                words_tokens += count_tokens(word)
+                if words_tokens >= max_tokens:
+                    pieces.append(" ".join(words))
+                    words = []
+                    words_tokens = 0
+        if words:
+            pieces.append(" ".join(words))
+    return pieces
+
+
+def split_transcript(transcript: str, max_tokens: int = MEETING_CHUNK_TOKENS,
+                     overlap_tokens: int = MEETING_CHUNK_OVERLAP_TOKENS) -> List[str]:
+    """
+    Split a transcript into chunks of at most max_tokens. Each chunk after the
+    first repeats about overlap_tokens of the previous one, so statements near a
+    boundary are seen with their context.
+    """
+    overlap_tokens = min(overlap_tokens, max_tokens // 2)
+    pieces = _pieces(transcript, max(1, max_tokens - overlap_tokens))
+    chunks = []
+    current: List[str] = []
+    current_tokens = 0
+    for piece in pieces:
+        tokens = count_tokens(piece) + 1
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append("\n".join(current))
+            # Carry the tail of this chunk into the next one
+            carried: List[str] = []
+            carried_tokens = 0
+            for line in reversed(current):
+                line_tokens = count_tokens(line) + 1
+                if carried_tokens + line_tokens > overlap_tokens:
+                    break
+                carried.insert(0, line)
+                carried_tokens += line_tokens
+            current, current_tokens = carried, carried_tokens
+        current.append(piece)
+        current_tokens += tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks or [transcript]
+
+
+def group_by_tokens(texts: List[str], max_tokens: int = MEETING_CHUNK_TOKENS) -> List[List[str]]:
+    """Pack consecutive texts into groups that each fit within max_tokens."""
+    groups: List[List[str]] = []
+    current: List[str] = []
+    current_tokens = 0
+    for text in texts:
+        tokens = count_tokens(text) + 1
+        if current and current_tokens + tokens > max_tokens:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _similar(a: set, b: set) -> bool:
+    if not a or not b:
+        return False
+    return len(a & b) / min(len(a), len(b)) >= DUPLICATE_SIMILARITY
+
+
+def merge_action_items(partials: List[List[Any]]) -> List[Dict[str, Any]]:
+    """Concatenate action items in transcript order, dropping near-duplicates (keeping a known assignee)."""
+    merged: List[Dict[str, Any]] = []
+    signatures: List[set] = []
+    for items in partials:
+        for item in items or []:
+            if isinstance(item, str):
+                item = {"task": item, "assignee": None}
+            if not isinstance(item, dict) or not item.get("task"):
+                continue
+            signature = set(keywords(str(item["task"])))
+            for index, existing in enumerate(signatures):
+                if _similar(signature, existing) and (
+                    not item.get("assignee") or not merged[index].get("assignee")
+                    or str(item["assignee"]).lower() == str(merged[index]["assignee"]).lower()
+                ):
+                    if item.get("assignee") and not merged[index].get("assignee"):
+                        merged[index]["assignee"] = item["assignee"]
+                    break
+            else:
+                merged.append(dict(item))
+                signatures.append(signature)
+    return merged
+
+
+def merge_insights(partials: List[List[Any]]) -> List[str]:
+    merged: List[str] = []
+    signatures: List[set] = []
+    for insights in partials:
+        for insight in insights or []:
+            if not isinstance(insight, str) or not insight.strip():
+                continue
+            signature = set(keywords(insight))
+            if any(_similar(signature, existing) for existing in signatures):
+                continue
+            merged.append(insight)
+            signatures.append(signature)
+    return merged
+
+
+def combine_sentiments(partials: List[Optional[Dict[str, Any]]], weights: List[int]) -> Dict[str, Any]:
+    """Confidence- and length-weighted average of per-chunk sentiment labels."""
+    total = 0.0
+    weight_sum = 0.0
+    for sentiment, weight in zip(partials, weights):
+        if not isinstance(sentiment, dict):
+            continue
+        value = _SENTIMENT_VALUES.get(str(sentiment.get("sentiment", "")).lower())
+        if value is None:
+            continue
+        try:
+            confidence = float(sentiment.get("confidence", 0.5))
+        except (TypeError, ValueError):
+            confidence = 0.5
+        total += value * confidence * weight
+        weight_sum += confidence * weight
+    if weight_sum == 0:
+        return {"sentiment": "neutral", "confidence": 0.5}
+    score = total / weight_sum
+    label = "positive" if score >= 0.25 else "negative" if score <= -0.25 else "neutral"
+    return {"sentiment": label, "confidence": round(min(1.0, 0.5 + abs(score) / 2), 2)}
@@ -0,0 +1,487 @@
+"""
+Streamed and resumable file uploads.
+
+A single-request upload is parsed as the multipart body arrives, and its file
+field is written straight to disk. Starlette's form parser, which spools the
+whole body first, is not used. The size and a sha256 checksum are computed
+while writing, so memory use does not depend on the file size. A request whose
+Content-Length is already over UPLOAD_MAX_BYTES is rejected with 413 before
+anything is read. Otherwise the limit is checked as bytes arrive, and an
+oversized upload is rejected with 413 and its partial file removed.
+
+Files too large for one request use a resumable upload:
+
+1. create_session() records the file name, declared size and optional checksum.
+2. append_chunk() appends a chunk of the raw request body at a given offset.
+   A client that lost its connection asks for the current offset and
+   continues from there.
+3. begin_completion() verifies the size and checksum, then the file is moved
+   into place and recorded (see the completion route).
+
+Session state is kept next to the partial file under UPLOAD_DIR/.incomplete,
+so it survives restarts. Each session also has a lock file. Requests that
+change a session hold it while they check and write, so one request at a time
+writes to an upload, across processes too. Sessions untouched for
+UPLOAD_SESSION_TTL_HOURS are removed.
+"""
+import os
+import json
+import time
+import uuid
+import shutil
+import asyncio
+import hashlib
+import logging
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import multipart
+from dotenv import load_dotenv
+from fastapi import HTTPException, Request, status
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import parse_options_header
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(100 * 1024 * 1024)))
+UPLOAD_RESUMABLE_MAX_BYTES = int(os.getenv("UPLOAD_RESUMABLE_MAX_BYTES", str(5 * 1024 * 1024 * 1024)))
+UPLOAD_SESSION_TTL_HOURS = float(os.getenv("UPLOAD_SESSION_TTL_HOURS", "24"))
+
+_SESSION_DIR = os.path.join(UPLOAD_DIR, ".incomplete")
+
+# Allowance for part headers and text fields next to the file in a form upload
+_FORM_OVERHEAD_BYTES = 64 * 1024
+
+# Request body of the form upload route, which parses the body itself
+FORM_UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {
+                        "file": {"type": "string", "format": "binary"},
+                        "description": {"type": "string"}
+                    }
+                }
+            }
+        }
+    }
+}
+
+
+def _too_large(limit: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File exceeds the {limit} byte limit"
+    )
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(UPLOAD_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def destination(task_id: int, filename: str) -> Tuple[str, str]:
+    """(file path, public URL) for a new attachment of a task, under a unique name."""
+    unique_filename = f"{uuid.uuid4()}{os.path.splitext(filename or '')[1]}"
+    upload_dir = os.path.join(UPLOAD_DIR, "tasks", str(task_id))
+    os.makedirs(upload_dir, exist_ok=True)
+    return os.path.join(upload_dir, unique_filename), f"/uploads/tasks/{task_id}/{unique_filename}"
+
+
+def _bad_form(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+class _StreamedForm:
+    """
+    Callbacks for python-multipart's MultipartParser. Data of the file field is
+    queued for the caller to write; text fields are kept, other files dropped.
+    """
+
+    def __init__(self, file_field: str):
+        self.file_field = file_field
+        self.file_name: Optional[str] = None
+        self.file_type: Optional[str] = None
+        self.fields: Dict[str, str] = {}
+        self.file_data: List[bytes] = []
+        self.complete = False
+        self._field_bytes = 0
+        self._headers: Dict[bytes, bytes] = {}
+        self._header_name = b""
+        self._header_value = b""
+        self._part: Optional[str] = None
+        self._name = ""
+        self._value = b""
+
+    def callbacks(self) -> Dict[str, Any]:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_end": self.on_end
+        }
+
+    def on_part_begin(self):
+        self._headers = {}
+        self._part = None
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        self._headers[self._header_name.lower()] = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if b"name" not in options:
+            raise _bad_form("Form part without a name")
+        self._name = options[b"name"].decode("utf-8", errors="replace")
+        if b"filename" not in options:
+            self._part = "field"
+            self._value = b""
+        elif self._name == self.file_field:
+            if self.file_name is not None:
+                raise _bad_form(f"Only one {self.file_field} can be uploaded")
+            self._part = "file"
+            self.file_name = options[b"filename"].decode("utf-8", errors="replace")
+            content_type = self._headers.get(b"content-type")
+            self.file_type = content_type.decode("latin-1") if content_type else None
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self._part == "file":
+            self.file_data.append(data[start:end])
+        elif self._part == "field":
+            self._field_bytes += end - start
+            if self._field_bytes > _FORM_OVERHEAD_BYTES:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"Form fields exceed {_FORM_OVERHEAD_BYTES} bytes"
+                )
+            self._value += data[start:end]
+
+    def on_part_end(self):
+        if self._part == "field":
+            self.fields[self._name] = self._value.decode("utf-8", errors="replace")
+
+    def on_end(self):
+        self.complete = True
+
+
+async def save_form_upload(request: Request, task_id: int, file_field: str = "file",
+                           max_bytes: int = UPLOAD_MAX_BYTES) -> Dict[str, Any]:
+    """
+    Write the file field of a multipart/form-data request to a new attachment
+    path of the task as the body arrives. Returns its file_name, file_type,
+    file_size, checksum (sha256), file_path and file_url, plus the text fields
+    of the form as fields.
+    """
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_bytes + _FORM_OVERHEAD_BYTES:
+        raise _too_large(max_bytes)
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise _bad_form("Expected a multipart/form-data body")
+
+    form = _StreamedForm(file_field)
+    parser = multipart.MultipartParser(params[b"boundary"], form.callbacks())
+    part_path, _ = destination(task_id, "upload.part")
+    size = 0
+    digest = hashlib.sha256()
+    try:
+        with open(part_path, "wb") as out:
+            async for chunk in request.stream():
+                try:
+                    parser.write(chunk)
+                except MultipartParseError as e:
+                    raise _bad_form(f"Malformed multipart body: {str(e)}")
+                for data in form.file_data:
+                    size += len(data)
+                    if size > max_bytes:
+                        raise _too_large(max_bytes)
+                    digest.update(data)
+                    await asyncio.to_thread(out.write, data)
+                form.file_data.clear()
+        if not form.complete:
+            raise _bad_form("Incomplete multipart body")
+        if form.file_name is None:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"The {file_field} field is required"
+            )
+        # Named after the file only now that its name is known; same directory, so no copy
+        file_path, file_url = destination(task_id, form.file_name)
+        os.replace(part_path, file_path)
+    except BaseException:
+        _remove(part_path)
+        raise
+    return {
+        "file_name": form.file_name,
+        "file_type": form.file_type,
+        "file_size": size,
+        "checksum": digest.hexdigest(),
+        "file_path": file_path,
+        "file_url": file_url,
+        "fields": form.fields
+    }
+
+
+# Resumable uploads
+
+def _session_paths(upload_id: str) -> Tuple[str, str, str]:
+    """(metadata, partial file, lock file) paths of an upload session."""
+    try:
+        upload_id = str(uuid.UUID(upload_id))
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found")
+    base = os.path.join(_SESSION_DIR, upload_id)
+    return base + ".json", base + ".part", base + ".lock"
+
+
+def _write_meta(meta_path: str, session: Dict[str, Any]):
+    # Replaced whole, so readers never see a half-written file
+    with open(meta_path + ".tmp", "w") as meta:
+        json.dump({key: value for key, value in session.items() if key not in ("offset", "chunk_size")}, meta)
+    os.replace(meta_path + ".tmp", meta_path)
+
+
+def _read_meta(meta_path: str) -> Dict[str, Any]:
+    try:
+        with open(meta_path) as meta:
+            return json.load(meta)
+    except FileNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found")
+
+
+def _try_lock(handle) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+@contextmanager
+def _session_lock(upload_id: str, wait: float = 0):
+    """
+    Hold the session's lock file, which serializes requests on one upload across
+    processes, and yield its current metadata. Raises 409 if the lock is still
+    held by another request after wait seconds, and 404 if the session is gone.
+    """
+    meta_path, _, lock_path = _session_paths(upload_id)
+    try:
+        handle = open(lock_path, "r+b")
+    except FileNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found")
+    try:
+        give_up = time.monotonic() + wait
+        while not _try_lock(handle):
+            if time.monotonic() >= give_up:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Another request is in progress for this upload"
+                )
+            time.sleep(0.05)
+        # Read under the lock: the session may have been completed or discarded meanwhile
+        yield _read_meta(meta_path)
+    finally:
+        # Closing the file releases the lock
+        handle.close()
+
+
+def _check_open(session: Dict[str, Any]):
+    if session.get("state") == "completing":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Upload is being completed")
+
+
+def _remove_session(upload_id: str, require_open: bool = False):
+    meta_path, part_path, lock_path = _session_paths(upload_id)
+    with _session_lock(upload_id) as current:
+        if require_open:
+            _check_open(current)
+        _remove(meta_path)
+        _remove(part_path)
+    # After releasing it; a request that opened the lock file meanwhile finds no metadata (404)
+    try:
+        _remove(lock_path)
+    except OSError:
+        # Still open elsewhere (Windows); purge_stale_sessions removes it later
+        pass
+
+
+def purge_stale_sessions():
+    """Remove sessions untouched for UPLOAD_SESSION_TTL_HOURS, skipping any a request is working on."""
+    if not os.path.isdir(_SESSION_DIR):
+        return
+    cutoff = time.time() - UPLOAD_SESSION_TTL_HOURS * 3600
+    for name in os.listdir(_SESSION_DIR):
+        upload_id, extension = os.path.splitext(name)
+        path = os.path.join(_SESSION_DIR, name)
+        try:
+            if os.path.getmtime(path) >= cutoff:
+                continue
+            if extension == ".json":
+                _remove_session(upload_id)
+            elif not os.path.exists(os.path.join(_SESSION_DIR, upload_id + ".json")):
+                # Left behind by a session whose metadata is already gone
+                os.remove(path)
+        except (HTTPException, OSError):
+            pass
+
+
+def create_session(task_id: int, user_id: int, file_name: str, file_size: int,
+                   file_type: Optional[str] = None, checksum: Optional[str] = None) -> Dict[str, Any]:
+    if file_size > UPLOAD_RESUMABLE_MAX_BYTES:
+        raise _too_large(UPLOAD_RESUMABLE_MAX_BYTES)
+    purge_stale_sessions()
+    os.makedirs(_SESSION_DIR, exist_ok=True)
+    session = {
+        "upload_id": str(uuid.uuid4()),
+        "task_id": task_id,
+        "user_id": user_id,
+        "file_name": file_name,
+        "file_size": file_size,
+        "file_type": file_type,
+        "checksum": checksum.lower() if checksum else None,
+        "state": "open"
+    }
+    meta_path, part_path, lock_path = _session_paths(session["upload_id"])
+    open(lock_path, "wb").close()
+    open(part_path, "wb").close()
+    _write_meta(meta_path, session)
+    return {**session, "offset": 0, "chunk_size": UPLOAD_CHUNK_BYTES}
+
+
+def get_session(upload_id: str, task_id: int, user_id: int) -> Dict[str, Any]:
+    """The session with the number of bytes received so far as offset."""
+    meta_path, part_path, _ = _session_paths(upload_id)
+    session = _read_meta(meta_path)
+    if session["task_id"] != task_id or session["user_id"] != user_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found")
+    try:
+        offset = os.path.getsize(part_path)
+    except FileNotFoundError:
+        # Moved into place by a completion in progress
+        offset = session["file_size"]
+    return {**session, "offset": offset, "chunk_size": UPLOAD_CHUNK_BYTES}
+
+
+async def append_chunk(session: Dict[str, Any], offset: int, chunks: AsyncIterator[bytes]) -> int:
+    """
+    Append a request body at offset and return the new offset. The offset must
+    equal the bytes received so far (409 otherwise), and the body may not run past
+    the declared size (413). One request at a time may write to an upload; others
+    get 409 and can ask for the offset again.
+    """
+    meta_path, part_path, _ = _session_paths(session["upload_id"])
+    with _session_lock(session["upload_id"]) as current:
+        _check_open(current)
+        received = os.path.getsize(part_path)
+        if offset != received:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Upload is at offset {received}"
+            )
+        with open(part_path, "r+b") as out:
+            out.seek(offset)
+            try:
+                async for chunk in chunks:
+                    received += len(chunk)
+                    if received > current["file_size"]:
+                        raise _too_large(current["file_size"])
+                    await asyncio.to_thread(out.write, chunk)
+            except BaseException:
+                # Keep only what was acknowledged before this request; no one else wrote meanwhile
+                out.truncate(offset)
+                raise
+        os.utime(meta_path)
+    return received
+
+
+def begin_completion(session: Dict[str, Any]) -> str:
+    """
+    Check the size and checksum of a fully received upload and mark it as
+    completing, so that further chunks, completions and cancellations get 409.
+    Returns the file's sha256. Follow with move_into_place(), then
+    finish_session() once the attachment is recorded, or reopen_session() if it
+    could not be.
+    """
+    meta_path, part_path, _ = _session_paths(session["upload_id"])
+    with _session_lock(session["upload_id"]) as current:
+        _check_open(current)
+        received = os.path.getsize(part_path)
+        if received != current["file_size"]:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Upload is incomplete: {received} of {current['file_size']} bytes received"
+            )
+        checksum = file_sha256(part_path)
+        if current["checksum"] and current["checksum"] != checksum:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Checksum mismatch"
+            )
+        _write_meta(meta_path, {**current, "state": "completing"})
+    return checksum
+
+
+def move_into_place(session: Dict[str, Any], path: str):
+    shutil.move(_session_paths(session["upload_id"])[1], path)
+
+
+def reopen_session(session: Dict[str, Any], path: str):
+    """Undo a completion whose attachment could not be recorded, so it can be retried."""
+    meta_path, part_path, _ = _session_paths(session["upload_id"])
+    # Chunk requests only hold the lock briefly before seeing the completing state
+    with _session_lock(session["upload_id"], wait=5) as current:
+        if os.path.exists(part_path):
+            # The move did not finish
+            _remove(path)
+        else:
+            shutil.move(path, part_path)
+        _write_meta(meta_path, {**current, "state": "open"})
+
+
+def finish_session(session: Dict[str, Any]):
+    """Drop the state of a completed upload once its file is in place and recorded."""
+    _remove_session(session["upload_id"])
+
+
+def discard_session(session: Dict[str, Any]):
+    _remove_session(session["upload_id"], require_open=True)
@@ -45,6 +45,8 @@ CREATE TABLE IF NOT EXISTS tasks (
   actual_time DECIMAL(5,2),
   start_time DATETIME,
   end_time DATETIME,
+  progress_description TEXT,
+  drive_link VARCHAR(500),
   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
   updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
   FOREIGN KEY (client_id) REFERENCES clients(client_id),
@@ -58,6 +60,8 @@ CREATE TABLE IF NOT EXISTS employee_attendance (
   login_time DATETIME,
   logout_time DATETIME,
   work_date DATE NOT NULL,
+  INDEX idx_attendance_work_date (work_date, login_time),
+  INDEX idx_attendance_user_date (user_id, work_date),
   FOREIGN KEY (user_id) REFERENCES users(user_id)
 );
 
@@ -82,6 +86,7 @@ CREATE TABLE IF NOT EXISTS invoices (
   due_date DATE,
   status ENUM('pending', 'paid', 'overdue') DEFAULT 'pending',
   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  INDEX idx_invoices_created_at (created_at, status, amount),
   FOREIGN KEY (client_id) REFERENCES clients(client_id)
 );
 
@@ -92,7 +97,8 @@ CREATE TABLE IF NOT EXISTS financial_records (
   amount DECIMAL(10,2) NOT NULL,
   description TEXT,
   record_date DATE NOT NULL,
-  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  INDEX idx_financial_records_date (record_date, record_type, amount)
 );
 
 -- 9. AI Insights Table
@@ -104,6 +110,83 @@ CREATE TABLE IF NOT EXISTS ai_insights (
   FOREIGN KEY (task_id) REFERENCES tasks(task_id)
 );
 
+-- 10. AI Jobs Table (background AI analyses)
+CREATE TABLE IF NOT EXISTS ai_jobs (
+  job_id VARCHAR(36) PRIMARY KEY,
+  job_type VARCHAR(100) NOT NULL,
+  params JSON,
+  status ENUM('queued', 'running', 'succeeded', 'failed') NOT NULL DEFAULT 'queued',
+  result JSON,
+  error TEXT,
+  attempts INT NOT NULL DEFAULT 0,
+  created_by INT,
+  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  started_at DATETIME,
+  finished_at DATETIME,
+  claim_token VARCHAR(32),
+  heartbeat_at DATETIME,
+  INDEX idx_ai_jobs_status (status),
+  INDEX idx_ai_jobs_created_at (created_at),
+  FOREIGN KEY (created_by) REFERENCES users(user_id)
+);
+
+-- 11. Monthly Ledger Rollup Table (per-month financial_records totals)
+CREATE TABLE IF NOT EXISTS monthly_ledger_rollup (
+  month DATE NOT NULL,
+  record_type ENUM('expense', 'income') NOT NULL,
+  total_amount DECIMAL(14,2) NOT NULL DEFAULT 0,
+  record_count INT NOT NULL DEFAULT 0,
+  updated_at DATETIME,
+  PRIMARY KEY (month, record_type)
+);
+
+-- 12. Attendance Daily Rollup Table (per-employee, per-day attendance totals)
+CREATE TABLE IF NOT EXISTS attendance_daily_rollup (
+  user_id INT NOT NULL,
+  work_date DATE NOT NULL,
+  first_login DATETIME,
+  last_logout DATETIME,
+  hours_worked DECIMAL(6,2),
+  is_late BOOLEAN NOT NULL DEFAULT FALSE,
+  updated_at DATETIME,
+  PRIMARY KEY (user_id, work_date),
+  INDEX idx_attendance_rollup_work_date (work_date, is_late),
+  FOREIGN KEY (user_id) REFERENCES users(user_id)
+);
+
+-- 13. Resume Screenings Table (stored bulk resume assessments)
+CREATE TABLE IF NOT EXISTS resume_screenings (
+  screening_id INT AUTO_INCREMENT PRIMARY KEY,
+  position VARCHAR(100) NOT NULL,
+  content_hash VARCHAR(64) NOT NULL,
+  file_name VARCHAR(255),
+  skills_match_score FLOAT,
+  recommendation VARCHAR(50),
+  analysis JSON,
+  screened_by INT,
+  created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  UNIQUE INDEX idx_resume_screenings_hash (position, content_hash),
+  INDEX idx_resume_screenings_score (position, skills_match_score),
+  FOREIGN KEY (screened_by) REFERENCES users(user_id)
+);
+
+-- 14. Task Attachments Table (files uploaded for tasks)
+CREATE TABLE IF NOT EXISTS task_attachments (
+  attachment_id INT AUTO_INCREMENT PRIMARY KEY,
+  task_id INT NOT NULL,
+  file_name VARCHAR(255) NOT NULL,
+  file_path VARCHAR(500) NOT NULL,
+  file_url VARCHAR(500) NOT NULL,
+  file_type VARCHAR(100),
+  file_size BIGINT NOT NULL,
+  checksum VARCHAR(64),
+  uploaded_by INT,
+  created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+  INDEX idx_task_attachments_task (task_id),
+  FOREIGN KEY (task_id) REFERENCES tasks(task_id),
+  FOREIGN KEY (uploaded_by) REFERENCES users(user_id)
+);
+
 -- Insert default roles
 INSERT IGNORE INTO roles (role_name) VALUES 
 ('admin'),
@@ -161,3 +244,16 @@ SELECT
 FROM users
 WHERE email = 'admin@example.com'
 LIMIT 1;
+
+-- Matching daily attendance rollup row
+INSERT IGNORE INTO attendance_daily_rollup (user_id, work_date, first_login, last_logout, hours_worked, is_late, updated_at)
+SELECT 
+  user_id,
+  work_date,
+  MIN(login_time),
+  MAX(logout_time),
+  SUM(TIMESTAMPDIFF(SECOND, login_time, logout_time)) / 3600,
+  TIME(MIN(login_time)) > '09:15:00',
+  NOW()
+FROM employee_attendance
+GROUP BY user_id, work_date;
@@ -0,0 +1,82 @@
+"""
+analyze-cost must issue the same number of SQL statements however many
+employees, clients and tasks there are.
+"""
+import asyncio
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import models
+from routers import finance
+from services import attendance_rollup
+
+START = date(2024, 3, 1)
+END = date(2024, 3, 31)
+
+TABLES = [
+    models.Role.__table__,
+    models.User.__table__,
+    models.Client.__table__,
+    models.Task.__table__,
+    models.EmployeeAttendance.__table__,
+    models.AttendanceDailyRollup.__table__,
+]
+
+
+def seeded_session(employees: int):
+    """In-memory database where each employee has a client, two completed tasks and a day of attendance."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.Base.metadata.create_all(engine, tables=TABLES)
+    db = sessionmaker(bind=engine)()
+    db.add(models.Role(role_id=1, role_name="employee"))
+    for index in range(1, employees + 1):
+        db.add(models.User(user_id=index, name=f"Employee {index}", email=f"employee{index}@example.com",
+                           password_hash="x", role_id=1))
+        db.add(models.Client(client_id=index, client_name=f"Client {index}"))
+        for day in (10, 11):
+            db.add(models.Task(title=f"Task {index}-{day}", client_id=index, assigned_to=index,
+                               status=models.TaskStatus.completed, actual_time=1.5,
+                               end_time=datetime(2024, 3, day, 17)))
+        login = datetime(2024, 3, 4, 9)
+        db.add(models.EmployeeAttendance(user_id=index, login_time=login, logout_time=login + timedelta(hours=8),
+                                         work_date=login.date()))
+    db.commit()
+    attendance_rollup.rebuild(db, START, END)
+    return db
+
+
+def analyze_cost_with_statement_count(db):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        result = asyncio.run(finance.analyze_cost(start_date=START, end_date=END, current_user=None, db=db))
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return result, len(statements)
+
+
+@pytest.mark.parametrize("use_rollup", [True, False])
+def test_analyze_cost_statement_count_is_constant(monkeypatch, use_rollup):
+    monkeypatch.setattr("services.attendance.ATTENDANCE_ROLLUP_ENABLED", use_rollup)
+    counts = {}
+    for employees in (1, 25):
+        db = seeded_session(employees)
+        try:
+            result, counts[employees] = analyze_cost_with_statement_count(db)
+        finally:
+            db.close()
+            db.get_bind().dispose()
+        assert result["summary"]["total_employees"] == employees
+        assert result["summary"]["total_hours"] == pytest.approx(8 * employees)
+        assert result["summary"]["total_task_hours"] == pytest.approx(3 * employees)
+        assert len(result["client_costs"]) == employees
+    assert counts[1] == counts[25]